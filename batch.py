@@ -0,0 +1,45 @@
+import sys
+import argparse
+from time import perf_counter
+from project.batch import format_summary, instance_files, run_batch, summary, STATUS_OK
+from project.bddcache import DEFAULT_MAX_BYTES
+from project.ordering import HEURISTIC_DECLARED, HEURISTICS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run CodeInterpreter over many instances in a pool of processes")
+    parser.add_argument("source", help="directory of *.txt instances, or a glob pattern such as 'hw01_instances/random*.txt'")
+    parser.add_argument("-o", "--output-dir", default="outputs", help="directory receiving one <instance>.out file per instance")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes, one per CPU by default")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds an instance may take before it is abandoned")
+    parser.add_argument("--memory-mb", type=int, default=None, help="address space cap of every worker process in MiB")
+    parser.add_argument("--reorder-threshold", type=int, default=None,
+                        help="sift the variable order while building whenever the BDDs grow past this many nodes")
+    parser.add_argument("--var-order", choices=HEURISTICS, default=HEURISTIC_DECLARED,
+                        help="heuristic picking the initial variable order, the columns keep the declared order")
+    parser.add_argument("--cubes", action="store_true", help="print show_ones tables as disjoint cubes")
+    parser.add_argument("--cache", metavar="DIR", default=None,
+                        help="directory of compiled BDDs shared by the workers and between runs")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_MAX_BYTES >> 20,
+                        help="size of the cache in MiB past which the least recently used BDDs are removed")
+    args = parser.parse_args()
+
+    paths = instance_files(args.source)
+    if not paths:
+        print(f"Error: no instances found in '{args.source}'.")
+        sys.exit(1)
+
+    start = perf_counter()
+    results = run_batch(paths, args.output_dir, args.workers, args.timeout, args.memory_mb,
+                        args.reorder_threshold, args.var_order, args.cubes, args.cache, args.cache_mb << 20)
+    stats = summary(results, perf_counter() - start)
+
+    for result in results:
+        if result['status'] != STATUS_OK:
+            print(f"{result['input']}: {result['status']}, {result['error']}")
+    print(format_summary(stats))
+    sys.exit(0 if stats['statuses'].get(STATUS_OK, 0) == len(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Seeded generator of random programs in the format of the hw01 instances.
+
+A program is a sequence of blocks: a `var` declaration, a few assignments over
+every variable and assignment declared so far, then show and show_ones
+instructions over the assignments. Expressions are random trees of and/or/not
+with every compound operand in parentheses, and lines are wrapped like the
+instances. The same parameters and seed always give the same program.
+
+Usage: python -m benchmarks.generator [--variables N] [--depth D] [--seed S] ...
+"""
+import argparse
+import random
+import string
+from typing import List
+
+from project.tokenizer import Tokenizer
+
+NAME_CHARACTERS = string.ascii_letters + '_'
+LINE_WIDTH = 80
+
+
+class ProgramGenerator:
+    """
+    Inputs:
+        variables: int, number of declared variables, spread over the blocks
+        blocks: int, number of var declarations
+        assignments: int, assignments per block
+        depth: int, maximum nesting depth of an expression
+        operands: int, maximum number of operands of an and/or
+        shows: int, show/show_ones instructions per block
+        outputs: int, maximum number of names per instruction
+        show_ones: float, probability that an instruction is show_ones instead of show
+        seed: int, seed of the random generator
+    """
+
+    def __init__(self, variables=9, blocks=3, assignments=4, depth=4, operands=4, shows=2, outputs=3,
+                 show_ones=0.3, seed=0):
+        if variables < blocks:
+            raise ValueError(f"Expected at least one variable per block, got {variables} for {blocks} blocks")
+        self.variables = variables
+        self.blocks = blocks
+        self.assignments = assignments
+        self.depth = depth
+        self.operands = operands
+        self.shows = shows
+        self.outputs = outputs
+        self.show_ones = show_ones
+        self.random = random.Random(seed)
+        self.names = set(Tokenizer().keywords)
+
+    def name(self) -> str:
+        while True:
+            name = "".join(self.random.choice(NAME_CHARACTERS) for _ in range(3))
+            if name not in self.names:
+                self.names.add(name)
+                return name
+
+    def expression(self, leaves: List[str], depth: int, top: bool = False) -> str:
+        # compound operands are always parenthesised, "a and not b" is not valid in the language
+        if depth == 0 or (not top and self.random.random() < 0.3):
+            if self.random.random() < 0.02:
+                return self.random.choice(('True', 'False'))
+            return self.random.choice(leaves)
+        if self.random.random() < 0.2:
+            text = "not " + self.expression(leaves, depth - 1)
+        else:
+            op = self.random.choice((' and ', ' or '))
+            text = op.join(self.expression(leaves, depth - 1) for _ in range(self.random.randint(2, self.operands)))
+        return text if top else "(" + text + ")"
+
+    def statements(self) -> List[str]:
+        statements = []
+        leaves = []
+        defined = []
+        # the variables are spread as evenly as possible over the blocks
+        sizes = [self.variables // self.blocks + (i < self.variables % self.blocks) for i in range(self.blocks)]
+        for size in sizes:
+            names = [self.name() for _ in range(size)]
+            leaves.extend(names)
+            statements.append("var " + " ".join(names) + ";")
+            for _ in range(self.assignments):
+                name = self.name()
+                statements.append(f"{name} = {self.expression(leaves, self.depth, top=True)};")
+                leaves.append(name)
+                defined.append(name)
+            for _ in range(self.shows):
+                keyword = 'show_ones' if self.random.random() < self.show_ones else 'show'
+                outputs = self.random.sample(defined, min(len(defined), self.random.randint(1, self.outputs)))
+                statements.append(keyword + " " + " ".join(outputs) + ";")
+        return statements
+
+    def program(self) -> str:
+        return "\n".join(line for statement in self.statements() for line in wrap(statement)) + "\n"
+
+
+def wrap(statement: str, width: int = LINE_WIDTH) -> List[str]:
+    # breaks at spaces like the instances, a line ends with the space it was broken at
+    lines = []
+    while len(statement) > width:
+        cut = statement.rfind(' ', 0, width)
+        if cut <= 0:
+            break
+        lines.append(statement[:cut + 1])
+        statement = statement[cut + 1:]
+    lines.append(statement)
+    return lines
+
+
+def generate(seed: int = 0, **parameters) -> str:
+    """Text of the program of ProgramGenerator(seed=seed, **parameters)."""
+    return ProgramGenerator(seed=seed, **parameters).program()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a random program in the format of the hw01 instances")
+    parser.add_argument("--variables", type=int, default=9)
+    parser.add_argument("--blocks", type=int, default=3)
+    parser.add_argument("--assignments", type=int, default=4, help="assignments per block")
+    parser.add_argument("--depth", type=int, default=4, help="maximum nesting depth of an expression")
+    parser.add_argument("--operands", type=int, default=4, help="maximum number of operands of an and/or")
+    parser.add_argument("--shows", type=int, default=2, help="instructions per block")
+    parser.add_argument("--outputs", type=int, default=3, help="maximum number of names per instruction")
+    parser.add_argument("--show-ones", type=float, default=0.3, help="probability of show_ones instead of show")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(generate(args.seed, variables=args.variables, blocks=args.blocks, assignments=args.assignments,
+                   depth=args.depth, operands=args.operands, shows=args.shows, outputs=args.outputs,
+                   show_ones=args.show_ones), end="")
+
+
+if __name__ == "__main__":
+    main()
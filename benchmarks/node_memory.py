@@ -0,0 +1,83 @@
+"""
+Memory benchmark for the BDD node store.
+
+Builds a BDD whose size grows exponentially with the number of variable pairs
+(the pairs x_i and y_i are compared under the order x_0..x_n, y_0..y_n) and
+compares the bytes used by the integer columns of BDDManager with the bytes
+the same nodes take as slotted Python objects keyed by (var, id(low), id(high)),
+which is how the store was laid out before.
+
+Usage: python -m benchmarks.node_memory [--pairs N]
+"""
+import argparse
+import tracemalloc
+from time import perf_counter
+
+from project.ROBDD import BDDManager
+
+
+class _ObjectNode:
+    # replica of the former per-node object, kept here only for the comparison
+    __slots__ = ['var', 'low', 'high', 'terminal']
+
+    def __init__(self, var, low, high):
+        self.var = var
+        self.low = low
+        self.high = high
+        self.terminal = var in (0, 1)
+
+
+def pairs_expression(pairs):
+    return ('or',) + tuple(('and', f'x{i}', f'y{i}') for i in range(pairs))
+
+
+def pairs_variables(pairs):
+    return [f'x{i}' for i in range(pairs)] + [f'y{i}' for i in range(pairs)]
+
+
+def measure_integer_store(pairs):
+    start = perf_counter()
+    manager = BDDManager(pairs_variables(pairs))
+    manager.build('f', pairs_expression(pairs), reduce=True)
+    elapsed = perf_counter() - start
+    return manager, elapsed, manager.memory_usage()
+
+
+def measure_object_store(manager):
+    # rebuild the live nodes of the manager as objects, children before parents; the objects
+    # have no complement bit, only the number of nodes matters for the comparison
+    live = manager._live_nodes()
+    order = sorted(live, key=lambda node: -manager.node_var[node])
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = {0: _ObjectNode(0, None, None)}
+    unique_table = {}
+    for node in order:
+        low, high = objects[manager.node_low[node] >> 1], objects[manager.node_high[node] >> 1]
+        obj = _ObjectNode(manager.var_name(node << 1), low, high)
+        unique_table[(obj.var, id(low), id(high))] = obj
+        objects[node] = obj
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # the objects dict only exists to translate references, it is not part of the store
+    return after - before - objects.__sizeof__()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory of the integer node store with per-node objects")
+    parser.add_argument("--pairs", type=int, default=12, help="number of (x_i, y_i) pairs, the BDD has about 2^pairs nodes")
+    args = parser.parse_args()
+
+    manager, elapsed, integer_bytes = measure_integer_store(args.pairs)
+    object_bytes = measure_object_store(manager)
+    nodes = manager.node_count
+
+    print(f"nodes: {nodes}  build: {elapsed:.3f}s")
+    print(f"integer store: {integer_bytes:>12} bytes  ({integer_bytes / nodes:.1f} bytes/node)")
+    print(f"object store:  {object_bytes:>12} bytes  ({object_bytes / nodes:.1f} bytes/node)")
+    print(f"ratio: {object_bytes / integer_bytes:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark of the parallel table writer against the serial one.
+
+Every case writes the full table of three outputs over n variables: the
+pairs x_i and y_i compared under the order x_0..x_k, y_0..y_k, whose BDD grows
+exponentially with n, the parity of all the variables, and the first one
+with the last variable negated. The table goes to os.devnull unless another
+output is given, a file keeps the copy of the slices in the measure. Each
+writer keeps its best time over the repeats, and the speedup of every number
+of workers is relative to write_table.
+
+write_table_parallel falls back to write_table on small tables and when
+fewer CPUs are available than asked for; --force times the split path
+anyway, which shows what the fallback saves.
+
+Usage: python -m benchmarks.parallel [--variables N ...] [--workers N ...] [--repeat N] [--output FILE] [--force]
+"""
+import argparse
+import os
+import platform
+import sys
+from time import perf_counter
+from typing import Dict, List, Sequence
+
+from project import parallel
+from project.emitter import BLOCK_BITS, FIRST_BLOCK_BITS, write_table
+from project.parallel import available_cpus, write_table_parallel
+from project.ROBDD import BDDManager
+
+VARIABLES = (18, 21, 23)
+WORKERS = (2, 4)
+
+
+def table_outputs(count: int) -> List:
+    """The outputs of a case over count variables, built and reduced in one manager."""
+    pairs = count // 2
+    variables = [f'x{i}' for i in range(pairs)] + [f'y{i}' for i in range(count - pairs)]
+    compare = ('or',) + tuple(('and', f'x{i}', f'y{i}') for i in range(pairs))
+    parity = variables[0]
+    for name in variables[1:]:
+        parity = ('or', ('and', parity, ('not', name)), ('and', ('not', parity), name))
+    manager = BDDManager(variables)
+    robdds = [manager.build('compare', compare), manager.build('parity', parity),
+              manager.build('masked', ('and', compare, ('not', variables[-1])))]
+    manager.reduce()
+    return robdds
+
+
+def time_table(robdds: Sequence, count: int, workers: int, output: str, force: bool = False) -> float:
+    # seconds to write the table to output, workers None is the serial writer
+    with open(output, 'w') as out:
+        start = perf_counter()
+        if workers is None:
+            write_table(robdds, count, out)
+        elif force:
+            parallel._write_slices(robdds, count, out, workers, BLOCK_BITS, FIRST_BLOCK_BITS)
+        else:
+            write_table_parallel(robdds, count, out, workers)
+        out.flush()
+        return perf_counter() - start
+
+
+def run_case(count: int, workers: Sequence[int] = WORKERS, repeat: int = 3, output: str = os.devnull,
+             force: bool = False) -> Dict:
+    robdds = table_outputs(count)
+    serial = min(time_table(robdds, count, None, output) for _ in range(repeat))
+    seconds = {n: min(time_table(robdds, count, n, output, force) for _ in range(repeat)) for n in workers}
+    return {'variables': count, 'rows': 1 << count, 'nodes': robdds[0].manager.node_count,
+            'serial': serial, 'parallel': seconds}
+
+
+def run(variables: Sequence[int] = VARIABLES, workers: Sequence[int] = WORKERS, repeat: int = 3,
+        output: str = os.devnull, force: bool = False) -> Dict:
+    """
+    Outputs:
+        dict, the environment and, for every number of variables, the seconds of the serial
+        writer and of the parallel one with every number of workers
+    """
+    return {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpus': available_cpus(),
+        'forced': force,
+        'cases': [run_case(count, workers, repeat, output, force) for count in variables],
+    }
+
+
+def format_results(results: Dict) -> List[str]:
+    workers = list(results['cases'][0]['parallel']) if results['cases'] else []
+    lines = [f"{results['cpus']} CPUs available" + (", split path forced" if results['forced'] else ""),
+             f"{'variables':>9} {'nodes':>7} {'serial':>9} " + " ".join(f"{f'-j{n}':>16}" for n in workers)]
+    for case in results['cases']:
+        cells = [f"{seconds:>8.3f} {case['serial'] / seconds:>6.2f}x" for seconds in case['parallel'].values()]
+        lines.append(f"{case['variables']:>9} {case['nodes']:>7} {case['serial']:>9.3f} " + " ".join(cells))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the parallel table writer against the serial one")
+    parser.add_argument("--variables", type=int, nargs='+', default=list(VARIABLES), help="sizes of the tables")
+    parser.add_argument("--workers", type=int, nargs='+', default=list(WORKERS), help="numbers of processes")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per writer, the best time is kept")
+    parser.add_argument("--output", default=os.devnull, help="file the tables are written to")
+    parser.add_argument("--force", action="store_true", help="split the tables even where the writer falls back to serial")
+    args = parser.parse_args()
+    print("\n".join(format_results(run(args.variables, args.workers, args.repeat, args.output, args.force))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Benchmark suite for the whole pipeline on generated programs.
+
+Every case is a program of benchmarks.generator. The tokenize, parse, build,
+reduce and emit phases are timed separately; each phase keeps the best time
+over the repeats. One more run under tracemalloc gives the peak memory. The
+results hold the number of nodes after build and reduce and the size of the
+output, and can be saved as JSON. They can also be compared with a baseline
+saved earlier, phase by phase.
+
+Usage: python -m benchmarks.suite [--case NAME ...] [--repeat N] [--output results.json] [--baseline baseline.json]
+"""
+import argparse
+import json
+import platform
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Dict, List
+
+from benchmarks.generator import generate
+from project.emitter import count_rows, ones_rows, write_rows, write_table
+from project.parser import needed_assignments, parse_tokens
+from project.ROBDD import BDDManager
+from project.tokenizer import Tokenizer
+
+PHASES = ('tokenize', 'parse', 'build', 'reduce', 'emit')
+
+# name -> parameters of the generator; emitting a show writes 2^variables rows
+CASES = {
+    'small': dict(variables=9, blocks=3, assignments=4, depth=4),
+    'wide': dict(variables=16, blocks=4, assignments=3, depth=3),
+    'deep': dict(variables=10, blocks=2, assignments=6, depth=7, operands=3),
+    'many': dict(variables=12, blocks=6, assignments=12, depth=4),
+    'show_ones': dict(variables=14, blocks=2, assignments=5, depth=5, show_ones=1.0),
+}
+
+
+class _CountingOutput:
+    # stands for the output stream, only the number of characters written is kept
+    def __init__(self):
+        self.characters = 0
+
+    def write(self, text):
+        self.characters += len(text)
+
+    def flush(self):
+        pass
+
+
+def run_program(text: str) -> Dict:
+    """
+    Runs the pipeline of CodeInterpreter on the text of a program, phase by phase.
+    Outputs:
+        dict, the seconds of every phase, the nodes after build and reduce, the rows and characters written
+    """
+    seconds = {}
+    start = perf_counter()
+    tokens = Tokenizer().tokenize(text)
+    seconds['tokenize'] = perf_counter() - start
+
+    start = perf_counter()
+    # like CodeInterpreter, the assignments no show needs are only checked
+    variables, assignments, show_instructions = parse_tokens(tokens, needed_assignments(tokens)[0])
+    seconds['parse'] = perf_counter() - start
+
+    start = perf_counter()
+    manager = BDDManager(variables)
+    trees = {}
+    for _, names in show_instructions:
+        for name in names:
+            if name not in trees:
+                trees[name] = manager.build(name, assignments.get(name, name))
+    seconds['build'] = perf_counter() - start
+    built = manager.node_count
+
+    start = perf_counter()
+    manager.reduce()
+    seconds['reduce'] = perf_counter() - start
+
+    start = perf_counter()
+    out = _CountingOutput()
+    rows = 0
+    for instruction_type, names in show_instructions:
+        roots = [trees[name] for name in names]
+        if instruction_type == 'show':
+            rows += write_table(roots, len(variables), out)
+        elif instruction_type == 'show_ones':
+            rows += write_rows(ones_rows(roots, len(variables)), out)
+        else:
+            rows += write_rows(count_rows(names, roots), out)
+    seconds['emit'] = perf_counter() - start
+
+    return {'seconds': seconds, 'nodes_built': built, 'nodes': manager.node_count,
+            'rows': rows, 'characters': out.characters}
+
+
+def run_case(name: str, parameters: Dict, seed: int = 0, repeat: int = 3, memory: bool = True) -> Dict:
+    text = generate(seed, **parameters)
+    runs = [run_program(text) for _ in range(repeat)]
+    result = {key: value for key, value in runs[0].items() if key != 'seconds'}
+    # the best of the repeats is the least disturbed by the rest of the machine
+    result['seconds'] = {phase: min(run['seconds'][phase] for run in runs) for phase in PHASES}
+    result['seconds']['total'] = sum(result['seconds'][phase] for phase in PHASES)
+    if memory:
+        # tracemalloc slows everything down, the peak comes from a run of its own
+        tracemalloc.start()
+        run_program(text)
+        result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'name': name, 'parameters': parameters, 'seed': seed, 'characters_of_program': len(text), **result}
+
+
+def run_suite(names=None, seed: int = 0, repeat: int = 3, memory: bool = True) -> Dict:
+    """
+    Inputs:
+        names: the cases to run, every case of CASES when None
+    Outputs:
+        dict, the environment and the result of every case, as saved in the JSON files
+    """
+    unknown = [name for name in names or () if name not in CASES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark case: {', '.join(unknown)}. Expected one of {', '.join(CASES)}")
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'cases': [run_case(name, CASES[name], seed, repeat, memory) for name in names or CASES],
+    }
+
+
+def compare(results: Dict, baseline: Dict) -> List[str]:
+    # one line per case present in both, the time of every phase relative to the baseline
+    before = {case['name']: case for case in baseline['cases']}
+    lines = [f"{'case':<10} " + " ".join(f"{phase:>9}" for phase in PHASES + ('total',)) + f" {'peak':>9}"]
+    for case in results['cases']:
+        old = before.get(case['name'])
+        if old is None or old['parameters'] != case['parameters'] or old['seed'] != case['seed']:
+            continue
+        ratios = [case['seconds'][phase] / old['seconds'][phase] if old['seconds'][phase] else float('nan')
+                  for phase in PHASES + ('total',)]
+        peak = f"{case['peak_bytes'] / old['peak_bytes']:>8.2f}x" if case.get('peak_bytes') and old.get('peak_bytes') else f"{'-':>9}"
+        lines.append(f"{case['name']:<10} " + " ".join(f"{ratio:>8.2f}x" for ratio in ratios) + f" {peak}")
+    return lines
+
+
+def format_results(results: Dict) -> List[str]:
+    lines = [f"{'case':<10} " + " ".join(f"{phase:>9}" for phase in PHASES + ('total',))
+             + f" {'built':>8} {'nodes':>8} {'rows':>9} {'peak KiB':>9}"]
+    for case in results['cases']:
+        peak = f"{case['peak_bytes'] / 1024:>9.0f}" if 'peak_bytes' in case else f"{'-':>9}"
+        lines.append(f"{case['name']:<10} " + " ".join(f"{case['seconds'][phase]:>9.4f}" for phase in PHASES + ('total',))
+                     + f" {case['nodes_built']:>8} {case['nodes']:>8} {case['rows']:>9} {peak}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every phase of the pipeline on generated programs")
+    parser.add_argument("--case", action="append", choices=list(CASES), help="case to run, every case by default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the best time of each phase is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run measuring the peak memory")
+    parser.add_argument("--output", help="save the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    results = run_suite(args.case, args.seed, args.repeat, not args.no_memory)
+    print("\n".join(format_results(results)))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        print()
+        print("relative to " + args.baseline)
+        print("\n".join(compare(results, baseline)))
+
+
+if __name__ == "__main__":
+    main()
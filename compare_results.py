@@ -1,13 +1,23 @@
 import sys
+from itertools import product
+
+def expand_cube(row):
+    # a '-' in a cube stands for both values, so a cube with k of them is 2^k rows
+    free = [i for i, bit in enumerate(row) if bit == '-']
+    for values in product('01', repeat=len(free)):
+        expanded = list(row)
+        for i, value in zip(free, values):
+            expanded[i] = value
+        yield [int(bit) for bit in expanded]
 
 def read_truth_table(filename):
     with open(filename, 'r') as file:
         lines = file.readlines()
     
+    # rows may be cubes, they are expanded so cube files compare against full tables
     table = []
     for line in lines:
-        row = [int(bit) for bit in line.strip().split()]
-        table.append(row)
+        table.extend(expand_cube(line.strip().split()))
     
     return table
 
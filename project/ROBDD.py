@@ -1,6 +1,10 @@
-from functools import lru_cache
-from itertools import product
-from typing import List
+import sys
+from time import perf_counter
+from array import array
+from itertools import chain, product
+from typing import Dict, List, Tuple
+
+from project.computed_table import ComputedTable, DEFAULT_CAPACITY, POLICY_FIFO, POLICY_LRU
 # Define constants for operators
 OP_NOT = 'not'
 OP_AND = 'and'
@@ -21,141 +25,901 @@ OPERATIONS = {
     OP_OR: op_or
 }
 
-class Node:
-    __slots__ = ['var', 'low', 'high', 'terminal']
-
-    def __init__(self, var, low, high):
-        self.var: int | str = var
-        self.low: Node = low
-        self.high: Node = high
-        self.terminal: bool = var in (0, 1)
-
-    def __repr__(self) -> str:
-        return f"Node({self.var})"
-
-
-class ROBDD:
-    __slots__ = ['root', 'variables', 'operation_cache', 'unique_table', 'variable_indices']
-
-    def __init__(self):
-        self.root: Node = None
-        self.variables: List[str] = []
-        self.unique_table: dict = {}
-        self.operation_cache: dict = {}
+# Node references are plain integers: the index of a node in the columns of a
+# BDDManager shifted left by one, the lowest bit marking a complemented edge,
+# which denotes the negation of the node. The only terminal is node 0, the
+# constant 0, so FALSE is the reference 0, TRUE its complement 1, and a
+# terminal's reference is also its value.
+FALSE = 0
+TRUE = 1
+TERMINAL_VAR = 0x7FFFFFFF  # level of the terminal, sorts after every variable
+EMPTY = -1                 # free slot in the hash index
+
+_MIN_INDEX_SIZE = 1 << 10
+_SIFT_MAX_GROWTH = 1.2     # a sifted variable stops moving in one direction once the store grows by this factor
+
+
+def _slot_hash(var, low, high):
+    return (var * 0x9E3779B1) ^ (low * 0x85EBCA77) ^ (high * 0xC2B2AE3D)
+
+
+def _standard_triple(f, g, h):
+    """
+    Returns (result, None, 0) when ite(f, g, h) is a terminal case, otherwise
+    (None, triple, complement) where ite(f, g, h) is ite(*triple) ^ complement
+    and f and g of the triple are regular.
+    """
+    if f <= TRUE:
+        return (g if f else h), None, 0
+    # an operand equal to f, or to its negation, is a constant under f
+    if g == f:
+        g = TRUE
+    elif g == f ^ 1:
+        g = FALSE
+    if h == f:
+        h = FALSE
+    elif h == f ^ 1:
+        h = TRUE
+    if g == h:
+        return g, None, 0
+    if g <= TRUE and h <= TRUE:
+        return (f if g else f ^ 1), None, 0
+    # f or h is h or f, f and g is g and f: the smaller reference goes first
+    if g == TRUE and h < f:
+        f, h = h, f
+    elif h == FALSE and g < f:
+        f, g = g, f
+    # not f ? g : h is f ? h : g
+    if f & 1:
+        f ^= 1
+        g, h = h, g
+    # f ? not g : not h is not (f ? g : h)
+    if g & 1:
+        return None, (f, g ^ 1, h ^ 1), 1
+    return None, (f, g, h), 0
+
+
+class BDDManager:
+    """
+    Shared node store for many ROBDDs built over the same variable order.
+
+    Nodes are not Python objects: node i is described by the i-th entry of three
+    parallel integer columns (level, low reference, high reference) and a
+    reference to it is 2 * i, or 2 * i + 1 for its negation. The low edge of a
+    stored node is never complemented, which keeps the form canonical with a
+    single terminal, makes negation a flip of one bit and lets a function and
+    its negation share their nodes. The unique table is an open-addressing
+    hash index over the columns, so the store costs a few bytes per node instead
+    of an object plus a tuple key.
+
+    The unique table and the operation cache live here instead of on each ROBDD,
+    so building the next named root reuses every node already created for the
+    previous ones.
+
+    The level of a node is the position of its variable in the current order,
+    which starts as the declaration order and can be changed by sifting
+    (reorder). level_var and var_level translate between levels and the indices
+    of the declared variables, so inputs and outputs always follow the declared
+    order whatever the internal one is.
+    """
+    __slots__ = ['variables', 'variable_indices', 'node_var', 'node_low', 'node_high',
+                 'hash_index', 'free_nodes', 'operation_cache', 'expression_cache', 'roots',
+                 'gc_runs', 'gc_freed', 'gc_seconds', 'level_var', 'var_level', 'reorder_threshold', 'reorders']
+
+    def __init__(self, variables, cache_capacity=DEFAULT_CAPACITY, cache_policy=POLICY_FIFO, reorder_threshold=None, order=None):
+        self.variables: List[str] = list(variables)  # Store variables in the original order
+        self.variable_indices = {var: idx for idx, var in enumerate(self.variables)}
+        # sifting runs by itself while building once the store holds more nodes than this, None disables it
+        self.reorder_threshold = reorder_threshold
+        # computed tables: ite results keyed on standard triples (f, g, h), compiled expressions keyed on id(expression)
+        self.operation_cache = ComputedTable(cache_capacity, cache_policy)
+        self.expression_cache = ComputedTable(cache_capacity, cache_policy)
+        self.level_var = array('i', range(len(self.variables)))  # level -> index of the declared variable
+        self.var_level = array('i', range(len(self.variables)))  # index of the declared variable -> level
+        self.reorders = 0
+        self.clear()
+        # an initial order only relabels the levels of the empty store
+        if order is not None: self.set_order(order)
 
     def clear(self):
-        self.root = None
-        self.variables = []
-        self.operation_cache = {}
-        self.unique_table = {}
-
-        self.variable_indices = {}  # New dictionary to store variable indices
-
-
-    def build(self, expression, variables, reduce=True):
-        self.clear()
-        self.variables = list(variables)  # Store variables in the original order
-        self.variable_indices = {var: idx for idx, var in enumerate(self.variables)}
-        self.root = self._build_recursive(expression)
-        if reduce: self.reduce()
-        return self
-    
-    @lru_cache(maxsize=None, typed=False)
-    def _build_recursive(self, expression):
-        # Base cases
-        if isinstance(expression, str):
-            # if the expression is a varaible then the node is a terminal node
-            if expression in self.variables:
-                return self.mk(expression, self.mk(0, None, None), self.mk(1, None, None))
-            elif expression in ('True', 'False'):
-                return self.mk(1 if expression == 'True' else 0, None, None)
+        """Drops every root, node and cached result. The variable order and the cache settings are kept."""
+        self.node_var = array('i', (TERMINAL_VAR,))
+        self.node_low = array('i', (FALSE,))
+        self.node_high = array('i', (FALSE,))
+        self.hash_index = array('i', [EMPTY]) * _MIN_INDEX_SIZE
+        self.free_nodes: List[int] = []  # released slots of the columns, reused by mk
+        self.operation_cache.clear()
+        self.expression_cache.clear()
+        self.roots: Dict[str, 'ROBDD'] = {}
+        # totals reported by gc_stats
+        self.gc_runs = 0
+        self.gc_freed = 0
+        self.gc_seconds = 0.0
+
+    def cache_stats(self) -> dict:
+        return {'operation_cache': self.operation_cache.stats(), 'expression_cache': self.expression_cache.stats()}
+
+    def __getitem__(self, name) -> 'ROBDD':
+        return self.roots[name]
+
+    def __contains__(self, name) -> bool:
+        return name in self.roots
+
+    def __len__(self) -> int:
+        return len(self.roots)
+
+    @property
+    def node_count(self) -> int:
+        """Number of live internal nodes in the store, the terminal excluded."""
+        return len(self.node_var) - len(self.free_nodes) - 1
+
+    def memory_usage(self) -> int:
+        """Bytes held by the node columns and the hash index."""
+        return sum(column.itemsize * len(column) for column in
+                   (self.node_var, self.node_low, self.node_high, self.hash_index))
+
+    def var_name(self, node) -> str:
+        return self.variables[self.level_var[self.node_var[node >> 1]]]
+
+    def level(self, node) -> int:
+        return self.node_var[node >> 1]
+
+    def low(self, node) -> int:
+        # the cofactors of a complemented reference are the complements of the node's ones
+        return self.node_low[node >> 1] ^ (node & 1)
+
+    def high(self, node) -> int:
+        return self.node_high[node >> 1] ^ (node & 1)
+
+    @property
+    def order(self) -> List[str]:
+        """Names of the variables from the top level to the bottom one."""
+        return [self.variables[var] for var in self.level_var]
+
+    def build(self, name, expression, reduce=False) -> 'ROBDD':
+        """
+        Inputs:
+            name: str, the name under which the root is registered
+            expression: the parsed expression of the assignment
+            reduce: bool, whether to collect the nodes no registered root reaches right after
+                building; to build several roots, leave it off and call reduce once at the end
+        Outputs:
+            ROBDD, a view on the shared node store rooted at the built expression
+        """
+        robdd = ROBDD(self)
+        self.roots[name] = robdd
+        robdd.root = self._build(expression)
+        if reduce: robdd.reduce()
+        return robdd
+
+    def add_root(self, name, root) -> 'ROBDD':
+        """Registers a node reference built by other means, e.g. loaded from a file, like build does."""
+        robdd = ROBDD(self)
+        self.roots[name] = robdd
+        robdd.root = root
+        return robdd
+
+    def reduce(self):
+        """
+        Collects the nodes no registered root reaches, once for all of them. mk
+        only ever makes reduced nodes, so the roots themselves need no rebuilding.
+        """
+        self.collect()
+
+    def build_leaf(self, expression):
+        # if the expression is a varaible then the node is a terminal node
+        if expression in self.variable_indices:
+            return self.mk(self.var_level[self.variable_indices[expression]], FALSE, TRUE)
+        elif expression in ('True', 'False'):
+            return TRUE if expression == 'True' else FALSE
+        else:
+            raise ValueError(f"Unknown variable or constant: {expression}")
+
+    def _build(self, expression):
+        """
+        Builds the expression bottom-up on an explicit stack, so the nesting depth
+        of the expression is not limited by the Python recursion limit.
+        Subexpressions are memoised on identity in the manager: with the
+        hash-consed expressions of the parser, every distinct subexpression of
+        the program is compiled once, whichever root it is reached from.
+        """
+        table = self.expression_cache
+        built = table.entries  # id(expression) -> (expression, node), the expression is kept alive with its id
+        hits = misses = 0
+        expanded = set()
+        stack = [expression]
+        while stack:
+            expr = stack[-1]
+            if id(expr) in built:
+                stack.pop()
+                hits += 1
+                continue
+
+            # Base cases
+            if isinstance(expr, str):
+                built[id(expr)] = (expr, self.build_leaf(expr))
+                misses += 1
+                stack.pop()
+                continue
+
+            # if the expression is a tuple then it is a logical operation with
+            # the first element being the operator and the rest being the operands,
+            # the operands are built first
+            if id(expr) not in expanded:
+                expanded.add(id(expr))
+                pending = list({id(sub_expr): sub_expr for sub_expr in expr[1:] if id(sub_expr) not in built}.values())
+                hits += len(expr) - 1 - len(pending)
+                if pending:
+                    stack.extend(reversed(pending))
+                    continue
+            stack.pop()
+
+            op = expr[0]
+            if op == OP_NOT:
+                # negation flips the complement bit of the reference
+                result = built[id(expr[1])][1] ^ 1
             else:
-                raise ValueError(f"Unknown variable or constant: {expression}")
-        
-        # if the expression is a tuple then it is a logical operation with
-        # the first element being the operator and the rest being the operands
-        op = expression[0]
-    
-        
-        result = self._build_recursive(expression[1])
-        if op == 'not':
-            return self.apply(op_not, result, result)
-
-        for sub_expr in expression[2:]:
-            sub_node = self._build_recursive(sub_expr)
-            result = self.apply(OPERATIONS[op], result, sub_node)
-        
+                result = self.combine(op, [built[id(sub_expr)][1] for sub_expr in expr[1:]])
+            built[id(expr)] = (expr, result)
+            misses += 1
+            if self.reorder_threshold is not None and self.node_count > self.reorder_threshold:
+                # every compiled subexpression may still be read back, so all of them are kept alive
+                self.reorder(keep=[entry[1] for entry in built.values()])
+
+        result = built[id(expression)][1]
+        # entries are read back while the operands are combined, so the table is only trimmed once the build is over
+        table.record(hits, misses)
+        while len(built) > (table.capacity or sys.maxsize):
+            table.evict()
         return result
     
     def mk(self, var, low, high):
-        key = (var, id(low), id(high))
-        if key not in self.unique_table:
-            self.unique_table[key] = Node(var, low, high)
-        return self.unique_table[key]
+        # redundant test, both branches lead to the same node
+        if low == high:
+            return low
+        # a complemented low edge is moved up to the reference of the node
+        complement = low & 1
+        if complement:
+            low ^= 1
+            high ^= 1
+
+        node_var, node_low, node_high = self.node_var, self.node_low, self.node_high
+        hash_index = self.hash_index
+        mask = len(hash_index) - 1
+        slot = ((var * 0x9E3779B1) ^ (low * 0x85EBCA77) ^ (high * 0xC2B2AE3D)) & mask  # _slot_hash, inlined
+        node = hash_index[slot]
+        while node != EMPTY:
+            if node_low[node] == low and node_high[node] == high and node_var[node] == var:
+                return (node << 1) | complement
+            slot = (slot + 1) & mask
+            node = hash_index[slot]
+
+        free_nodes = self.free_nodes
+        if free_nodes:
+            node = free_nodes.pop()
+            node_var[node], node_low[node], node_high[node] = var, low, high
+        else:
+            node = len(node_var)
+            node_var.append(var)
+            node_low.append(low)
+            node_high.append(high)
+        hash_index[slot] = node
+
+        # keep the load factor under three quarters so probe sequences stay short
+        if 4 * (len(node_var) - len(free_nodes)) > 3 * (mask + 1):
+            self._rebuild_index(2 * len(hash_index))
+        return (node << 1) | complement
+
+    def _rebuild_index(self, size=None, live=None):
+        if live is None:
+            live = self._live_nodes()
+        if size is None:
+            size = _MIN_INDEX_SIZE
+            while 2 * size < 3 * (len(live) + 1):
+                size *= 2
+        node_var, node_low, node_high = self.node_var, self.node_low, self.node_high
+        hash_index = array('i', [EMPTY]) * size
+        mask = size - 1
+        for node in live:
+            slot = _slot_hash(node_var[node], node_low[node], node_high[node]) & mask
+            while hash_index[slot] != EMPTY:
+                slot = (slot + 1) & mask
+            hash_index[slot] = node
+        self.hash_index = hash_index
+
+    def _live_nodes(self):
+        free = set(self.free_nodes)
+        return [node for node in range(1, len(self.node_var)) if node not in free]
 
     def apply(self, op, g1, g2):
-        def apply_recursive(n1, n2):
-            if n1.terminal and n2.terminal:
-                return self.mk(op(n1.var, n2.var), None, None)
-            
-            key = (id(n1), id(n2), op)
-            if key in self.operation_cache:
-                return self.operation_cache[key]
-            
-          # Use the pre-computed indices for faster comparison
-            idx1 = self.variable_indices.get(n1.var, float('inf'))
-            idx2 = self.variable_indices.get(n2.var, float('inf'))
-            var = n1.var if idx1 <= idx2 else n2.var
-            
-            low1, high1 = (n1.low, n1.high) if var == n1.var else (n1, n1)
-            low2, high2 = (n2.low, n2.high) if var == n2.var else (n2, n2)
-
-            low = apply_recursive(low1, low2)
-            high = apply_recursive(high1, high2)
+        """
+        Combines g1 and g2 with the binary operator op, written as an ite over the
+        truth table of op, so the computed table is keyed on node triples and
+        never on the operator function.
+        """
+        when_true = self.ite(g2, TRUE if op(1, 1) else FALSE, TRUE if op(1, 0) else FALSE)
+        when_false = self.ite(g2, TRUE if op(0, 1) else FALSE, TRUE if op(0, 0) else FALSE)
+        return self.ite(g1, when_true, when_false)
 
-            result = self.mk(var, low, high)
-            self.operation_cache[key] = result
+    def ite(self, f, g, h):
+        """
+        If f then g else h, the operator every other one is built from. Terminal
+        cases return at once and every triple is put in standard form before the
+        computed table is read, so equivalent calls share one entry. The Shannon
+        expansion runs on an explicit work stack: a triple whose cofactor triples
+        are both terminal or cached is finished on the spot, otherwise a combine
+        entry is pushed below the unfinished ones and picks their results up
+        from the result stack.
+        """
+        node_var, node_low, node_high = self.node_var, self.node_low, self.node_high
+        table = self.operation_cache
+        cache = table.entries  # standard triple (f, g, h) -> result
+        limit = table.capacity or sys.maxsize
+        lru = table.policy == POLICY_LRU
+        mk = self.mk
+
+        result, key, complement = _standard_triple(f, g, h)
+        if key is None:
             return result
-    
-        return apply_recursive(g1, g2)
-
-    def reduce(self, show_ones=False):
-        self.root = self._reduce_recursive(self.root)
-        self._clean_unique_table()
-
-    @lru_cache(maxsize=None, typed=False)
-    def _reduce_recursive(self, node):
-        if node is None or node.terminal:
-            return node
+        result = table.get(key)
+        if result is not None:
+            return result ^ complement
+
+        hits = misses = 0
+        results = []
+        push_result, pop_result = results.append, results.pop
+        # entries are (triple, var, low, high, low complement, high complement), var is None for a triple to expand
+        stack = [(key, None, None, None, 0, 0)]
+        push, pop = stack.append, stack.pop
+        while stack:
+            key, var, low, high, low_complement, high_complement = pop()
+            if var is not None:
+                # combine entry, the missing cofactor results are on the result stack
+                if high is None: high = pop_result() ^ high_complement
+                if low is None: low = pop_result() ^ low_complement
+                result = cache[key] = mk(var, low, high)
+                if len(cache) > limit: table.evict()
+                push_result(result)
+                continue
+            f, g, h = key
+            var_f, var_g, var_h = node_var[f >> 1], node_var[g >> 1], node_var[h >> 1]
+            var = var_f if var_f < var_g else var_g
+            if var_h < var: var = var_h
+            # f and g are regular in a standard triple, only h may be complemented
+            if var_f == var:
+                f0, f1 = node_low[f >> 1], node_high[f >> 1]
+            else:
+                f0 = f1 = f
+            if var_g == var:
+                g0, g1 = node_low[g >> 1], node_high[g >> 1]
+            else:
+                g0 = g1 = g
+            if var_h == var:
+                h0, h1 = node_low[h >> 1] ^ (h & 1), node_high[h >> 1] ^ (h & 1)
+            else:
+                h0 = h1 = h
+
+            # the common terminal cases are settled here without building a triple
+            low_key = high_key = None
+            low_complement = high_complement = 0
+            if f0 <= TRUE:
+                low = g0 if f0 else h0
+            elif g0 == h0:
+                low = g0
+            else:
+                low, low_key, low_complement = _standard_triple(f0, g0, h0)
+                if low_key is not None:
+                    low = cache.get(low_key)
+                    if low is None:
+                        misses += 1
+                    else:
+                        hits += 1
+                        if lru: cache.move_to_end(low_key)
+                        low ^= low_complement
+            if f1 <= TRUE:
+                high = g1 if f1 else h1
+            elif g1 == h1:
+                high = g1
+            else:
+                high, high_key, high_complement = _standard_triple(f1, g1, h1)
+                if high_key is not None:
+                    high = cache.get(high_key)
+                    if high is None:
+                        misses += 1
+                    else:
+                        hits += 1
+                        if lru: cache.move_to_end(high_key)
+                        high ^= high_complement
+
+            if low is not None and high is not None:
+                result = cache[key] = mk(var, low, high)
+                if len(cache) > limit: table.evict()
+                push_result(result)
+                continue
+
+            push((key, var, low, high, low_complement, high_complement))
+            if high is None: push((high_key, None, None, None, 0, 0))
+            if low is None: push((low_key, None, None, None, 0, 0))
+
+        table.record(hits, misses)
+        return results[0] ^ complement
+
+    def combine(self, op, operands):
+        """
+        n-ary 'and' / 'or' of node references. The absorbing constant, or an
+        operand next to its own negation, decides the result at once, the neutral
+        constant and duplicates are dropped, and the rest is combined as a
+        balanced tree of pairs: each intermediate result only covers a few
+        operands, where a left fold drags one ever larger result through every
+        step. A pair that hits the absorbing constant ends it early.
+        """
+        if op == OP_AND:
+            absorbing, neutral = FALSE, TRUE
+        elif op == OP_OR:
+            absorbing, neutral = TRUE, FALSE
+        else:
+            raise ValueError(f"Unknown n-ary operator: {op}")
+
+        unique = {}
+        for node in operands:
+            if node == absorbing or node ^ 1 in unique:
+                return absorbing
+            if node != neutral:
+                unique[node] = None
+        operands = list(unique)
+        if not operands:
+            return neutral
+
+        while len(operands) > 1:
+            paired = []
+            for i in range(0, len(operands) - 1, 2):
+                f, g = operands[i], operands[i + 1]
+                # ite(f, g, 0) is f and g, ite(f, 1, g) is f or g
+                result = self.ite(f, g, FALSE) if op == OP_AND else self.ite(f, TRUE, g)
+                if result == absorbing:
+                    return absorbing
+                paired.append(result)
+            if len(operands) % 2:
+                paired.append(operands[-1])
+            operands = paired
+        return operands[0]
+
+    def reachable_nodes(self, roots) -> List[int]:
+        """Indices of the internal nodes reachable from the root references, children before parents."""
+        node_var, node_low, node_high = self.node_var, self.node_low, self.node_high
+        seen = set()
+        stack = [root >> 1 for root in roots if root > TRUE]
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            for child in (node_low[node] >> 1, node_high[node] >> 1):
+                if child and child not in seen:
+                    stack.append(child)
+        # a child always has a larger variable index than its parent
+        return sorted(seen, key=node_var.__getitem__, reverse=True)
+
+    def export_nodes(self, roots) -> Tuple[array, array, array, List[int]]:
+        """
+        Copies the nodes reachable from the root references into fresh columns,
+        renumbered children before parents, to hand them to another manager with
+        load_nodes, e.g. in a worker process.
+        Outputs:
+            the level, low and high columns, the terminal first, and the root references in them
+        """
+        nodes = self.reachable_nodes(roots)
+        renumbered = {0: 0}
+        node_var, node_low, node_high = array('i', (TERMINAL_VAR,)), array('i', (FALSE,)), array('i', (FALSE,))
+        for node in nodes:
+            renumbered[node] = len(node_var)
+            node_var.append(self.node_var[node])
+            for column, child in ((node_low, self.node_low[node]), (node_high, self.node_high[node])):
+                column.append((renumbered[child >> 1] << 1) | (child & 1))
+        return node_var, node_low, node_high, [(renumbered[root >> 1] << 1) | (root & 1) for root in roots]
+
+    def load_nodes(self, node_var, node_low, node_high):
+        """
+        Replaces the store by the columns of export_nodes, taken over a manager
+        with the same variables and order. Roots, cached results and the
+        statistics are dropped, the references of the export are valid here.
+        """
+        self.clear()
+        self.node_var, self.node_low, self.node_high = array('i', node_var), array('i', node_low), array('i', node_high)
+        self._rebuild_index(live=range(1, len(self.node_var)))
 
-        low = self._reduce_recursive(node.low)
-        high = self._reduce_recursive(node.high)
+    def sat_count(self, node, memo=None) -> int:
+        """
+        Number of assignments of all the variables on which node is 1, in one
+        pass over the nodes below it, children first, with exact integers.
+        Inputs:
+            memo: dict, node index -> count of earlier calls, pass the same one to share it between roots
+        """
+        if memo is None:
+            memo = {}
+        node_var, node_low, node_high = self.node_var, self.node_low, self.node_high
+        count = len(self.variables)
+
+        def level(index):
+            return count if index == 0 else node_var[index]
+
+        def below(child, at):
+            # assignments of the variables from level at down on which child is 1
+            index = child >> 1
+            ones = memo[index] if index else 0
+            if child & 1:
+                ones = (1 << (count - level(index))) - ones
+            # the variables skipped between at and the child are free
+            return ones << (level(index) - at)
+
+        for index in self.reachable_nodes([node]):
+            if index not in memo:
+                at = node_var[index] + 1
+                memo[index] = below(node_low[index], at) + below(node_high[index], at)
+        return below(node, 0)
+
+    def evaluate_block(self, roots, columns, width, nodes=None) -> List[int]:
+        """
+        Bit-parallel evaluation of several roots over a block of assignments. Every
+        node is evaluated once for the whole block with a multiplexer on packed bits.
+        Inputs:
+            roots: list of node references
+            columns: one int per variable index, bit r is the value of the variable in the r-th assignment
+            width: int, number of assignments in the block
+            nodes: the result of reachable_nodes(roots), pass it to reuse it across blocks
+        Outputs:
+            List[int], one int per root, bit r is the value of the root on the r-th assignment
+        """
+        if nodes is None:
+            nodes = self.reachable_nodes(roots)
+        node_var, node_low, node_high = self.node_var, self.node_low, self.node_high
+        columns = [columns[var] for var in self.level_var]  # indexed by level from here on
+        mask = (1 << width) - 1
+        values = {0: 0}  # node index -> value of the node, a complemented edge reads it inverted
+        for node in nodes:
+            # the low edge of a stored node is never complemented
+            low = values[node_low[node] >> 1]
+            high = node_high[node]
+            high = values[high >> 1] ^ (mask if high & 1 else 0)
+            # take the high value where the variable is set, the low value elsewhere
+            values[node] = low ^ ((low ^ high) & columns[node_var[node]])
+        return [values[root >> 1] ^ (mask if root & 1 else 0) for root in roots]
+
+    def restrict(self, node, level, value, memo=None):
+        """
+        Cofactor of node with the variable at level set to value.
+        Inputs:
+            memo: dict, results of earlier calls with the same level and value, filled in place
+        """
+        if memo is None:
+            memo = {}
+        node_var, node_low, node_high = self.node_var, self.node_low, self.node_high
+        # memo maps node indices to the cofactor of the regular node
+        stack = [node >> 1]
+        while stack:
+            current = stack[-1]
+            if current in memo:
+                stack.pop()
+                continue
+            var = node_var[current]
+            if var > level:
+                # the variable does not occur below its own level
+                memo[current] = current << 1
+            elif var == level:
+                memo[current] = node_high[current] if value else node_low[current]
+            else:
+                low, high = node_low[current], node_high[current]
+                if low >> 1 not in memo or high >> 1 not in memo:
+                    if high >> 1 not in memo: stack.append(high >> 1)
+                    if low >> 1 not in memo: stack.append(low >> 1)
+                    continue
+                memo[current] = self.mk(var, memo[low >> 1] ^ (low & 1), memo[high >> 1] ^ (high & 1))
+            stack.pop()
+        return memo[node >> 1] ^ (node & 1)
+
+    def collect(self, keep=()) -> dict:
+        """
+        Mark-and-sweep garbage collection of the node store, callable at any time
+        between builds. Every node reachable from a registered root or from keep is marked,
+        every other slot goes back to the free list for mk to reuse, and the
+        cached results that may point to a freed slot are dropped; an ite result
+        is kept when its triple and its result are all marked.
+        Inputs:
+            keep: extra node references to keep alive besides the registered roots
+        Outputs:
+            dict, the number of nodes freed, the number of live nodes and the seconds spent
+        """
+        start = perf_counter()
+        before = self.node_count
+        marked, live = self._mark(chain((robdd.root for robdd in self.roots.values()), keep))
+        # the sweep is a single pass over the mark bits, the hash index is rebuilt from the live nodes only
+        self.free_nodes = [node for node in range(1, len(marked)) if not marked[node]]
+        self._rebuild_index(live=live)
+        # freed references will be handed out again by mk, drop the results that may point to them
+        self.operation_cache.retain(lambda key, result: marked[result >> 1] and marked[key[0] >> 1]
+                                    and marked[key[1] >> 1] and marked[key[2] >> 1])
+        self.expression_cache.retain(lambda key, entry: marked[entry[1] >> 1])
+
+        freed = before - len(live)
+        seconds = perf_counter() - start
+        self.gc_runs += 1
+        self.gc_freed += freed
+        self.gc_seconds += seconds
+        return {'freed': freed, 'live': len(live), 'seconds': seconds}
+
+    def gc_stats(self) -> dict:
+        """Totals over every collection since the manager was created or cleared."""
+        return {'runs': self.gc_runs, 'freed': self.gc_freed, 'seconds': self.gc_seconds}
+
+    def _mark(self, roots):
+        # one mark bit per slot, indexed by the node index, so each reachable node is visited once
+        node_low, node_high = self.node_low, self.node_high
+        marked = bytearray(len(self.node_var))
+        marked[0] = 1
+        live = []
+        stack = [root >> 1 for root in roots if root is not None]
+        while stack:
+            node = stack.pop()
+            if marked[node]:
+                continue
+            marked[node] = 1
+            live.append(node)
+            stack.append(node_high[node] >> 1)
+            stack.append(node_low[node] >> 1)
+        return marked, live
+
+
+    def reorder(self, keep=()) -> dict:
+        """
+        Rudell's sifting. Every variable in turn, the ones with the most nodes
+        first, is moved through every level with adjacent-level swaps and left
+        at the level where the store was smallest. Swaps rewrite nodes in place,
+        so every live reference keeps denoting the same function and the
+        registered roots stay valid.
+        Inputs:
+            keep: extra node references to keep alive besides the registered roots
+        Outputs:
+            dict, the number of nodes before and after, the number of swaps and the seconds spent
+        """
+        def sift_all(levels, refs, released):
+            swaps = 0
+            for var in sorted(range(len(self.variables)), key=lambda var: -len(levels[self.var_level[var]])):
+                swaps += self._sift(var, levels, refs, released)
+            return swaps
+        return self._permute(sift_all, keep)
+
+    def set_order(self, order, keep=()) -> dict:
+        """
+        Moves the variables to the given order with adjacent-level swaps. On an
+        empty store this only relabels the levels.
+        Inputs:
+            order: list of every variable name, from the top level to the bottom one
+            keep: extra node references to keep alive besides the registered roots
+        Outputs:
+            dict, the same statistics as reorder
+        """
+        if sorted(order) != sorted(self.variables):
+            raise ValueError(f"An order must list every variable exactly once: {', '.join(self.variables)}")
+        targets = [self.variable_indices[name] for name in order]
+        if not self.node_count:
+            # no node to rewrite, only the levels are relabelled
+            self.level_var = array('i', targets)
+            for level, var in enumerate(targets):
+                self.var_level[var] = level
+            return {'before': 0, 'after': 0, 'swaps': 0, 'seconds': 0.0}
+
+        def move_all(levels, refs, released):
+            swaps = 0
+            for target, var in enumerate(targets):
+                # the levels above target are settled, bubble var up to it
+                for level in range(self.var_level[var] - 1, target - 1, -1):
+                    self._swap(level, levels, refs, released)
+                    swaps += 1
+            return swaps
+        return self._permute(move_all, keep)
+
+    def _permute(self, swap_levels, keep):
+        # runs swap_levels(levels, refs, released) over the per-level tables of the live nodes
+        start = perf_counter()
+        self.collect(keep)
+        before = self.node_count
+        levels, refs = self._reorder_tables(keep)
+        # slots freed by the swaps are only reused once they are over, so the computed
+        # tables can tell a dead reference from a reused one
+        released = []
+        swaps = swap_levels(levels, refs, released)
+
+        # the swaps bypass the hash index and may have freed nodes the computed tables point to
+        self.free_nodes.extend(released)
+        self._rebuild_index()
+        self.operation_cache.clear()
+        released = set(released)
+        self.expression_cache.retain(lambda key, entry: entry[1] >> 1 not in released)
+
+        after = self.node_count
+        self.reorders += 1
+        if self.reorder_threshold is not None:
+            # the next automatic reordering waits for the store to double
+            self.reorder_threshold = max(self.reorder_threshold, 2 * after)
+        return {'before': before, 'after': after, 'swaps': swaps, 'seconds': perf_counter() - start}
+
+    def _reorder_tables(self, keep):
+        # one unique table per level keyed on (low, high), and the reference count of every node
+        node_var, node_low, node_high = self.node_var, self.node_low, self.node_high
+        levels = [{} for _ in self.variables]
+        refs = array('i', [0]) * len(node_var)
+        for node in self._live_nodes():
+            low, high = node_low[node], node_high[node]
+            levels[node_var[node]][low, high] = node
+            refs[low >> 1] += 1
+            refs[high >> 1] += 1
+        for root in chain((robdd.root for robdd in self.roots.values()), keep):
+            if root is not None:
+                refs[root >> 1] += 1
+        return levels, refs
+
+    def _sift(self, var, levels, refs, released):
+        # moves var to the closer end first, then to the other one, then back to the best level seen
+        last = len(levels) - 1
+        level = self.var_level[var]
+        best_size, best_level = sum(map(len, levels)), level
+        swaps = 0
+        for end in ((0, last) if level <= last - level else (last, 0)):
+            while level != end:
+                if end > level:
+                    self._swap(level, levels, refs, released)
+                    level += 1
+                else:
+                    self._swap(level - 1, levels, refs, released)
+                    level -= 1
+                swaps += 1
+                size = sum(map(len, levels))
+                if size < best_size:
+                    best_size, best_level = size, level
+                elif size > _SIFT_MAX_GROWTH * best_size:
+                    break
+        while level != best_level:
+            if best_level > level:
+                self._swap(level, levels, refs, released)
+                level += 1
+            else:
+                self._swap(level - 1, levels, refs, released)
+                level -= 1
+            swaps += 1
+        return swaps
 
+    def _swap(self, level, levels, refs, released):
+        """
+        Exchanges the variables at level and level + 1. A node on the upper level
+        that does not test the lower variable just moves down a level. One that
+        does is rewritten in place as a node of the lower variable over two new
+        nodes of the upper one, and the lower nodes it no longer uses are freed.
+        """
+        node_var, node_low, node_high = self.node_var, self.node_low, self.node_high
+        upper, lower = levels[level], levels[level + 1]
+        new_upper, new_lower = {}, {}
+        for key, node in lower.items():
+            node_var[node] = level
+            new_upper[key] = node
+        # a child of an upper node is never on the upper level, so a child on it now is a lower node
+        rewritten = []
+        for (low, high), node in upper.items():
+            if node_var[low >> 1] == level or node_var[high >> 1] == level:
+                rewritten.append(node)
+            else:
+                node_var[node] = level + 1
+                new_lower[low, high] = node
+        levels[level], levels[level + 1] = new_upper, new_lower
+
+        for node in rewritten:
+            f0, f1 = node_low[node], node_high[node]
+            f00, f01 = (self.low(f0), self.high(f0)) if node_var[f0 >> 1] == level else (f0, f0)
+            f10, f11 = (self.low(f1), self.high(f1)) if node_var[f1 >> 1] == level else (f1, f1)
+            # f0 is not complemented, so neither is the new low edge
+            low = self._mk_level(level + 1, f00, f10, levels, refs)
+            high = self._mk_level(level + 1, f01, f11, levels, refs)
+            refs[low >> 1] += 1
+            refs[high >> 1] += 1
+            node_low[node], node_high[node] = low, high
+            new_upper[low, high] = node
+            self._release(f0, levels, refs, released)
+            self._release(f1, levels, refs, released)
+
+        var_upper, var_lower = self.level_var[level], self.level_var[level + 1]
+        self.level_var[level], self.level_var[level + 1] = var_lower, var_upper
+        self.var_level[var_lower], self.var_level[var_upper] = level, level + 1
+
+    def _mk_level(self, level, low, high, levels, refs):
+        # mk over the per-level tables of a reordering, the hash index is stale until it ends
         if low == high:
             return low
+        complement = low & 1
+        if complement:
+            low ^= 1
+            high ^= 1
+        table = levels[level]
+        node = table.get((low, high))
+        if node is None:
+            if self.free_nodes:
+                node = self.free_nodes.pop()
+                self.node_var[node], self.node_low[node], self.node_high[node] = level, low, high
+            else:
+                node = len(self.node_var)
+                self.node_var.append(level)
+                self.node_low.append(low)
+                self.node_high.append(high)
+                refs.append(0)
+            table[low, high] = node
+            refs[low >> 1] += 1
+            refs[high >> 1] += 1
+        return (node << 1) | complement
+
+    def _release(self, node, levels, refs, released):
+        # drops one reference to node, freeing it and releasing its children when it was the last one
+        node_var, node_low, node_high = self.node_var, self.node_low, self.node_high
+        stack = [node >> 1]
+        while stack:
+            node = stack.pop()
+            if not node:
+                continue
+            refs[node] -= 1
+            if refs[node] == 0:
+                low, high = node_low[node], node_high[node]
+                del levels[node_var[node]][low, high]
+                released.append(node)
+                stack.append(low >> 1)
+                stack.append(high >> 1)
 
-        if low.terminal and high.terminal and low.var == high.var:
-            return low
 
-        return self.mk(node.var, low, high)
+class ROBDD:
+    """
+    A single root inside a BDDManager. Several ROBDDs can share the same manager,
+    in which case they share every node of their common subgraphs.
+    """
+    __slots__ = ['root', 'manager']
 
+    def __init__(self, manager: BDDManager = None):
+        self.root: int = None
+        self.manager: BDDManager = manager
 
+    @property
+    def variables(self) -> List[str]:
+        return self.manager.variables if self.manager is not None else []
 
-    def _clean_unique_table(self):
-        new_unique_table = {}
-        self._mark_reachable_nodes(self.root, new_unique_table)
-        self.unique_table = new_unique_table
+    @property
+    def variable_indices(self) -> dict:
+        return self.manager.variable_indices if self.manager is not None else {}
 
+    @property
+    def operation_cache(self) -> ComputedTable:
+        return self.manager.operation_cache if self.manager is not None else None
 
-    # TODO: This is a bit of a hack, we should probably use a proper graph traversal algorithm to mark all reachable nodes
-    def _mark_reachable_nodes(self, node, new_table):
-        if node is None or node in new_table.values():
-            return
-        if not node.terminal:
-            key = (node.var, id(node.low), id(node.high))
-            new_table[key] = node
-            self._mark_reachable_nodes(node.low, new_table)
-            self._mark_reachable_nodes(node.high, new_table)
+    def clear(self):
+        self.root = None
+        self.manager = None
+
+    def build(self, expression, variables, reduce=True):
+        # a standalone build gets a private manager, use BDDManager.build to share nodes between roots
+        self.clear()
+        self.manager = BDDManager(variables)
+        self.manager.roots[None] = self
+        self.root = self.manager._build(expression)
+        if reduce: self.reduce()
+        return self
+
+    def mk(self, var, low, high):
+        return self.manager.mk(var, low, high)
+
+    def apply(self, op, g1, g2):
+        return self.manager.apply(op, g1, g2)
+
+    def reduce(self, show_ones=False):
+        # the nodes are reduced as mk makes them, only the ones no root reaches are left to drop
+        self.manager.collect()
+
+    def reorder(self) -> dict:
+        # sifting moves the variables of every root of the manager, not only this one
+        return self.manager.reorder()
 
 
     def evaluate(self, var_assignment:dict) -> int:
@@ -166,19 +930,57 @@ class ROBDD:
             int, the result of the evaluation of the ROBDD. Either 0 or 1
         """
         node = self.root
+        manager = self.manager
+        # the declared name of the variable of a node, without building the list of manager.order
+        variables, level_var = manager.variables, manager.level_var
+        node_var, node_low, node_high = manager.node_var, manager.node_low, manager.node_high
         # Create a closure to get the assigned value for a variable
         get = var_assignment.get
-        while not node.terminal:
-            # extract what the assigned value for the current node is
-            if get(node.var):
-                node = node.high # go to the high branch if the value is True
+        while node > TRUE:
+            # extract what the assigned value for the current node is,
+            # a complemented edge complements everything below it
+            if get(variables[level_var[node_var[node >> 1]]]):
+                node = node_high[node >> 1] ^ (node & 1) # go to the high branch if the value is True
             else:
-                node = node.low
+                node = node_low[node >> 1] ^ (node & 1)
         
-        return node.var
+        return node
     
 
     
+    def evaluate_values(self, values) -> int:
+        """
+        Inputs:
+            values: sequence of 0/1, the value of every variable in the order of the manager's variables
+        Outputs:
+            int, the result of the evaluation of the ROBDD. Either 0 or 1
+        """
+        node = self.root
+        manager = self.manager
+        level_var, node_var, node_low, node_high = manager.level_var, manager.node_var, manager.node_low, manager.node_high
+        while node > TRUE:
+            index = node >> 1
+            node = (node_high[index] if values[level_var[node_var[index]]] else node_low[index]) ^ (node & 1)
+        return node
+
+    def sat_count(self) -> int:
+        """Number of assignments of the variables on which the ROBDD is 1, the size of its show_ones table."""
+        return self.manager.sat_count(self.root)
+
+    def sat_fraction(self) -> float:
+        """Fraction of all the assignments on which the ROBDD is 1."""
+        return self.sat_count() / (1 << len(self.variables))
+
+    def evaluate_block(self, columns, width) -> int:
+        """
+        Inputs:
+            columns: one int per variable index, bit r is the value of the variable in the r-th assignment
+            width: int, number of assignments in the block
+        Outputs:
+            int, bit r is the result of the evaluation on the r-th assignment
+        """
+        return self.manager.evaluate_block([self.root], columns, width)[0]
+
     def show(self):
         if self.root is None:
             raise ValueError("ROBDD is empty. Build a ROBDD first.")
@@ -207,12 +1009,13 @@ class ROBDD:
         del assignment[self.variables[var_index]]
 
     def _evaluate(self, node, assignment):
-        while not node.terminal:
-            if assignment[node.var]:
-                node = node.high
+        manager = self.manager
+        while node > TRUE:
+            if assignment[manager.var_name(node)]:
+                node = manager.high(node)
             else:
-                node = node.low
-        return node.var
+                node = manager.low(node)
+        return node
 
 
     def show_ones(self):
@@ -225,45 +1028,51 @@ class ROBDD:
 #        indent = "  " * debug_level
 #        print(f"{indent}Visiting node: {node.var}, var_index: {var_index}")
         
-        if node.var == '1':
+        if node == TRUE:
 #            print(f"{indent}Found 1-terminal, printing assignment:")
             self._print_assignments(assignment, var_index)
             return
-        if node.var == '0':
+        if node == FALSE:
 #            print(f"{indent}Found 0-terminal, backtracking")
             return
 
-        current_var_index = self.variables.index(node.var)
+        var = self.manager.var_name(node)
+        current_var_index = self.manager.level(node)
 #        print(f"{indent}Current variable: {node.var}, index: {current_var_index}")
 
         # Handle skipped variables
         for i in range(var_index, current_var_index):
-#            print(f"{indent}Assigning 0 to skipped variable: {self.variables[i]}")
-            assignment[self.variables[i]] = 0
+#            print(f"{indent}Assigning 0 to skipped variable: {self._level_name(i)}")
+            assignment[self._level_name(i)] = 0
         
 #        print(f"{indent}Exploring low branch (0) for {node.var}")
-        assignment[node.var] = 0
-        self._show_ones_recursive(node.low, assignment, current_var_index + 1, debug_level + 1)
+        assignment[var] = 0
+        self._show_ones_recursive(self.manager.low(node), assignment, current_var_index + 1, debug_level + 1)
 
         #print(f"{indent}Exploring high branch (1) for {node.var}")
-        assignment[node.var] = 1
-        self._show_ones_recursive(node.high, assignment, current_var_index + 1, debug_level + 1)
+        assignment[var] = 1
+        self._show_ones_recursive(self.manager.high(node), assignment, current_var_index + 1, debug_level + 1)
 
 #        print(f"{indent}Backtracking: removing assignments from {var_index} to {current_var_index}")
         for i in range(var_index, current_var_index + 1):
-            del assignment[self.variables[i]]
+            del assignment[self._level_name(i)]
 
     def _print_assignments(self, assignment, start_index):
         if start_index == len(self.variables):
             print(" ".join(str(int(assignment.get(var, 0))) for var in self.variables))
             return
 
-        assignment[self.variables[start_index]] = 0
+        assignment[self._level_name(start_index)] = 0
         self._print_assignments(assignment, start_index + 1)
-        assignment[self.variables[start_index]] = 1
+        assignment[self._level_name(start_index)] = 1
         self._print_assignments(assignment, start_index + 1)
-        del assignment[self.variables[start_index]]
+        del assignment[self._level_name(start_index)]
     
+    def _level_name(self, level):
+        # the walk above goes through the levels, the printed columns follow the declared order
+        manager = self.manager
+        return manager.variables[manager.level_var[level]]
+
     def print_robdd(self):
         print("ROBDD Structure:")
         if self.root is None:
@@ -274,19 +1083,19 @@ class ROBDD:
             if node is None:
                 return
             
-            if node.var in (0, 1):  # Terminal node
-                print(f"{prefix}{'└── ' if is_left else '┌── '}[{node.var}]")
+            if node in (FALSE, TRUE):  # Terminal node
+                print(f"{prefix}{'└── ' if is_left else '┌── '}[{node}]")
                 return
 
-            print(f"{prefix}{'└── ' if is_left else '┌── '}{node.var}")
+            print(f"{prefix}{'└── ' if is_left else '┌── '}{self.manager.var_name(node)}")
 
             new_prefix = prefix + ("    " if is_left else "│   ")
 
             # Print the high branch first (going right in the visualization)
-            print_recursive(node.high, new_prefix, False)
+            print_recursive(self.manager.high(node), new_prefix, False)
             
             # Then print the low branch
-            print_recursive(node.low, new_prefix, True)
+            print_recursive(self.manager.low(node), new_prefix, True)
 
         print_recursive(self.root, "", True)
 
@@ -298,21 +1107,22 @@ class ROBDD:
     def _find_paths_to_one_recursive(self, node, current_path, paths):
         if node is None:
             return
-        if node.terminal:
-            if node.var == 1:
+        if node in (FALSE, TRUE):
+            if node == TRUE:
                 paths.append(current_path.copy())
             return
 
+        var = self.manager.var_name(node)
         # Explore the high branch (variable is True)
-        current_path[node.var] = True
-        self._find_paths_to_one_recursive(node.high, current_path, paths)
+        current_path[var] = True
+        self._find_paths_to_one_recursive(self.manager.high(node), current_path, paths)
 
         # Explore the low branch (variable is False)
-        current_path[node.var] = False
-        self._find_paths_to_one_recursive(node.low, current_path, paths)
+        current_path[var] = False
+        self._find_paths_to_one_recursive(self.manager.low(node), current_path, paths)
 
         # Remove the current variable from the path
-        del current_path[node.var]
+        del current_path[var]
 
     def get_complete_assignments_to_one(self):
         partial_paths = self.find_paths_to_one()
@@ -0,0 +1,175 @@
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from glob import glob
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from project.bddcache import BDDCache, DEFAULT_MAX_BYTES
+from project.ordering import HEURISTIC_DECLARED
+from project.runner import CodeInterpreter
+
+try:
+    import resource
+except ImportError:  # not available on Windows, the memory cap is then ignored
+    resource = None
+
+# Outcome of one instance
+STATUS_OK = 'ok'
+STATUS_TIMEOUT = 'timeout'
+STATUS_MEMORY = 'memory'
+STATUS_ERROR = 'error'
+
+OUTPUT_SUFFIX = '.out'
+
+
+class InstanceTimeout(Exception):
+    pass
+
+
+def instance_files(source: str) -> List[str]:
+    """
+    Inputs:
+        source: str, a directory, whose *.txt files are taken, or a glob pattern
+    Outputs:
+        List[str], the sorted paths of the instances
+    """
+    if os.path.isdir(source):
+        source = os.path.join(source, '*.txt')
+    return sorted(path for path in glob(source) if os.path.isfile(path))
+
+
+def output_file(path: str, output_dir: str) -> str:
+    # instances with the same name in different directories would collide, the batch takes one name space
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + OUTPUT_SUFFIX)
+
+
+def _limit_memory(memory_mb: Optional[int]) -> None:
+    # pool initializer, the cap holds for every instance the worker runs
+    if memory_mb is None or resource is None:
+        return
+    limit = memory_mb << 20
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _on_alarm(signum, frame):
+    raise InstanceTimeout()
+
+
+def run_instance(path: str, output_path: str, timeout: Optional[float] = None, options: Optional[dict] = None) -> Dict:
+    """
+    Runs CodeInterpreter on one instance and writes its tables to output_path.
+    The tables go to a temporary file renamed once they are complete, so an
+    instance that fails leaves no output behind.
+    Outputs:
+        dict with the input, output, status, seconds, bytes written and error message
+    """
+    result = {'input': path, 'output': output_path, 'status': STATUS_OK, 'seconds': 0.0, 'bytes': 0, 'error': None}
+    partial = output_path + '.partial'
+    # timeouts use SIGALRM, so they only apply where it exists
+    alarm = timeout is not None and hasattr(signal, 'SIGALRM')
+    start = perf_counter()
+    try:
+        if alarm:
+            previous = signal.signal(signal.SIGALRM, _on_alarm)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            options = dict(options or {})
+            if 'cache' in options:
+                # every worker opens the shared directory itself, the entries are safe to share between processes
+                options['cache'] = BDDCache(*options['cache'])
+            with open(partial, 'w') as out:
+                CodeInterpreter(path, out=out, **options).interpet()
+        finally:
+            if alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, previous)
+        os.replace(partial, output_path)
+        result['bytes'] = os.path.getsize(output_path)
+    except InstanceTimeout:
+        result['status'] = STATUS_TIMEOUT
+        result['error'] = f"exceeded {timeout}s"
+    except MemoryError:
+        result['status'] = STATUS_MEMORY
+        result['error'] = "exceeded the memory cap"
+    except Exception as e:
+        result['status'] = STATUS_ERROR
+        result['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        result['seconds'] = perf_counter() - start
+        if result['status'] != STATUS_OK and os.path.exists(partial):
+            os.remove(partial)
+    return result
+
+
+def _run_task(task) -> Dict:
+    return run_instance(*task)
+
+
+def run_batch(paths: List[str], output_dir: str, workers: Optional[int] = None, timeout: Optional[float] = None,
+              memory_mb: Optional[int] = None, reorder_threshold: Optional[int] = None,
+              heuristic: str = HEURISTIC_DECLARED, cubes: bool = False, cache_dir: Optional[str] = None,
+              cache_bytes: int = DEFAULT_MAX_BYTES) -> List[Dict]:
+    """
+    Runs every instance in a pool of worker processes, one output file per
+    instance in output_dir. Instances are handed out in chunks so thousands of
+    small files do not cost a round trip each.
+    Inputs:
+        workers: int, number of processes, os.cpu_count() when None
+        timeout: float, seconds an instance may take, None for no limit
+        memory_mb: int, address space cap of every worker in MiB, None for no limit
+        cache_dir: str, directory of the BDDCache shared by the workers, None for no cache
+    Outputs:
+        List[dict], the result of every instance (see run_instance), in the order of paths
+    """
+    if workers is not None and workers < 1:
+        raise ValueError("Expected at least one worker")
+    os.makedirs(output_dir, exist_ok=True)
+    options = {'reorder_threshold': reorder_threshold, 'heuristic': heuristic, 'cubes': cubes}
+    if cache_dir is not None:
+        options['cache'] = (cache_dir, cache_bytes)
+    tasks = [(path, output_file(path, output_dir), timeout, options) for path in paths]
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    chunksize = max(1, len(tasks) // (4 * workers))
+
+    results = []
+    try:
+        with ProcessPoolExecutor(workers, initializer=_limit_memory, initargs=(memory_mb,)) as executor:
+            for result in executor.map(_run_task, tasks, chunksize=chunksize):
+                results.append(result)
+    except BrokenProcessPool:
+        # a worker was killed, typically by the system for memory, the rest of the batch is lost with it
+        for path, output_path, _, _ in tasks[len(results):]:
+            results.append({'input': path, 'output': output_path, 'status': STATUS_MEMORY, 'seconds': 0.0,
+                            'bytes': 0, 'error': "the worker process died"})
+    return results
+
+
+def summary(results: List[Dict], seconds: float) -> Dict:
+    # aggregate throughput of a batch that took seconds of wall time
+    statuses = {}
+    for result in results:
+        statuses[result['status']] = statuses.get(result['status'], 0) + 1
+    written = sum(result['bytes'] for result in results)
+    return {
+        'instances': len(results),
+        'statuses': statuses,
+        'seconds': seconds,
+        'cpu_seconds': sum(result['seconds'] for result in results),
+        'instances_per_second': len(results) / seconds if seconds else 0.0,
+        'bytes': written,
+        'bytes_per_second': written / seconds if seconds else 0.0,
+    }
+
+
+def format_summary(stats: Dict) -> str:
+    statuses = ", ".join(f"{status} {count}" for status, count in sorted(stats['statuses'].items()))
+    return "\n".join([
+        f"instances   {stats['instances']} ({statuses or 'none'})",
+        f"wall time   {stats['seconds']:.3f}s, {stats['cpu_seconds']:.3f}s in the instances",
+        f"throughput  {stats['instances_per_second']:.1f} instances/s, {stats['bytes_per_second'] / (1 << 20):.2f} MiB/s written",
+    ])
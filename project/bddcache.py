@@ -0,0 +1,240 @@
+import os
+import tempfile
+import time
+from hashlib import blake2b
+from typing import Dict, List, Optional, Tuple
+
+from project import bddfile
+from project.ROBDD import OP_NOT, BDDManager, ROBDD
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, eviction then runs without the lock
+    fcntl = None
+
+DEFAULT_MAX_BYTES = 256 << 20
+LOW_WATER = 0.8         # eviction brings the cache down to this fraction of its limit
+STALE_SECONDS = 3600    # temporary files older than this were left by a writer that died
+SUFFIX = '.bdd'
+LOCK_FILE = 'lock'
+# changes whenever the normalisation or the file format does, the older entries are then never read
+KEY_VERSION = b'1.%d' % bddfile.VERSION
+
+
+def _digest(*parts: bytes) -> bytes:
+    return blake2b(b'\0'.join(parts), digest_size=16).digest()
+
+
+class ExpressionDigests:
+    """
+    Normalised digests of the expressions of the parser, memoised on identity
+    like the expression cache of the manager, so with the hash-consed
+    expressions of the parser every subexpression of a program is hashed once.
+    The operands of and/or are sorted and deduplicated and a double negation
+    cancels, so the same function written with its operands in another order
+    hashes the same.
+    """
+    __slots__ = ['entries', 'bits', 'names']
+
+    def __init__(self) -> None:
+        self.entries = {} # id(expression) -> (expression, digest, bit mask of its leaves), the expression is kept alive with its id
+        self.bits: Dict[str, int] = {} # name of a leaf -> its bit in the masks
+        self.names: List[str] = []
+
+    def digest(self, expression) -> Tuple[bytes, List[str]]:
+        """
+        Inputs:
+            expression: an expression of the parser
+        Outputs:
+            the digest and the names of the leaves, variables or constants
+        """
+        entries, bits = self.entries, self.bits
+        # bottom-up on an explicit stack, the nesting depth is not limited by the recursion limit
+        stack = [expression]
+        while stack:
+            expr = stack[-1]
+            if id(expr) in entries:
+                stack.pop()
+                continue
+            if isinstance(expr, str):
+                bit = bits.get(expr)
+                if bit is None:
+                    bit = bits[expr] = 1 << len(self.names)
+                    self.names.append(expr)
+                entries[id(expr)] = (expr, _digest(b'v', expr.encode('utf-8')), bit)
+                stack.pop()
+                continue
+            pending = [sub_expr for sub_expr in expr[1:] if id(sub_expr) not in entries]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+
+            operands = [entries[id(sub_expr)] for sub_expr in expr[1:]]
+            mask = 0
+            for operand in operands:
+                mask |= operand[2]
+            if expr[0] == OP_NOT and not isinstance(expr[1], str) and expr[1][0] == OP_NOT:
+                # not not x is x
+                entries[id(expr)] = (expr, entries[id(expr[1][1])][1], mask)
+            else:
+                digests = sorted({operand[1] for operand in operands})
+                entries[id(expr)] = (expr, _digest(expr[0].encode('utf-8'), *digests), mask)
+        _, digest, mask = entries[id(expression)]
+        return digest, [name for i, name in enumerate(self.names) if mask >> i & 1]
+
+
+class BDDCache:
+    """
+    Content-addressed cache of compiled BDDs on disk, shared between runs and
+    between processes. The key of an expression is its normalised digest with
+    the order of its variables in the manager; the entry is the BDD in the
+    format of bddfile, restricted to the variables it tests, so it fits every
+    program declaring them in the same relative order.
+
+    Entries are written to a temporary file renamed into place, readers never
+    see a partial one. A hit touches its file, and once the cache grows past
+    max_bytes the least recently used entries are removed until it is back
+    under LOW_WATER of it, by one process at a time when fcntl is available.
+    An entry that is missing, removed meanwhile or corrupt is a miss.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        if max_bytes <= 0:
+            raise ValueError("Expected a positive cache size")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = None # bytes of the entries, scanned on the first write and then counted
+        self.hits = self.misses = self.writes = self.evictions = self.errors = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, manager: BDDManager, expression, digests: Optional[ExpressionDigests] = None) -> str:
+        digest, support = (digests or ExpressionDigests()).digest(expression)
+        variables = sorted((name for name in support if name in manager.variable_indices),
+                           key=lambda name: manager.var_level[manager.variable_indices[name]])
+        return blake2b(b'\0'.join([KEY_VERSION, digest] + [name.encode('utf-8') for name in variables]),
+                       digest_size=16).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key[2:] + SUFFIX)
+
+    def load(self, manager: BDDManager, key: str) -> Optional[int]:
+        """
+        Outputs:
+            the node reference of the entry in the manager, None on a miss
+        """
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            root, = bddfile.loads(data, manager).values()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError):
+            # a corrupt entry is rebuilt and written over
+            self.errors += 1
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return root
+
+    def store(self, manager: BDDManager, key: str, root: int) -> None:
+        data = bddfile.dumps(manager, {'': root}, support_only=True)
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(data)
+            os.replace(temporary, path)
+        except OSError:
+            # e.g. the disk is full or the directory was evicted meanwhile, the cache is best effort
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return
+        self.writes += 1
+        if self.size is None:
+            self.size = self._scan()[1]
+        else:
+            self.size += len(data)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def build(self, manager: BDDManager, name: str, expression, digests: Optional[ExpressionDigests] = None) -> ROBDD:
+        """
+        manager.build through the cache: the entry of the expression is loaded
+        when there is one, otherwise the expression is built and written.
+        Inputs:
+            digests: ExpressionDigests, pass the same one for every output of a program
+        """
+        if digests is None:
+            digests = ExpressionDigests()
+        key = self.key(manager, expression, digests)
+        root = self.load(manager, key)
+        if root is not None:
+            return manager.add_root(name, root)
+        robdd = manager.build(name, expression)
+        # reordering while building changes the order the entry is valid for
+        self.store(manager, self.key(manager, expression, digests), robdd.root)
+        return robdd
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache is under LOW_WATER of max_bytes."""
+        lock = None
+        if fcntl is not None:
+            lock = open(os.path.join(self.directory, LOCK_FILE), 'a')
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                # another process is evicting, it brings the cache down for everyone
+                lock.close()
+                self.size = None
+                return
+        try:
+            entries, size = self._scan()
+            entries.sort()
+            target = self.max_bytes * LOW_WATER
+            for _, entry_size, path in entries:
+                if size <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                size -= entry_size
+                self.evictions += 1
+            self.size = size
+        finally:
+            if lock is not None:
+                lock.close()
+
+    def _scan(self):
+        # (mtime, bytes, path) of every entry and their total bytes, stale temporary files are removed
+        entries, size = [], 0
+        stale = time.time() - STALE_SECONDS
+        for directory in os.scandir(self.directory):
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith(SUFFIX):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    size += stat.st_size
+                elif entry.name.endswith('.tmp') and stat.st_mtime < stale:
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+        return entries, size
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'writes': self.writes,
+                'evictions': self.evictions, 'errors': self.errors}
@@ -0,0 +1,325 @@
+"""
+Binary format of a set of named BDD roots.
+
+    header      struct HEADER: magic b'RBDD', version, flags (0), number of
+                variables, of roots and of nodes
+    variables   u32 byte length, then the names from the top level down,
+                UTF-8, separated by '\n', padded with NUL to 4 bytes
+    root names  the same layout
+    roots       one i32 reference per root
+    nodes       one record of three i32 per node: level, low, high
+
+Every integer is little-endian and every section starts on a multiple of 4
+bytes. References are those of the manager: the node index shifted left by
+one, the lowest bit marking a complemented edge. Node i is record i, the
+first one is the terminal, with level TERMINAL_VAR, and children always come
+before their parents.
+
+The records are read in place: on a little-endian machine the level, low and
+high columns are strided views into the buffer, so a file mapped with
+MappedBDD is evaluated and enumerated without copying it or creating an
+object per node.
+"""
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Dict, Iterator, List, Tuple
+
+from project.ROBDD import BDDManager, FALSE, TERMINAL_VAR, TRUE
+
+MAGIC = b'RBDD'
+VERSION = 2
+HEADER = struct.Struct('<4sHHIII')
+_LENGTH = struct.Struct('<I')
+_LEVEL = struct.Struct('<i')
+_RECORD = 3  # integers per node
+
+
+def _pack_names(names: List[str]) -> bytes:
+    data = "\n".join(names).encode('utf-8')
+    return _LENGTH.pack(len(data)) + data + b'\0' * (-len(data) % 4)
+
+
+def _unpack_names(data, offset: int, count: int) -> Tuple[List[str], int]:
+    (length,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    text = bytes(data[offset:offset + length]).decode('utf-8')
+    names = text.split("\n") if count else []
+    if len(names) != count:
+        raise ValueError(f"Expected {count} names in the BDD file, found {len(names)}")
+    return names, offset + length + (-length % 4)
+
+
+def _integers(data: memoryview):
+    # the bytes as int32, in place when the machine is little-endian like the file
+    if sys.byteorder == 'little':
+        return data.cast('i')
+    column = array('i')
+    column.frombytes(data)
+    column.byteswap()
+    return column
+
+
+def _little_endian(column: array) -> array:
+    if sys.byteorder != 'little':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column
+
+
+def dumps(manager: BDDManager, roots: Dict[str, int], support_only: bool = False) -> bytes:
+    """
+    Inputs:
+        roots: dict, name -> node reference in the manager
+        support_only: bool, keep only the variables the nodes test, renumbering the levels; the
+            file then fits any manager in which these variables come in the same relative order
+    Outputs:
+        bytes of the file
+    """
+    node_var, node_low, node_high, references = manager.export_nodes(list(roots.values()))
+    variables = manager.order
+    if support_only:
+        support = sorted(set(node_var[1:]))
+        rank = {level: i for i, level in enumerate(support)}
+        rank[TERMINAL_VAR] = TERMINAL_VAR
+        node_var = array('i', [rank[level] for level in node_var])
+        variables = [variables[level] for level in support]
+
+    records = array('i', [0]) * (_RECORD * len(node_var))
+    records[0::_RECORD] = node_var
+    records[1::_RECORD] = node_low
+    records[2::_RECORD] = node_high
+    return b''.join([
+        HEADER.pack(MAGIC, VERSION, 0, len(variables), len(references), len(node_var)),
+        _pack_names(variables),
+        _pack_names(list(roots)),
+        _little_endian(array('i', references)).tobytes(),
+        _little_endian(records).tobytes(),
+    ])
+
+
+def dump(manager: BDDManager, roots: Dict[str, int], path: str, support_only: bool = False) -> None:
+    """Writes dumps to path through a temporary file, the file is never seen half written."""
+    descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(dumps(manager, roots, support_only))
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def _layout(data: memoryview) -> Tuple[List[str], List[str], int, int]:
+    # the names and the offsets of the roots and of the nodes, once the whole layout is checked
+    if len(data) < HEADER.size:
+        raise ValueError("Truncated BDD file")
+    magic, version, _, variable_count, root_count, node_count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a BDD file")
+    if version != VERSION:
+        raise ValueError(f"Unsupported BDD file version {version}, expected {VERSION}")
+    try:
+        variables, offset = _unpack_names(data, HEADER.size, variable_count)
+        names, offset = _unpack_names(data, offset, root_count)
+    except struct.error:
+        raise ValueError("Truncated BDD file") from None
+    nodes = offset + 4 * root_count
+    end = nodes + 4 * _RECORD * node_count
+    if len(data) != end:
+        raise ValueError(f"BDD file of {len(data)} bytes, expected {end}")
+    if node_count < 1 or _LEVEL.unpack_from(data, nodes)[0] != TERMINAL_VAR:
+        raise ValueError("The first node of the BDD file is not the terminal")
+    return variables, names, offset, nodes
+
+
+def read(data) -> Tuple[List[str], List[str], Dict[str, int], Tuple]:
+    """
+    Parses and checks the layout of a file, the nodes themselves are not checked.
+    Outputs:
+        the variables from the top level down, the root names, dict root name -> reference,
+        and the level, low and high columns indexed by node
+    """
+    data = memoryview(data)
+    try:
+        variables, names, offset, nodes = _layout(data)
+    except ValueError:
+        # a view left in the traceback would keep a mapped file from being closed
+        data.release()
+        raise
+    records = _integers(data[nodes:])
+    roots = dict(zip(names, _integers(data[offset:nodes])))
+    return variables, names, roots, (records[0::_RECORD], records[1::_RECORD], records[2::_RECORD])
+
+
+def loads(data, manager: BDDManager) -> Dict[str, int]:
+    """
+    Adds the nodes of a file, bytes or any buffer such as a mapped file, to the
+    manager, which must declare all of its variables. When they come in the
+    same relative order in the manager the nodes are inserted with mk as they
+    are; otherwise every node is rebuilt with ite, which reorders it.
+    Outputs:
+        dict, root name -> node reference in the manager
+    """
+    variables, _, roots, (node_var, node_low, node_high) = read(data)
+    try:
+        levels = [manager.var_level[manager.variable_indices[name]] for name in variables]
+    except KeyError as error:
+        raise ValueError(f"Variable {error.args[0]} of the BDD file is not declared") from None
+    ordered = all(upper < lower for upper, lower in zip(levels, levels[1:]))
+
+    mk, ite = manager.mk, manager.ite
+    refs = array('i', [FALSE]) * len(node_var)
+    for node in range(1, len(refs)):
+        level, low, high = node_var[node], node_low[node], node_high[node]
+        if not (0 <= low < 2 * node and 0 <= high < 2 * node and 0 <= level < len(levels)):
+            raise ValueError(f"Corrupt node {node} in the BDD file")
+        low = refs[low >> 1] ^ (low & 1)
+        high = refs[high >> 1] ^ (high & 1)
+        if ordered:
+            refs[node] = mk(levels[level], low, high)
+        else:
+            refs[node] = ite(mk(levels[level], FALSE, TRUE), high, low)
+    for root in roots.values():
+        if not 0 <= root < 2 * len(refs):
+            raise ValueError(f"Corrupt root {root} in the BDD file")
+    return {name: refs[root >> 1] ^ (root & 1) for name, root in roots.items()}
+
+
+class MappedBDD:
+    """
+    A BDD file mapped into memory, read-only. Nothing is loaded up front: the
+    level, low and high columns are views into the mapping and the system
+    reads the pages as the nodes are visited. Evaluating an assignment walks
+    one path; cubes enumerates the paths to 1 with a stack no deeper than the
+    number of variables. Close it, or use it as a context manager, to release
+    the views with the mapping.
+
+        with MappedBDD(path) as bdd:
+            bdd.evaluate('x', {'a': 1, 'b': 0})
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as file:
+            # an empty file can not be mapped, mmap raises ValueError as for any invalid file
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.variables, self.names, self.roots, columns = read(self._map)
+        except BaseException:
+            self._map.close()
+            raise
+        self.node_var, self.node_low, self.node_high = columns
+
+    def __enter__(self) -> 'MappedBDD':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def __len__(self) -> int:
+        """Number of nodes, the terminal included."""
+        return len(self.node_var)
+
+    def close(self) -> None:
+        # the mapping can not be closed while a view exports it
+        for column in (self.node_var, self.node_low, self.node_high):
+            if isinstance(column, memoryview):
+                column.release()
+        self._map.close()
+
+    def _values(self, values):
+        # the value of every variable by level
+        if isinstance(values, dict):
+            try:
+                return [values[name] for name in self.variables]
+            except KeyError as error:
+                raise ValueError(f"Missing value of variable {error.args[0]}") from None
+        if len(values) != len(self.variables):
+            raise ValueError(f"Expected {len(self.variables)} values, got {len(values)}")
+        return values
+
+    def evaluate(self, name: str, values) -> int:
+        """
+        Inputs:
+            values: dict, variable name -> 0/1, or a sequence of 0/1 in the order of self.variables
+        Outputs:
+            int, the value of the root on the assignment. Either 0 or 1
+        """
+        values = self._values(values)
+        node_var, node_low, node_high = self.node_var, self.node_low, self.node_high
+        node, level = self.roots[name], -1
+        while node > TRUE:
+            index = node >> 1
+            if node_var[index] <= level:
+                # the levels grow along every path of a valid file, which also rules out cycles
+                raise ValueError(f"Corrupt node {index} in the BDD file")
+            level = node_var[index]
+            node = (node_high[index] if values[level] else node_low[index]) ^ (node & 1)
+        return node
+
+    def cubes(self, name: str) -> Iterator[str]:
+        """
+        Yields the disjoint cubes on which the root is 1, one per path to 1, low
+        branch first: one character per variable in the order of self.variables,
+        '0', '1' or '-' for a variable the path does not test.
+        """
+        node_var, node_low, node_high = self.node_var, self.node_low, self.node_high
+        count = len(self.variables)
+        stack = [(self.roots[name], 0, "")]
+        while stack:
+            node, level, prefix = stack.pop()
+            if node <= TRUE:
+                if node == TRUE:
+                    yield prefix + "-" * (count - level)
+                continue
+            index = node >> 1
+            var = node_var[index]
+            if not level <= var < count:
+                raise ValueError(f"Corrupt node {index} in the BDD file")
+            prefix += "-" * (var - level)
+            complement = node & 1
+            stack.append((node_high[index] ^ complement, var + 1, prefix + "1"))
+            stack.append((node_low[index] ^ complement, var + 1, prefix + "0"))
+
+    def sat_count(self, name: str) -> int:
+        """
+        Number of assignments of the variables on which the root is 1, with exact
+        integers, keeping one count per node below the root.
+        """
+        node_var, node_low, node_high = self.node_var, self.node_low, self.node_high
+        count = len(self.variables)
+        memo = {0: 0}  # node index -> assignments of the variables from its level down on which it is 1
+
+        def below(child, at):
+            # assignments of the variables from level at down on which child is 1
+            index = child >> 1
+            level = count if index == 0 else node_var[index]
+            ones = memo[index]
+            if child & 1:
+                ones = (1 << (count - level)) - ones
+            # the variables skipped between at and the child are free
+            return ones << (level - at)
+
+        root = self.roots[name]
+        stack = [root >> 1]
+        while stack:
+            index = stack[-1]
+            if index in memo:
+                stack.pop()
+                continue
+            low, high = node_low[index], node_high[index]
+            if not (0 <= low < 2 * index and 0 <= high < 2 * index):
+                raise ValueError(f"Corrupt node {index} in the BDD file")
+            pending = [child >> 1 for child in (low, high) if child >> 1 not in memo]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            at = node_var[index] + 1
+            memo[index] = below(low, at) + below(high, at)
+        return below(root, 0)
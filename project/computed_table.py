@@ -0,0 +1,106 @@
+from collections import OrderedDict
+from itertools import islice
+
+# Eviction policies
+POLICY_FIFO = 'fifo'
+POLICY_LRU = 'lru'
+
+POLICIES = (POLICY_FIFO, POLICY_LRU)
+
+DEFAULT_CAPACITY = 1 << 18
+
+
+class ComputedTable:
+    """
+    Bounded cache of results owned by a single BDDManager.
+
+    When the table grows past its capacity the oldest quarter of the entries is
+    evicted at once, oldest meaning first inserted ('fifo') or least recently
+    used ('lru'). Evicting in batches keeps the cost of an eviction constant
+    per entry with a plain dict.
+
+    The hot loops of the manager read `entries` directly and report their hits
+    and misses through `record`, so keeping the statistics costs two integer
+    additions per call instead of one method call per lookup.
+    """
+    __slots__ = ['capacity', 'policy', 'entries', 'hits', 'misses', 'evictions']
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, policy: str = POLICY_FIFO):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}. Expected one of {', '.join(POLICIES)}")
+        if capacity is not None and capacity < 1:
+            raise ValueError(f"The capacity of a computed table must be positive, got {capacity}")
+        self.capacity = capacity  # None means unbounded
+        self.policy = policy
+        self.entries: dict = OrderedDict() if policy == POLICY_LRU else {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def get(self, key, default=None):
+        entries = self.entries
+        if key in entries:
+            self.hits += 1
+            if self.policy == POLICY_LRU:
+                entries.move_to_end(key)
+            return entries[key]
+        self.misses += 1
+        return default
+
+    def __getitem__(self, key):
+        return self.entries[key]
+
+    def __setitem__(self, key, value):
+        self.entries[key] = value
+        if self.capacity is not None and len(self.entries) > self.capacity:
+            self.evict()
+
+    def record(self, hits: int, misses: int):
+        self.hits += hits
+        self.misses += misses
+
+    def evict(self):
+        entries = self.entries
+        count = max(1, len(entries) // 4)
+        if self.policy == POLICY_LRU:
+            for _ in range(count):
+                entries.popitem(last=False)
+        else:
+            for key in list(islice(entries, count)):
+                del entries[key]
+        self.evictions += count
+
+    def clear(self):
+        """Drops every entry, the statistics are kept."""
+        self.entries.clear()
+
+    def retain(self, keep):
+        """Drops the entries for which keep(key, value) is false."""
+        entries = self.entries
+        for key in [key for key, value in entries.items() if not keep(key, value)]:
+            del entries[key]
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self.entries),
+            'capacity': self.capacity,
+            'policy': self.policy,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
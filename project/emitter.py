@@ -0,0 +1,293 @@
+from itertools import product
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+from project.ROBDD import FALSE, OP_OR, TRUE
+
+# Orders in which the rows of a truth table can be walked
+ORDER_BINARY = 'binary'
+ORDER_GRAY = 'gray'
+
+ORDERS = (ORDER_BINARY, ORDER_GRAY)
+
+MAX_CHUNK_ROWS = 4096
+BLOCK_BITS = 12  # the bit-parallel writer evaluates 2^12 rows at once
+FIRST_BLOCK_BITS = 0  # the first block of write_table is one row, the blocks double up to BLOCK_BITS
+
+
+def binary_assignments(count: int) -> Iterator[Tuple[int, ...]]:
+    """
+    Yields every assignment of count variables as a tuple of 0/1 values, the
+    first variable being the most significant one (the order of the printed tables).
+    """
+    return product((0, 1), repeat=count)
+
+
+def gray_assignments(count: int) -> Iterator[Tuple[int, ...]]:
+    """
+    Yields every assignment of count variables in reflected Gray-code order:
+    two consecutive assignments differ in exactly one variable.
+    """
+    values = [0] * count
+    yield tuple(values)
+    for i in range(1, 1 << count):
+        # between the (i-1)-th and the i-th code the lowest set bit of i flips
+        bit = (i & -i).bit_length() - 1
+        values[count - 1 - bit] ^= 1
+        yield tuple(values)
+
+
+def assignments(count: int, order: str = ORDER_BINARY) -> Iterator[Tuple[int, ...]]:
+    if order == ORDER_BINARY:
+        return binary_assignments(count)
+    if order == ORDER_GRAY:
+        return gray_assignments(count)
+    raise ValueError(f"Unknown row order: {order}. Expected one of {', '.join(ORDERS)}")
+
+
+def format_row(values: Sequence[int], results: Sequence[int]) -> str:
+    return "  " + " ".join(map(str, values)) + "   " + " ".join(map(str, results))
+
+
+def table_rows(robdds: Sequence, count: int, order: str = ORDER_BINARY) -> Iterator[str]:
+    """
+    Lazily evaluates every ROBDD on every assignment of the count variables of
+    their manager and yields the formatted rows, nothing is materialised.
+    """
+    evaluators = [robdd.evaluate_values for robdd in robdds]
+    for values in assignments(count, order):
+        yield format_row(values, [evaluate(values) for evaluate in evaluators])
+
+
+def ones_rows(robdds: Sequence, count: int) -> Iterator[str]:
+    """
+    Lazily yields the rows of a show_ones table: every assignment on which at
+    least one of the ROBDDs is 1, once, in binary order, with the value of every
+    ROBDD. The disjunction of the ROBDDs drives a depth-first walk over the
+    variables, low branch first, that never enters a branch where it is 0. The
+    outputs are cofactored along the same walk, and once all of them are
+    constant the remaining variables are free and their rows are written in bulk,
+    so nothing is re-evaluated, sorted or deduplicated. When the manager has
+    been reordered the walk still follows the declared variables, cofactoring
+    with restrict where a variable is not on top.
+    """
+    for prefix, level, suffix in _ones_cubes(robdds, count, dont_cares=False):
+        if level == count:
+            yield "  " + prefix + suffix
+            continue
+        separator = " " if prefix else ""
+        for values in product("01", repeat=count - level):
+            yield "  " + prefix + separator + " ".join(values) + suffix
+
+
+def ones_cubes(robdds: Sequence, count: int) -> Iterator[str]:
+    """
+    Lazily yields the show_ones table of the ROBDDs as disjoint cubes, '-'
+    standing for an input on which no output depends there, in the declared
+    column order. Every row of the full table is covered by exactly one cube,
+    and the number of cubes is bounded by the number of paths of the BDDs
+    instead of the number of rows.
+    """
+    for prefix, level, suffix in _ones_cubes(robdds, count, dont_cares=True):
+        separator = " " if prefix and level < count else ""
+        yield "  " + prefix + separator + " ".join("-" * (count - level)) + suffix
+
+
+def _ones_cubes(robdds: Sequence, count: int, dont_cares: bool) -> Iterator[Tuple[str, int, str]]:
+    # the walk behind ones_rows and ones_cubes, yields (values of the first level variables, level, outputs)
+    # once every output is constant; with dont_cares a variable no node depends on is '-' instead of 0 and 1
+    if not robdds:
+        return
+    manager = robdds[0].manager
+    node_var, node_low, node_high, var_level = manager.node_var, manager.node_low, manager.node_high, manager.var_level
+    restricted = {}  # (level, value) -> memo of manager.restrict
+
+    driver = manager.combine(OP_OR, [robdd.root for robdd in robdds])
+
+    # entries are (declared position, driver, outputs, values of the variables before it)
+    stack = [(0, driver, tuple(robdd.root for robdd in robdds), "")]
+    while stack:
+        level, driver, outputs, prefix = stack.pop()
+        if driver == FALSE:
+            continue
+
+        if all(output <= TRUE for output in outputs):
+            yield prefix, level, "   " + " ".join(map(str, outputs))
+            continue
+
+        # branch on the level-th declared variable, nodes below it are unchanged by it
+        var = var_level[level]
+        separator = " " if prefix else ""
+        nodes = (driver,) + outputs
+        if dont_cares and all(node_var[node >> 1] > var for node in nodes):
+            stack.append((level + 1, driver, outputs, prefix + separator + "-"))
+            continue
+        lows = []
+        highs = []
+        for node in nodes:
+            if node_var[node >> 1] == var:
+                # a complemented reference has complemented cofactors
+                lows.append(node_low[node >> 1] ^ (node & 1))
+                highs.append(node_high[node >> 1] ^ (node & 1))
+            elif node_var[node >> 1] > var:
+                lows.append(node)
+                highs.append(node)
+            else:
+                lows.append(manager.restrict(node, var, 0, restricted.setdefault((var, 0), {})))
+                highs.append(manager.restrict(node, var, 1, restricted.setdefault((var, 1), {})))
+        stack.append((level + 1, highs[0], tuple(highs[1:]), prefix + separator + "1"))
+        stack.append((level + 1, lows[0], tuple(lows[1:]), prefix + separator + "0"))
+
+
+def count_rows(names: Sequence[str], robdds: Sequence) -> Iterator[str]:
+    """
+    Yields the rows of a count instruction: for every output the number of rows
+    of its show_ones table and the fraction of all assignments they are, then,
+    for several outputs, the same for the show_ones table of all of them.
+    Nothing is enumerated, the counts come from one pass over the BDD nodes.
+    """
+    if not robdds:
+        return
+    manager = robdds[0].manager
+    total = 1 << len(manager.variables)
+    memo = {}
+    for name, robdd in zip(names, robdds):
+        ones = manager.sat_count(robdd.root, memo)
+        yield f"  {name} {ones} {ones / total:.6g}"
+    if len(robdds) > 1:
+        ones = manager.sat_count(manager.combine(OP_OR, [robdd.root for robdd in robdds]), memo)
+        yield f"  show_ones {ones} {ones / total:.6g}"
+
+
+def write_rows(lines: Iterable[str], out, max_chunk: int = MAX_CHUNK_ROWS) -> int:
+    """
+    Writes lines to out in buffered chunks and returns how many were written.
+    The first chunk holds a single row and the chunk size doubles up to
+    max_chunk, so the first row shows up at once and the rest is written with
+    few large writes.
+    """
+    written = 0
+    chunk = []
+    size = 1
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            out.write("\n".join(chunk) + "\n")
+            out.flush()
+            written += len(chunk)
+            chunk.clear()
+            size = min(2 * size, max_chunk)
+    if chunk:
+        out.write("\n".join(chunk) + "\n")
+        out.flush()
+        written += len(chunk)
+    return written
+
+
+def write_table(robdds: Sequence, count: int, out, block_bits: int = BLOCK_BITS,
+                first_bits: int = FIRST_BLOCK_BITS) -> int:
+    """
+    Writes the full truth table of the ROBDDs in binary order and returns the
+    number of rows written. Rows are produced in blocks of up to 2^block_bits:
+    the last variables vary inside a block and are packed as bit columns, the
+    others are constant. Every output is evaluated once per block with ROBDD
+    bit-parallel evaluation, and the text of the block is filled column by
+    column into a fixed-width buffer, so no Python code runs per row. The first
+    block has 2^first_bits rows and the blocks grow from there, so the first
+    rows are written without waiting for a whole block to be evaluated.
+    """
+    if count == 0 or not robdds:
+        # the fixed-width layout needs at least one input and one output column
+        return write_rows(table_rows(robdds, count), out)
+
+    manager = robdds[0].manager
+    for text in table_blocks(manager, [robdd.root for robdd in robdds], count, block_bits, first_bits=first_bits):
+        out.write(text)
+        out.flush()
+    return 1 << count
+
+
+def table_blocks(manager, roots: Sequence[int], count: int, block_bits: int = BLOCK_BITS,
+                 fixed: Sequence[int] = (), first_bits: int = None) -> Iterator[str]:
+    """
+    Yields the text of write_table block by block. With fixed, only the slice of
+    the table where the first len(fixed) variables hold those values is
+    produced, its rows are the same lines as in the full table. At least one
+    variable must be left free. With first_bits, the first block has
+    2^first_bits rows and every next one is as large as all the rows before it,
+    up to 2^block_bits; otherwise every block has 2^block_bits rows.
+    """
+    nodes = None  # the reachable nodes, only walked once a block is worth a pass over all of them
+    size = len(manager.node_var)  # bounds their number until they are walked
+
+    free = count - len(fixed)
+    block_bits = min(free, block_bits)
+    bits = block_bits if first_bits is None else min(first_bits, block_bits)
+
+    # "  x0 x1 ... xn   f0 ... fk\n", every value is one character at a fixed offset
+    line_length = 2 * count + 2 * len(roots) + 4
+    input_offsets = [2 + 2 * i for i in range(count)]
+    output_offsets = [2 * count + 4 + 2 * j for j in range(len(roots))]
+    layouts = {}  # bits of a block -> its text template, packed columns and constant column texts
+
+    def layout(low_bits):
+        # packed columns and column text of the variables that vary inside a block of 2^low_bits rows
+        width = 1 << low_bits
+        template = bytearray(b" " * (line_length - 1) + b"\n") * width
+        columns = [0] * count
+        for i in range(count - low_bits, count):
+            # the variable alternates between runs of zeros and ones as long as its weight in the row index
+            run = 1 << (count - 1 - i)
+            pattern = (b"0" * run + b"1" * run) * (width // (2 * run))
+            template[input_offsets[i]::line_length] = pattern
+            columns[i] = int(pattern[::-1], 2)
+        return template, columns, b"1" * width, b"0" * width
+
+    # the rows of the slice are consecutive, the fixed values are the high bits of their index
+    first = 0
+    for bit in fixed:
+        first = (first << 1) | bit
+    first <<= free
+    row, end = first, first + (1 << free)
+    while row < end:
+        if bits not in layouts:
+            layouts[bits] = layout(bits)
+        template, columns, ones, zeros = layouts[bits]
+        width = 1 << bits
+        mask = (1 << width) - 1  # every row of the block set
+        high_bits = count - bits
+        text = bytearray(template)
+        for i in range(high_bits):
+            bit = (row >> (count - 1 - i)) & 1
+            columns[i] = mask if bit else 0
+            text[input_offsets[i]::line_length] = ones if bit else zeros
+        if width * len(roots) * count < size:
+            # a few rows cost less as one path per row and output than as a pass over every node
+            values = _evaluate_rows(manager, roots, columns, width)
+        else:
+            if nodes is None:
+                nodes = manager.reachable_nodes(roots)
+                size = len(nodes)
+            values = manager.evaluate_block(roots, columns, width, nodes)
+        for offset, value in zip(output_offsets, values):
+            # bit r of the value is row r, format writes the most significant bit first
+            text[offset::line_length] = format(value, f"0{width}b")[::-1].encode()
+        yield text.decode()
+
+        row += width
+        # a block always starts on a multiple of its size, it doubles once the rows before it allow
+        if bits < block_bits and row - first >= 2 << bits:
+            bits += 1
+
+
+def _evaluate_rows(manager, roots: Sequence[int], columns: Sequence[int], width: int) -> List[int]:
+    # evaluate_block walking one path per row and root, columns and results packed the same way
+    level_var, node_var, node_low, node_high = manager.level_var, manager.node_var, manager.node_low, manager.node_high
+    results = [0] * len(roots)
+    for r in range(width):
+        values = [(column >> r) & 1 for column in columns]
+        for j, node in enumerate(roots):
+            while node > TRUE:
+                index = node >> 1
+                node = (node_high[index] if values[level_var[node_var[index]]] else node_low[index]) ^ (node & 1)
+            results[j] |= node << r
+    return results
@@ -0,0 +1,214 @@
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+
+from project.ROBDD import BDDManager
+
+# Static variable-order heuristics, computed from the parsed program before anything is built
+HEURISTIC_DECLARED = 'declared'
+HEURISTIC_DFS = 'dfs'
+HEURISTIC_FORCE = 'force'
+HEURISTIC_WEIGHT = 'weight'
+
+HEURISTICS = (HEURISTIC_DECLARED, HEURISTIC_DFS, HEURISTIC_FORCE, HEURISTIC_WEIGHT)
+
+FORCE_ITERATIONS = 20
+
+
+def output_expressions(assignments, show_instructions) -> List:
+    # the expression of every shown name, once, in the order the names are first shown
+    expressions = {}
+    for _, names in show_instructions:
+        for name in names:
+            if name not in expressions:
+                expressions[name] = assignments.get(name, name)
+    return list(expressions.values())
+
+
+def _operator_nodes(expressions) -> List:
+    # distinct operator nodes of the shared expression DAG, operands before the nodes using them
+    nodes = []
+    done = set()
+    stack = [(expr, False) for expr in reversed(expressions) if not isinstance(expr, str)]
+    while stack:
+        expr, expanded = stack.pop()
+        if id(expr) in done:
+            continue
+        if expanded:
+            done.add(id(expr))
+            nodes.append(expr)
+            continue
+        stack.append((expr, True))
+        stack.extend((sub_expr, False) for sub_expr in reversed(expr[1:])
+                     if not isinstance(sub_expr, str) and id(sub_expr) not in done)
+    return nodes
+
+
+def _supports(nodes, variables) -> Tuple[Dict[int, frozenset], Callable]:
+    # id(expression) -> the variables it depends on for every operator node, and a lookup that also takes leaves
+    names = set(variables)
+    supports = {}
+
+    def support(expr):
+        if isinstance(expr, str):
+            return frozenset((expr,)) if expr in names else frozenset()
+        return supports[id(expr)]
+
+    for expr in nodes:
+        supports[id(expr)] = frozenset().union(*(support(sub_expr) for sub_expr in expr[1:]))
+    return supports, support
+
+
+def _complete(order, variables) -> List[str]:
+    # the variables no output depends on go last, in declaration order
+    placed = set(order)
+    return order + [name for name in variables if name not in placed]
+
+
+def dfs_order(variables, expressions) -> List[str]:
+    """
+    Depth-first traversal of the outputs, left to right, numbering the variables
+    as they are first reached. At every operator the operand with the largest
+    fan-in, the most variables, is entered first, so variables that are combined
+    deep in the expressions end up close to each other.
+    """
+    _, support = _supports(_operator_nodes(expressions), variables)
+    names = set(variables)
+    order = []
+    placed = set()
+    visited = set()
+    stack = list(reversed(expressions))
+    while stack:
+        expr = stack.pop()
+        if isinstance(expr, str):
+            if expr in names and expr not in placed:
+                placed.add(expr)
+                order.append(expr)
+            continue
+        if id(expr) in visited:
+            continue
+        visited.add(id(expr))
+        operands = sorted(expr[1:], key=lambda sub_expr: -len(support(sub_expr)))
+        stack.extend(reversed(operands))
+    return _complete(order, variables)
+
+
+def force_order(variables, expressions, iterations: int = FORCE_ITERATIONS) -> List[str]:
+    """
+    FORCE: every operator node is a hyperedge over the variables it depends on.
+    Each iteration moves every variable to the mean of the centres of gravity of
+    its hyperedges and sorts, until the total span of the hyperedges stops
+    shrinking. Starts from the declaration order.
+    """
+    supports, _ = _supports(_operator_nodes(expressions), variables)
+    edges = [tuple(edge) for edge in {edge for edge in supports.values() if len(edge) > 1}]
+    edges_of = {name: [] for name in variables}
+    for i, edge in enumerate(edges):
+        for name in edge:
+            edges_of[name].append(i)
+
+    def span(position):
+        return sum(max(position[name] for name in edge) - min(position[name] for name in edge) for edge in edges)
+
+    position = {name: i for i, name in enumerate(variables)}
+    best = span(position)
+    for _ in range(iterations):
+        centres = [sum(position[name] for name in edge) / len(edge) for edge in edges]
+        target = {name: sum(centres[i] for i in edges_of[name]) / len(edges_of[name]) if edges_of[name] else position[name]
+                  for name in variables}
+        # ties keep the current relative order
+        order = sorted(variables, key=lambda name: (target[name], position[name]))
+        candidate = {name: i for i, name in enumerate(order)}
+        candidate_span = span(candidate)
+        if candidate_span >= best:
+            break
+        position, best = candidate, candidate_span
+    return sorted(variables, key=position.get)
+
+
+def weight_order(variables, expressions) -> List[str]:
+    """
+    Weight-append: every output gets a weight of 1, which every operator splits
+    evenly between the operands that still depend on an unplaced variable. The
+    heaviest variable is appended to the order and the weights are propagated
+    again without it, until every variable the outputs depend on is placed.
+    """
+    nodes = _operator_nodes(expressions)
+    supports, support = _supports(nodes, variables)
+    index = {name: i for i, name in enumerate(variables)}
+    remaining = set().union(*(support(expr) for expr in expressions)) if expressions else set()
+    order = []
+    placed = set()
+    while remaining:
+        weights = dict.fromkeys(remaining, 0.0)
+        node_weights = dict.fromkeys(supports, 0.0)
+        for expr in expressions:
+            if isinstance(expr, str):
+                if expr in weights: weights[expr] += 1.0
+            else:
+                node_weights[id(expr)] += 1.0
+        # users before operands, so a node has all of its weight when it is split
+        for expr in reversed(nodes):
+            operands = [sub_expr for sub_expr in expr[1:] if not support(sub_expr) <= placed]
+            if not operands:
+                continue
+            share = node_weights[id(expr)] / len(operands)
+            for sub_expr in operands:
+                if isinstance(sub_expr, str):
+                    weights[sub_expr] += share
+                else:
+                    node_weights[id(sub_expr)] += share
+        name = max(remaining, key=lambda name: (weights[name], -index[name]))
+        order.append(name)
+        placed.add(name)
+        remaining.remove(name)
+    return _complete(order, variables)
+
+
+def variable_order(heuristic, variables, assignments, show_instructions) -> List[str]:
+    """
+    Inputs:
+        heuristic: str, one of HEURISTICS
+        variables, assignments, show_instructions: the output of parse
+    Outputs:
+        List[str], every declared variable, from the top level to the bottom one
+    """
+    expressions = output_expressions(assignments, show_instructions)
+    if heuristic == HEURISTIC_DECLARED:
+        return list(variables)
+    if heuristic == HEURISTIC_DFS:
+        return dfs_order(variables, expressions)
+    if heuristic == HEURISTIC_FORCE:
+        return force_order(variables, expressions)
+    if heuristic == HEURISTIC_WEIGHT:
+        return weight_order(variables, expressions)
+    raise ValueError(f"Unknown ordering heuristic: {heuristic}. Expected one of {', '.join(HEURISTICS)}")
+
+
+def order_report(variables, assignments, show_instructions, heuristics=HEURISTICS) -> List[dict]:
+    """
+    Builds every shown output under the order of each heuristic and reports the
+    number of nodes and the time it took, to compare them with the declaration order.
+    """
+    rows = []
+    for heuristic in heuristics:
+        start = perf_counter()
+        order = variable_order(heuristic, variables, assignments, show_instructions)
+        manager = BDDManager(variables, order=order)
+        for _, names in show_instructions:
+            for name in names:
+                if name not in manager:
+                    manager.build(name, assignments.get(name, name))
+        manager.reduce()
+        rows.append({'heuristic': heuristic, 'nodes': manager.node_count,
+                     'seconds': perf_counter() - start, 'order': order})
+    return rows
+
+
+def format_report(rows) -> str:
+    # node counts relative to the declaration order when it is part of the report
+    baseline = next((row['nodes'] for row in rows if row['heuristic'] == HEURISTIC_DECLARED), None)
+    lines = [f"{'heuristic':<10} {'nodes':>10} {'vs declared':>12} {'seconds':>9}  order"]
+    for row in rows:
+        ratio = f"{row['nodes'] / baseline:.2f}x" if baseline else "-"
+        lines.append(f"{row['heuristic']:<10} {row['nodes']:>10} {ratio:>12} {row['seconds']:>9.3f}  {' '.join(row['order'])}")
+    return "\n".join(lines)
@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Sequence, Tuple
+
+from project.emitter import BLOCK_BITS, FIRST_BLOCK_BITS, table_blocks, write_table
+from project.ROBDD import BDDManager
+
+MIN_PARALLEL_VARIABLES = 20  # below 2^20 rows the serial writer is done before the workers pay off
+MAX_SLICE_BITS = 20          # a slice holds at most 2^20 rows, so the files of the workers stay bounded
+SLICES_PER_WORKER = 4        # several slices per worker keep every worker busy until the end
+COPY_CHUNK = 1 << 20         # bytes read at once when a slice file is copied without sendfile
+
+
+def available_cpus() -> int:
+    """Number of CPUs this process may run on, which can be fewer than the machine has."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def split_bits(count: int, workers: int) -> int:
+    """
+    Number of leading variables fixed per slice: enough slices for every worker
+    to take several and none larger than 2^MAX_SLICE_BITS rows, at least one
+    variable left free.
+    """
+    bits = max((SLICES_PER_WORKER * workers - 1).bit_length(), count - MAX_SLICE_BITS)
+    return max(0, min(bits, count - 1))
+
+
+def cofactor_slices(manager: BDDManager, roots: Sequence[int], bits: int) -> List[Tuple[Tuple[int, ...], List[int]]]:
+    """
+    The 2^bits cofactors of the roots with the first bits declared variables
+    fixed, in binary order of the fixed values, each one with those values.
+    Every level of the prefix tree restricts the previous one, the memos are
+    shared between the slices.
+    """
+    slices = [((), list(roots))]
+    for position in range(bits):
+        level = manager.var_level[position]
+        memos = ({}, {})
+        slices = [(values + (value,), [manager.restrict(root, level, value, memos[value]) for root in cofactors])
+                  for values, cofactors in slices for value in (0, 1)]
+    return slices
+
+
+def _write_slice(task) -> None:
+    # worker side: rebuild the exported cofactors and write the rows of the slice to its file
+    variables, order, columns, roots, count, block_bits, first_bits, fixed, path = task
+    manager = BDDManager(variables, order=order)
+    manager.load_nodes(*columns)
+    with open(path, 'w') as file:
+        for text in table_blocks(manager, roots, count, block_bits, fixed, first_bits):
+            file.write(text)
+
+
+def _copy_file(path: str, out) -> None:
+    # appends the file to out, in the kernel when out is backed by a file descriptor
+    with open(path, 'rb') as file:
+        try:
+            descriptor = out.fileno()
+        except (AttributeError, OSError, ValueError):
+            descriptor = None
+        if descriptor is not None:
+            out.flush()
+            size, offset = os.fstat(file.fileno()).st_size, 0
+            try:
+                while offset < size:
+                    offset += os.sendfile(descriptor, file.fileno(), offset, size - offset)
+                return
+            except OSError:
+                # e.g. a descriptor sendfile does not write to, the rest is copied below
+                file.seek(offset)
+        # the rows are ASCII, so a chunk always decodes on its own
+        for chunk in iter(lambda: file.read(COPY_CHUNK), b''):
+            out.write(chunk.decode())
+        out.flush()
+
+
+def write_table_parallel(robdds: Sequence, count: int, out, workers: int = None, block_bits: int = BLOCK_BITS,
+                         first_bits: int = FIRST_BLOCK_BITS) -> int:
+    """
+    write_table split across worker processes, byte for byte the same output.
+    The table is cut into slices by fixing the leading declared variables, the
+    slices are consecutive row ranges. Each worker gets the cofactors of the
+    outputs for its slice, exported as plain columns, and writes the rows of
+    the slice to a file of its own; nothing but the task goes through the pool.
+    Meanwhile this process writes the first slice straight to out, with the
+    growing blocks of write_table, so the first rows show up at once, then
+    copies the files of the other slices to out in order as they are done.
+    The table is written serially when it is too small for the workers to pay
+    off or when this process may only run on one CPU.
+    Inputs:
+        workers: int, number of processes this one included, one per available CPU when None;
+            never more than the CPUs available
+    Outputs:
+        int, the number of rows written
+    """
+    workers = min(workers or available_cpus(), available_cpus())
+    if workers == 1 or count < MIN_PARALLEL_VARIABLES or not robdds:
+        return write_table(robdds, count, out, block_bits, first_bits)
+    return _write_slices(robdds, count, out, workers, block_bits, first_bits)
+
+
+def _write_slices(robdds: Sequence, count: int, out, workers: int, block_bits: int, first_bits: int) -> int:
+    manager = robdds[0].manager
+    (first_fixed, first), *rest = cofactor_slices(manager, [robdd.root for robdd in robdds], split_bits(count, workers))
+    directory = tempfile.mkdtemp(prefix='table-')
+    try:
+        tasks, paths = [], []
+        for fixed, cofactors in rest:
+            node_var, node_low, node_high, roots = manager.export_nodes(cofactors)
+            paths.append(os.path.join(directory, str(len(paths))))
+            tasks.append((manager.variables, manager.order, (node_var, node_low, node_high), roots, count,
+                          block_bits, first_bits, fixed, paths[-1]))
+
+        # this process is one of the workers, it takes the first slice
+        with ProcessPoolExecutor(min(workers - 1, len(tasks))) as executor:
+            futures = [executor.submit(_write_slice, task) for task in tasks]
+            try:
+                for text in table_blocks(manager, first, count, block_bits, first_fixed, first_bits):
+                    out.write(text)
+                    out.flush()
+                for future, path in zip(futures, paths):
+                    future.result()
+                    _copy_file(path, out)
+                    os.remove(path)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 1 << count
@@ -1,20 +1,45 @@
 from pprint import pprint
-from project.tokenizer import Tokenizer
+from project.tokenizer import KEYWORDS, SPECIAL_CHARS, Tokenizer, TokenStream
 #from tokenizer import Tokenizer
 from typing import List, Tuple, Dict, Any
 
-def match(token, type, value = None):
-    if value is None:
-        return token.type == type
-    return token.type == type and token.value == value
+OPERATORS = {'and', 'or'}
+BOOLEANS = {'True', 'False'}
+INSTRUCTIONS = {'show', 'show_ones', 'count'}
 
-def match_bool(token):
-    return token.type == 'KEYWORD' and token.value in {'True', 'False'}
 
-def end_of_line(token):
-    return match(token, 'SPECIAL', ';')
+def is_identifier(value: str) -> bool:
+    return value not in KEYWORDS and value not in SPECIAL_CHARS
 
-def tokens_to_robdd_input(tokens: List, start_index: int = 0, open_parentheses = 0) -> Tuple[Any, int]:
+
+def is_instruction(values, current: int) -> bool:
+    # count is not a reserved word: a statement 'count = ...;' assigns an identifier named count
+    value = values[current]
+    return value in INSTRUCTIONS and (value in KEYWORDS or values[current + 1] != '=')
+
+
+def token_values(tokens):
+    """
+    The parser works on the values of the tokens only, positions are needed for errors alone.
+    Inputs:
+        tokens: TokenStream or list of Token
+    Outputs:
+        (list of the values, function giving the (line, column) of the token at an index)
+    """
+    if isinstance(tokens, TokenStream):
+        return tokens.values, tokens.position
+    return [token.value for token in tokens], lambda index: (tokens[index].line, tokens[index].column)
+
+
+def _name(value):
+    return value
+
+
+def _tuple(op, operands):
+    return (op,) + tuple(operands)
+
+
+def tokens_to_robdd_input(tokens, start_index: int = 0, open_parentheses = 0) -> Tuple[Any, int]:
     """
     Parses tokens into ROBDD input format.
     Assumes precedence is always given by parentheses.
@@ -23,174 +48,174 @@ def tokens_to_robdd_input(tokens: List, start_index: int = 0, open_parentheses =
     
     Example of valid input: ((x1 or x2) and (not x3)) and x4 and (not (y))
     """
+    values, position = token_values(tokens)
+    return parse_expression(values, position, start_index, open_parentheses)
+
+
+def parse_expression(values: List[str], position, start_index: int = 0, open_parentheses: int = 0,
+                     leaf=_name, node=_tuple) -> Tuple[Any, int]:
+    """
+    Parses the expression starting at start_index in one left-to-right pass.
+    Every parenthesis level is a list of operands joined by a single operator
+    (or one operand under 'not'). An opening parenthesis pushes the level it is
+    in on an explicit stack and the closing one pops it, so the nesting depth
+    costs no recursion and the time is linear in the number of tokens.
+    Inputs:
+        values: list of token values, position: (line, column) of the token at an index
+        leaf: builds the operand of an identifier or True/False, node: builds (op, operands)
+    Outputs:
+        (expression, index of the ';' or of the closing parenthesis ending it)
+    """
     i = start_index
-    expression: List = []
-    current_term: List = []
+    end = len(values)
+    levels = [] # operands and operator of every enclosing parenthesis level
+    operands = []
     last_operator = None
     expect_operator = False
+    depth = open_parentheses
 
+    while i < end:
+        value = values[i]
 
-    def finalize_term():
-        nonlocal current_term, expect_operator
-        if len(current_term) == 1:
-            expression.append(current_term[0])
-        elif len(current_term) > 1:
-            expression.extend(current_term)
-        current_term = []
-        expect_operator = True
-        
-
-    while i < len(tokens):
-        token = tokens[i]
-
-        if match(token, 'SPECIAL', '('):
+        if value == '(':
             if expect_operator:
                 raise ValueError(f"Unexpected opening parenthesis at line {i}. Did you forget an operator?")
-            
-            if i + 1 < len(tokens) and match(tokens[i+1], 'SPECIAL', ')'):
-                raise ValueError(f"Empty parentheses at line {token.line + 1}, character {token.column+1}")
-            
-            sub_expression, i = tokens_to_robdd_input(tokens, i + 1, open_parentheses + 1)
-
-            current_term.append(sub_expression)
+            if i + 1 < end and values[i + 1] == ')':
+                line, column = position(i)
+                raise ValueError(f"Empty parentheses at line {line + 1}, character {column+1}")
+            levels.append((operands, last_operator))
+            operands = []
+            last_operator = None
+            depth += 1
+
+        elif value == ')':
+            if depth == 0:
+                line, column = position(i)
+                raise ValueError(f"Unexpected closing parenthesis at line {line + 1}, character {column + 1}.")
+            if not expect_operator:
+                line, column = position(i)
+                raise ValueError(f"Incomplete expression: missing operand before ')' at line {line + 1}, character {column+1}")
+            expression = node(last_operator, operands) if last_operator else operands[0]
+            depth -= 1
+            if not levels:
+                # closes the parenthesis opened by the caller
+                return expression, i
+            operands, last_operator = levels.pop()
+            operands.append(expression)
             expect_operator = True
-        
-        elif match(token, 'SPECIAL', ')'):
-
-            if open_parentheses == 0:
-                raise ValueError(f"Unexpected closing parenthesis at line {token.line + 1}, character {token.column + 1}.")
-            
-            finalize_term()
-            return (last_operator,) + tuple(expression) if last_operator else expression[0], i
-    
-        
-        elif match(token, 'KEYWORD', 'not'):
-            
-            if last_operator and last_operator != 'not':
-                raise ValueError(f"Unexpected 'not' at line {token.line + 1}, character {token.column+1}. Expected '{last_operator}'")
-            
 
+        elif value == 'not':
+            if last_operator and last_operator != 'not':
+                line, column = position(i)
+                raise ValueError(f"Unexpected 'not' at line {line + 1}, character {column+1}. Expected '{last_operator}'")
             if expect_operator:
-                raise ValueError(f"Unexpected 'not' at line {token.line + 1}, character {token.column+1}. Did you forget an identifier?")
-            
-            if last_operator == 'not':
-                last_operator = None
-            else: 
-                last_operator = 'not'
-            expect_operator = False
-            
-
-            ## now we are at the current not, let's check if there are more nots
-            ## Count the number of 'not' keywords
-            #not_count = 1
-            #while i + 1 < len(tokens) and match(tokens[i+1], 'KEYWORD', 'not'):
-            #    not_count += 1 # add a 'not'
-            #    i += 1 # move to the next token
-#
-            #next_token = tokens[i+1] if i+1 < len(tokens) else None
-            #
-            #if next_token and match(next_token, 'SPECIAL', '('):
-            #    sub_expression, i = tokens_to_robdd_input(tokens, i + 2, open_parentheses)
-#
-            #elif match(next_token, 'IDENTIFIER') or match_bool(next_token):
-            #    sub_expression = next_token.value
-            #    i += 1
-            #else:
-            #    # Unexpected token after 'not'
-            #    raise ValueError(f"Unexpected token after 'not' at line {next_token.line + 1}, character {next_token.column+1}")
-            #    
-            #if not_count % 2 == 1:
-            #    # Apply the 'not' operator to the sub-expression if the count is odd
-            #    sub_expression = ('not', sub_expression)
-#
-            ## Append the sub-expression to the current term
-            #current_term.append(sub_expression)
-            #expect_operator = True # We have parser the whole assignment after not therefore we expect an operator
-
-        elif match(token, 'KEYWORD', 'or') or match(token, 'KEYWORD', 'and'):
-            if not expect_operator:
-                raise ValueError(f"Unexpected operator '{token.value}' at line {token.line + 1}, character {token.column+1}. Did you forget an identifier?")
-            if last_operator and last_operator != token.value:
-                raise ValueError(f"Unexpected operator '{token.value}' at line {token.line + 1}, character {token.column+1}. Expected '{last_operator}'")
+                line, column = position(i)
+                raise ValueError(f"Unexpected 'not' at line {line + 1}, character {column+1}. Did you forget an identifier?")
+            last_operator = None if last_operator == 'not' else 'not'
 
-            last_operator = token.value
+        elif value in OPERATORS:
+            if not expect_operator:
+                line, column = position(i)
+                raise ValueError(f"Unexpected operator '{value}' at line {line + 1}, character {column+1}. Did you forget an identifier?")
+            if last_operator and last_operator != value:
+                line, column = position(i)
+                raise ValueError(f"Unexpected operator '{value}' at line {line + 1}, character {column+1}. Expected '{last_operator}'")
+            last_operator = value
             expect_operator = False
+            if i + 1 >= end or values[i + 1] == ';' or values[i + 1] == ')':
+                line, column = position(i)
+                raise ValueError(f"Incomplete expression: '{value}' at line {line + 1}, character {column+1} is missing an operand")
 
-            if i + 1 >= len(tokens) or match(tokens[i+1], 'SPECIAL', ';') or match(tokens[i+1], 'SPECIAL', ')'):
-                raise ValueError(f"Incomplete expression: '{token.value}' at line {token.line + 1}, character {token.column+1} is missing an operand")
+        elif value == ';':
+            if depth != 0:
+                raise ValueError(f"Missing {depth} closing parenthesis at the end of the expression)")
+            break
 
-        elif match(token, 'IDENTIFIER'):
+        elif value in BOOLEANS or is_identifier(value):
             if expect_operator:
-                raise ValueError(f"Unexpected identifier '{token.value}' at line {token.line + 1}, character {token.column+1}. Did you forget an operator?")
-            current_term.append(token.value)
+                kind = 'keyword' if value in BOOLEANS else 'identifier'
+                line, column = position(i)
+                raise ValueError(f"Unexpected {kind} '{value}' at line {line + 1}, character {column+1}. Did you forget an operator?")
+            operands.append(leaf(value))
             expect_operator = True
 
-        elif match_bool(token):
-            if expect_operator:
-                raise ValueError(f"Unexpected keyword '{token.value}' at line {token.line + 1}, character {token.column+1}. Did you forget an operator?")
-            current_term.append(token.value)
-            expect_operator = True
-        
-        elif match(token, 'SPECIAL', ';'):
-            if open_parentheses != 0:
-                raise ValueError(f"Missing {open_parentheses} closing parenthesis at the end of the expression)")
-        
-            finalize_term()
-            break
-        
         else:
-            raise ValueError(f"Unexpected token \"{token.value}\" at line {token.line + 1}, character {token.column+1}")
-        
+            line, column = position(i)
+            raise ValueError(f"Unexpected token \"{value}\" at line {line + 1}, character {column+1}")
+
         i += 1
-    
-    if open_parentheses != 0:
-        raise ValueError(f"Missing {open_parentheses} closing parenthesis at the end of the expression.")
+
+    if depth != 0:
+        raise ValueError(f"Missing {depth} closing parenthesis at the end of the expression.")
 
     if not expect_operator:
         raise ValueError(f"Incomplete expression: missing operand at the end")
 
-    finalize_term()
-
-    # adjust not count
-    
     if last_operator:
-        return (last_operator,) + tuple(expression), i
-    elif len(expression) == 1:
-        return expression[0], i
-    else:
-        return tuple(expression), i
+        return node(last_operator, operands), i
+    return operands[0], i
 
-def parse_assignment(tokens, current, variables, assignments):
-    current_token = tokens[current]
-    name = current_token.value
-    idx = current + 1
-    
-    if not match(tokens[idx], 'SPECIAL', '='):
-        raise ValueError(f"Expected '=' after identifier at line {current_token.line}, character {current_token.column}")
-    
-    idx += 1
-    expr, idx = tokens_to_robdd_input(tokens, idx)
-    
+class ExpressionTable:
+    """
+    Hash-consing table for parsed expressions.
 
-    # Use sets for faster membership testing
-    variable_set = set(variables)
-    assignment_set = set(assignments.keys())
-    keywords = {"and", "or", "not", "True", "False"}
-
-    def replace_and_check(node):
-        if isinstance(node, str):
-            if node in keywords:
-                return node
-            if node not in variable_set and node not in assignment_set:
-                raise ValueError(f"Variable or identifier {node} in expression for {name} is not declared.")
-            return assignments.get(node, node)
-        elif isinstance(node, tuple):
-            return tuple(replace_and_check(child) for child in node)
-        else:
-            return node
+    Every subexpression goes through intern, which returns the single shared
+    instance of it: two structurally identical subexpressions are the same
+    object, and an assignment referenced by name is the very object stored for
+    that name instead of a copy. The parsed program is therefore a DAG whose
+    nodes can be told apart by id(), which is what the ROBDD builder memoises on.
+    """
+    def __init__(self):
+        self.leaves: Dict[str, str] = {}
+        self.nodes: Dict[Tuple, Tuple] = {}
+
+    def __len__(self):
+        return len(self.leaves) + len(self.nodes)
+
+    def intern_leaf(self, name: str) -> str:
+        return self.leaves.setdefault(name, name)
+
+    def intern(self, op: str, operands) -> Tuple:
+        # operands are already interned, so their ids identify them structurally
+        key = (op,) + tuple(id(operand) for operand in operands)
+        node = self.nodes.get(key)
+        if node is None:
+            node = self.nodes[key] = (op,) + tuple(operands)
+        return node
+
+
+def parse_assignment(tokens, current, variables, assignments, expressions: ExpressionTable = None):
+    values, position = token_values(tokens)
+    if expressions is None:
+        expressions = ExpressionTable()
+    return _parse_assignment(values, position, current, set(variables), assignments,
+                             expressions.intern_leaf, expressions.intern)
 
-    # Replace identifiers with their trees and check for undeclared variables in one pass
-    expr = replace_and_check(expr)
+
+def _parse_assignment(values, position, current, variable_set, assignments, intern_leaf, intern):
+    name = values[current]
+    idx = current + 1
+    
+    if values[idx] != '=':
+        line, column = position(current)
+        raise ValueError(f"Expected '=' after identifier at line {line}, character {column}")
+
+    undeclared = []
+
+    def leaf(value):
+        # a reference to an assignment shares its expression, it is not copied
+        if value in assignments:
+            return assignments[value]
+        if value not in variable_set and value not in BOOLEANS and not undeclared:
+            # reported once the whole expression is known to be well formed
+            undeclared.append(value)
+            return None
+        return intern_leaf(value)
+
+    # the nodes are built as they are parsed, with the hash-consing table the program is a DAG from the start
+    expr, idx = parse_expression(values, position, idx + 1, leaf=leaf, node=intern)
+    if undeclared:
+        raise ValueError(f"Variable or identifier {undeclared[0]} in expression for {name} is not declared.")
 
     assignments[name] = expr
     #variables.append(name)  # f0 needs to be treated as a variable
@@ -198,52 +223,175 @@ def parse_assignment(tokens, current, variables, assignments):
     return idx + 1
 
 
+def parse_statement(values, position, current, declared, assignments, intern_leaf, intern) -> Tuple[int, Tuple[str, List[str]]]:
+    """
+    Parses the statement starting at current, up to its ';'.
+    Inputs:
+        declared: set of the variables declared so far, the ones of a var statement are added
+        assignments: dict of the assignments so far, the one of an assignment statement is set
+        intern_leaf(name), intern(op, operands): build the nodes of the expression of an assignment
+    Outputs:
+        (index after the statement, (kind, names)): kind is 'var', the type of a show or '=' with the assigned name
+    """
+    value = values[current]
+    # if the token is a var we want to get the following tokens until we find a ';'
+    if value == 'var':
+        idx = current + 1 # Skip the 'var' keyword
+        names = []
+        while values[idx] != ';':
+            if is_identifier(values[idx]):
+
+                if values[idx] in declared:
+                    raise ValueError(f"Variable {values[idx]} is declared more than once")
+
+                names.append(values[idx])
+                declared.add(values[idx])
+            else:
+                line, column = position(current)
+                raise ValueError(f"Expected identifier after 'var' at line {line}, character {column}")
+            idx += 1
+        return idx + 1, ('var', names)
+    elif is_instruction(values, current):
+        idx = current + 1
+        identifiers = []
+        while values[idx] != ';':
+            if is_identifier(values[idx]):
+                tok_val = values[idx]
+                if tok_val not in declared and tok_val not in assignments:
+                    raise ValueError(f"Identifier {tok_val} in instruction of type \"show\" is not declared")
+                identifiers.append(tok_val)
+            else:
+                line, column = position(current)
+                raise ValueError(f"Expected identifier or variable after 'show' at line {line}, character {column}")
+            idx += 1
+        return idx + 1, (value, identifiers)
+    elif is_identifier(value):
+        return _parse_assignment(values, position, current, declared, assignments, intern_leaf, intern), ('=', [value])
+    else:
+        line, column = position(current)
+        raise ValueError(f"Unexpected token \"{value}\" at line {line}, character {column}")
+
+
 def parse(file) -> Tuple[List[str], Dict[str, Tuple], List[Tuple[str, List]]]:
-    tokenizer = Tokenizer() # Tokenizer object
+    tokenizer = Tokenizer() # Tokenizer object
     tokens = tokenizer.tokenize(file) # List of tokens
+    return parse_tokens(tokens)
 
-    current = 0 # Index of the current token
+
+class DefinitionGraph:
+    """
+    Dependency graph of the assignments of a program. A definition is one
+    assignment statement, under any key that tells the statements apart. It
+    reads the definitions current, when it is parsed, of the names it
+    references; a show reads the last definition of its names, since the trees
+    are built once the whole program is parsed.
+    """
+    __slots__ = ['current', 'reads', 'names', 'shown']
+
+    def __init__(self):
+        self.current: Dict[str, Any] = {} # name -> key of its latest definition
+        self.reads: Dict[Any, List] = {} # key -> keys of the definitions it reads
+        self.names: Dict[Any, str] = {} # key -> assigned name, in program order
+        self.shown = set()
+
+    def assign(self, key, name, referenced):
+        current = self.current
+        self.reads[key] = [current[ref] for ref in referenced if ref in current]
+        self.names[key] = name
+        current[name] = key
+
+    def show(self, names):
+        self.shown.update(names)
+
+    def needed(self) -> set:
+        """Keys of the definitions the shows need, directly or through other definitions."""
+        current, reads = self.current, self.reads
+        needed = set()
+        stack = [current[name] for name in self.shown if name in current]
+        while stack:
+            key = stack.pop()
+            if key not in needed:
+                needed.add(key)
+                stack.extend(reads[key])
+        return needed
+
+
+def needed_assignments(tokens) -> Tuple[set, List[Tuple[str, int]]]:
+    """
+    Dependency pass over the tokens, before parsing: statements are only split
+    at their ';', nothing is checked.
+    Outputs:
+        (token indices of the assignment statements the shows need, for parse_tokens,
+         (name, line) of every other definition in program order)
+    """
+    values, position = token_values(tokens)
+    graph = DefinitionGraph()
+    statements = {} # token index of a definition -> index of its statement
+    current, end, statement = 0, len(values), 0
+    while current < end:
+        try:
+            stop = values.index(';', current)
+        except ValueError:
+            stop = end
+        value = values[current]
+        if is_instruction(values, current):
+            graph.show(values[current + 1:stop])
+        elif is_identifier(value):
+            graph.assign(current, value, values[current + 2:stop])
+            statements[current] = statement
+        current = stop + 1
+        statement += 1
+    needed = graph.needed()
+    skipped = [(key, name) for key, name in graph.names.items() if key not in needed]
+    if skipped and isinstance(tokens, TokenStream):
+        # the lines of the statements are much cheaper than the position of every token
+        lines = tokens.statement_lines()
+        return needed, [(name, lines[statements[key]]) for key, name in skipped]
+    return needed, [(name, position(key)[0]) for key, name in skipped]
+
+
+def format_skipped(skipped: List[Tuple[str, int]]) -> List[str]:
+    lines = [f"# skipped {len(skipped)} definitions no show needs"]
+    lines.extend(f"#   {name} (line {line})" for name, line in skipped)
+    return lines
+
+
+def _ignore(*args):
+    return None
+
+
+def parse_tokens(tokens, needed=None) -> Tuple[List[str], Dict[str, Tuple], List[Tuple[str, List]]]:
+    """
+    Parses the output of Tokenizer.tokenize, so both phases can be run and timed on their own.
+    Inputs:
+        needed: token indices of the assignment statements to build, see needed_assignments; the
+            others are checked like the rest of the program but build nothing and are left out of
+            the assignments. Every assignment is built when None.
+    """
+    values, position = token_values(tokens)
+    current = 0 # Index of the current token
     
     
-    variables = [] # Set of variable names
-    assignments = {} # Dictionary of variable assignments
+    variables = [] # Set of variable names
+    declared = set() # The same names, for membership tests
+    assignments = {} # Dictionary of variable assignments
     show_instructions = []
+    expressions = ExpressionTable() # Shared subexpressions of all the assignments
 
-    while current < len(tokens):
-        current_token = tokens[current]
-        # if the token is a var we want to get the following tokens until we find a ';'
-        if match(current_token, 'KEYWORD', 'var'):
-            idx = current + 1 # Skip the 'var' keyword
-            while not end_of_line(tokens[idx]):
-                if match(tokens[idx], 'IDENTIFIER'):
-
-                    if tokens[idx].value in variables:
-                        raise ValueError(f"Variable {tokens[idx].value} is declared more than once")
-
-                    variables.append(tokens[idx].value)
-                else:
-                    raise ValueError(f"Expected identifier after 'var' at line {current_token.line}, character {current_token.column}")
-                idx += 1
-            current = idx + 1
-        elif match(current_token, 'KEYWORD', 'show') or match(current_token, 'KEYWORD', 'show_ones'):
-            show_type = current_token.value
-            idx = current + 1
-            identifiers = []
-            while not end_of_line(tokens[idx]):
-                if match(tokens[idx], 'IDENTIFIER'):
-                    tok_val = tokens[idx].value
-                    if tok_val not in variables and tok_val not in assignments.keys():
-                        raise ValueError(f"Identifier {tok_val} in instruction of type \"show\" is not declared")
-                    identifiers.append(tok_val)
-                else:
-                    raise ValueError(f"Expected identifier or variable after 'show' at line {current_token.line}, character {current_token.column}")
-                idx += 1
-            show_instructions.append((show_type, identifiers))
-            current = idx + 1
-        elif match(current_token, 'IDENTIFIER'):
-            current = parse_assignment(tokens, current, variables, assignments)
+    while current < len(values):
+        if needed is None or current in needed:
+            intern_leaf, intern = expressions.intern_leaf, expressions.intern
         else:
-            raise ValueError(f"Unexpected token \"{current_token.value}\" at line {current_token.line}, character {current_token.column}")
+            intern_leaf = intern = _ignore
+        current, (kind, names) = parse_statement(values, position, current, declared, assignments, intern_leaf, intern)
+        if kind == 'var':
+            variables.extend(names)
+        elif kind != '=':
+            show_instructions.append((kind, names))
+
+    if needed is not None:
+        # a skipped definition parses to None, it only mattered for the checks
+        assignments = {name: expr for name, expr in assignments.items() if expr is not None}
     
     return variables, assignments, show_instructions
 
@@ -0,0 +1,133 @@
+from time import perf_counter, process_time
+from typing import Dict
+
+
+class _Phase:
+    # context manager adding the wall-clock and CPU time of its block to a phase of the profiler
+    __slots__ = ['totals', 'wall', 'cpu']
+
+    def __init__(self, totals):
+        self.totals = totals
+
+    def __enter__(self):
+        self.wall = perf_counter()
+        self.cpu = process_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        totals = self.totals
+        totals['wall_seconds'] += perf_counter() - self.wall
+        totals['cpu_seconds'] += process_time() - self.cpu
+        totals['count'] += 1
+        return False
+
+
+class _Output(_Phase):
+    # a build phase that also records what building one output did to the manager
+    __slots__ = ['manager', 'lookups', 'hits']
+
+    def __init__(self, totals, manager):
+        super().__init__(totals)
+        self.manager = manager
+
+    def __enter__(self):
+        cache = self.manager.operation_cache
+        self.lookups, self.hits = cache.hits + cache.misses, cache.hits
+        return super().__enter__()
+
+    def __exit__(self, *exc_info):
+        super().__exit__(*exc_info)
+        manager, totals = self.manager, self.totals
+        cache = manager.operation_cache
+        lookups = cache.hits + cache.misses - self.lookups
+        hits = cache.hits - self.hits
+        totals['ite_calls'] += lookups
+        totals['cache_hits'] += hits
+        totals['cache_hit_rate'] = totals['cache_hits'] / totals['ite_calls'] if totals['ite_calls'] else 0.0
+        totals['unique_table'] = manager.node_count
+        return False
+
+
+class Profiler:
+    """
+    Per-phase wall-clock and CPU timers and per-output statistics of the BDD
+    manager. Phases with the same name add up. The statistics of an output are
+    the steps of ite it took (computed-table lookups), their hit rate and the
+    size of the unique table once it is built.
+
+        with profiler.phase('parse'):
+            ...
+        with profiler.output(name, manager):
+            manager.build(name, expression)
+    """
+    enabled = True
+
+    def __init__(self):
+        self.phases: Dict[str, dict] = {}
+        self.outputs: Dict[str, dict] = {}
+        self.manager = None
+
+    def phase(self, name):
+        totals = self.phases.get(name)
+        if totals is None:
+            totals = self.phases[name] = {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'count': 0}
+        return _Phase(totals)
+
+    def output(self, name, manager):
+        self.manager = manager
+        totals = self.outputs.get(name)
+        if totals is None:
+            totals = self.outputs[name] = {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'count': 0, 'ite_calls': 0,
+                                           'cache_hits': 0, 'cache_hit_rate': 0.0, 'unique_table': 0}
+        return _Output(totals, manager)
+
+    def stats(self) -> dict:
+        """Everything collected so far, with the node and cache totals of the last manager, as plain JSON types."""
+        stats = {'phases': self.phases, 'outputs': self.outputs}
+        manager = self.manager
+        if manager is not None:
+            for name, totals in self.outputs.items():
+                # the output may have been reduced or reordered since it was built
+                if name in manager:
+                    totals['nodes'] = len(manager.reachable_nodes([manager[name].root]))
+            stats['nodes'] = {
+                'live': manager.node_count,
+                # the columns only grow, their length is the largest number of nodes held at once
+                'peak': len(manager.node_var) - 1,
+                'unique_table_slots': len(manager.hash_index),
+                'bytes': manager.memory_usage(),
+            }
+            stats['caches'] = manager.cache_stats()
+            stats['gc'] = manager.gc_stats()
+            stats['reorders'] = manager.reorders
+        return stats
+
+
+class _NullPhase:
+    __slots__ = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class NullProfiler:
+    """Profiler that records nothing, every hook returns the same no-op context manager."""
+    enabled = False
+
+    def phase(self, name):
+        return _NULL_PHASE
+
+    def output(self, name, manager):
+        return _NULL_PHASE
+
+    def stats(self) -> dict:
+        return {}
+
+
+NULL_PROFILER = NullProfiler()
@@ -1,6 +1,13 @@
-from project.parser import parse
-from project.ROBDD import ROBDD
-from itertools import product
+import sys
+from project.bddcache import ExpressionDigests
+from project.bddfile import dump
+from project.emitter import ORDER_BINARY, assignments, count_rows, format_row, ones_cubes, ones_rows, table_rows, write_rows, write_table
+from project.ordering import HEURISTIC_DECLARED, variable_order
+from project.parallel import write_table_parallel
+from project.parser import needed_assignments, parse_tokens
+from project.profiling import NULL_PROFILER
+from project.ROBDD import BDDManager
+from project.tokenizer import Tokenizer
 
 
 class CodeInterpreter:
@@ -22,12 +29,25 @@ class CodeInterpreter:
     """
 
 
-    def __init__(self, file) -> None:
-        self.file_content = self._read_file(file)
-        self.variables, self.assignments, self.show_instructions = self._parse_content()
+    def __init__(self, file, order = ORDER_BINARY, out = None, reorder_threshold = None, heuristic = HEURISTIC_DECLARED, cubes = False, workers = 1, profiler = None, lazy = True, cache = None) -> None:
+        # collects per-phase timers and per-output statistics, the null profiler records nothing
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+        self.lazy = lazy # only the assignments the shows need are built
+        self.skipped = [] # (name, line) of every definition left out by the lazy build
+
+        self._load(file)
 
+        self.manager = None
         self.trees = {}
 
+        self.order = order # order in which the rows of a show are walked, binary or gray
+        self.out = out # stream the tables are written to, sys.stdout when None
+        self.reorder_threshold = reorder_threshold # node count that triggers sifting while building, None disables it
+        self.heuristic = heuristic # picks the initial variable order inside the manager, the columns keep the declared one
+        self.cubes = cubes # show_ones prints disjoint cubes with '-' for don't cares instead of every row
+        self.workers = workers # processes writing the rows of a show, None for one per CPU
+        self.cache = cache # BDDCache the outputs are loaded from and written to, None to always build them
+
     
     def interpet(self, reduce = True):
         """
@@ -43,6 +63,8 @@ class CodeInterpreter:
         # populate the trees dictionary with the ROBDDs for all required assignments
         self._build_robdds(reduce=reduce)
 
+        profiler = self.profiler
+
         for instruction_type, output_vars_list in self.show_instructions:
             # we iterate over the declared variables and build the tree
             # for every set of shows in the instructions
@@ -50,84 +72,103 @@ class CodeInterpreter:
             # if the instruction is show or show_ones
             if instruction_type == "show":
                 # we build the trees for the assignments in this show and then evaluate them
-                self._show_lazy(output_vars_list)
+                with profiler.phase('emit'):
+                    self._show_lazy(output_vars_list)
             elif instruction_type == "show_ones":
 
-                self._show_ones(output_vars_list)
+                with profiler.phase('emit'):
+                    self._show_ones(output_vars_list)
+            elif instruction_type == "count":
+                with profiler.phase('emit'):
+                    self._count(output_vars_list)
             else:
                 raise ValueError("Invalid instruction type")
 
     # Build ROBDDs for all required assignment at once
     def _build_robdds(self, reduce = True):
-        robdd = ROBDD()
+        # one manager for the whole program, so every output reuses the nodes
+        # already built for the intermediate assignments it shares with the others
+        profiler = self.profiler
+        with profiler.phase('order'):
+            order = variable_order(self.heuristic, self.variables, self.assignments, self.show_instructions)
+        self.manager = BDDManager(self.variables, reorder_threshold=self.reorder_threshold, order=order)
         # _ takes in the show or show_ones and the name of the variable is in name
-        # we take the assignment corresponding to the name and build the robdd
+        # we take the assignment corresponding to the name and build the robdd
         # so we can evaluate it later
+        digests = ExpressionDigests() # of the subexpressions, shared by the cache keys of every output
         for show_type, names in self.show_instructions:
             for name in names:
-                expr = self.assignments[name]
-                self.trees[name] = robdd.build(expr, self.variables, reduce=False)
-                # we reduce the tree with the show_ones flag if showing ones otherwise we normally reduce
-                self.trees[name].reduce(show_type == 'show_ones') 
+                if name in self.trees:
+                    continue
+                expr = self.assignments.get(name, name)
+                with profiler.phase('build'), profiler.output(name, self.manager):
+                    if self.cache is not None:
+                        self.trees[name] = self.cache.build(self.manager, name, expr, digests)
+                    else:
+                        self.trees[name] = self.manager.build(name, expr)
+        # reducing cleans the unique table, so it is done once after every output is built
+        # and the intermediate nodes stay available to all of them while building
+        if reduce:
+            with profiler.phase('reduce'):
+                self.manager.reduce()
         
     def _show(self):
         return
     
 
     def _show_ones(self, output_vars_list):
-        all_vars = self.variables  # Use the original order of variables
-        
-        print(self._create_header(all_vars, output_vars_list))
+        out = self._output()
+
+        out.write(self._create_header(self.variables, output_vars_list) + "\n")
 
-        # Get assignments leading to one for all output variables
-        all_assignments = set()
-        for output_var in output_vars_list:
-            one_assignments = self.trees[output_var].get_complete_assignments_to_one()
-            all_assignments.update(tuple((var, assignment[var]) for var in all_vars) for assignment in one_assignments)
+        # the rows come straight from the BDDs, in the original order of the variables
+        trees = [self.trees[name] for name in output_vars_list]
+        rows = ones_cubes if self.cubes else ones_rows
+        write_rows(rows(trees, len(self.variables)), out)
 
-        # Convert back to dictionaries and sort based on the original variable order
-        all_assignments = [dict(assignment) for assignment in all_assignments]
-        all_assignments.sort(key=lambda x: tuple(x[var] for var in all_vars))
 
-        # Print the assignments
-        for assignment in all_assignments:
-            output_results = [self.trees[var].evaluate(assignment) for var in output_vars_list]
-            print(self._create_line(assignment, output_results))
 
+    def _count(self, output_vars_list):
+        out = self._output()
 
+        # sizes the show_ones tables of the outputs without printing them
+        out.write("# count " + " ".join(output_vars_list) + "\n")
+        trees = [self.trees[name] for name in output_vars_list]
+        write_rows(count_rows(output_vars_list, trees), out)
 
     # blindly evaluates all assignments regardless of the expression 
-    # form and then passes those to the evaluate to perform computations
+    # form and streams the rows out in chunks as they are evaluated
     def _show_lazy(self, output_vars_list):
-        combinations = self._generate_assignments(self.variables)
-        
+        out = self._output()
+
         # print header
-        print(self._create_header(self.variables, output_vars_list))
-
-        for comb in combinations:
-            assingment_results = []
-
-            # for every var in the assignment
-            for output_vars_list in self.trees.keys():
-                res = self.trees[output_vars_list].evaluate(comb)
-                assingment_results.append(res)
-            
-            #print line
-            print(self._create_line(comb, assingment_results))
+        out.write(self._create_header(self.variables, output_vars_list) + "\n")
+
+        trees = [self.trees[name] for name in output_vars_list]
+        if self.order == ORDER_BINARY:
+            # whole blocks of rows are evaluated bit-parallel and written at once, slices of them in other processes
+            if self.workers == 1:
+                write_table(trees, len(self.variables), out)
+            else:
+                write_table_parallel(trees, len(self.variables), out, self.workers)
+        else:
+            write_rows(table_rows(trees, len(self.variables), self.order), out)
     
     def _show_ones_lazy(self, output_vars_list):
-        combinations = self._generate_assignments(self.variables)
+        out = self._output()
 
         # print header
-        print(self._create_header(self.variables, output_vars_list))
+        out.write(self._create_header(self.variables, output_vars_list) + "\n")
 
-        for comb in combinations:
-            # for every var in the assignment 
-            # we evaluate the tree and if the result is 1 we print the line
-            assingment_results = [self.trees[output_vars_list].evaluate(comb) for output_vars_list in self.trees.keys()]
+        # we evaluate the trees on every assignment and only keep the lines with a 1
+        evaluators = [self.trees[name].evaluate_values for name in output_vars_list]
+        results = ((values, [evaluate(values) for evaluate in evaluators])
+                   for values in assignments(len(self.variables), self.order))
+        write_rows((format_row(values, row) for values, row in results if any(row)), out)
 
-            if any(assingment_results):
-                print(self._create_line(comb, assingment_results))
+    def _output(self):
+        # resolved on every call so a redirected sys.stdout is honoured
+        return self.out if self.out is not None else sys.stdout
 
     def _create_header(self, variables, output_vars):
         return "# " + " ".join(variables) + " | " + " ".join(output_vars)
@@ -136,11 +177,34 @@ class CodeInterpreter:
         return f"  " + " ".join(str(int(tv)) for tv in truth_values.values()) + "   " + " ".join(str(int(x)) for x in output_results)
 
     def _generate_assignments(self, variables):
-        return [dict(zip(variables, values)) for values in product([0, 1], repeat=len(variables))]
+        return (dict(zip(variables, values)) for values in assignments(len(variables), self.order))
     
+    def _load(self, file):
+        # the whole program is read and parsed before anything is built
+        with self.profiler.phase('read'):
+            self.file_content = self._read_file(file)
+        self.variables, self.assignments, self.show_instructions = self._parse_content()
+
     def _read_file(self, file):
         with open(file, 'r') as file:
             return file.read()
         
     def _parse_content(self):
-        return parse(self.file_content)
\ No newline at end of file
+        with self.profiler.phase('tokenize'):
+            tokens = Tokenizer().tokenize(self.file_content)
+        with self.profiler.phase('parse'):
+            needed = None
+            if self.lazy:
+                # the dependency pass decides which assignments the shows need
+                needed, self.skipped = needed_assignments(tokens)
+            return parse_tokens(tokens, needed)
+
+    def save(self, path):
+        """Writes the built outputs to path in the binary format of bddfile, to be mapped with MappedBDD."""
+        dump(self.manager, {name: robdd.root for name, robdd in self.trees.items()}, path)
+
+    def stats(self):
+        stats = self.profiler.stats()
+        if self.cache is not None:
+            stats['disk_cache'] = self.cache.stats()
+        return stats
\ No newline at end of file
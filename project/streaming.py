@@ -0,0 +1,218 @@
+from collections import deque
+from typing import Dict, List, Tuple
+
+from project.emitter import ORDER_BINARY
+from project.ordering import HEURISTIC_DECLARED
+from project.parser import DefinitionGraph, is_instruction, parse, parse_statement
+from project.ROBDD import OP_NOT, ROBDD, BDDManager
+from project.runner import CodeInterpreter
+from project.tokenizer import Tokenizer, split_statements
+
+CHUNK_SIZE = 1 << 16         # characters read from the file at a time
+COLLECT_THRESHOLD = 1 << 16  # live nodes past which the dead ones are collected, doubles with the live ones
+
+
+def read_chunks(file, chunk_size: int = CHUNK_SIZE):
+    with open(file, 'r') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def statement_tokens(file, chunk_size: int = CHUNK_SIZE):
+    # the tokens of one statement at a time, their positions are relative to the statement, and the
+    # line of its first token, numbered like the lines of the stripped program in the tokenizer
+    tokenizer = Tokenizer()
+    newlines, first = 0, None
+    for statement in split_statements(read_chunks(file, chunk_size)):
+        tokens = tokenizer.tokenize(statement)
+        line = newlines + statement.count('\n', 0, len(statement) - len(statement.lstrip()))
+        if first is None:
+            first = line
+        newlines += statement.count('\n')
+        yield tokens.values, tokens.position, line - first + 1
+
+
+def _nothing(*args):
+    return None
+
+
+class ProgramOutline:
+    """
+    What the first pass over a program learns, without keeping any expression.
+        variables: every declared variable in declaration order, the columns of every table
+        final: name -> index of the statement of its last assignment
+        flush_at: index of a show statement -> index of the statement after which it is written
+        needed_until: name -> index of the last statement that reads it
+        needed: indices of the assignment statements the shows need, all of them when None
+        skipped: (name, line) of every other definition
+    """
+    __slots__ = ['variables', 'final', 'flush_at', 'needed_until', 'needed', 'skipped']
+
+    def __init__(self):
+        self.variables: List[str] = []
+        self.final: Dict[str, int] = {}
+        self.flush_at: Dict[int, int] = {}
+        self.needed_until: Dict[str, int] = {}
+        self.needed = None
+        self.skipped: List[Tuple[str, int]] = []
+
+
+def scan_program(file, chunk_size: int = CHUNK_SIZE, lazy: bool = True) -> ProgramOutline:
+    """
+    Checks the program one statement at a time and outlines it. A show prints
+    the last assignment of its names, as when the whole program is parsed
+    before anything is built, so a show waits for the last assignment of its
+    names and every show after it waits with it to keep the output in order.
+    With lazy, only the assignments the shows need are marked to be built.
+    Raises the ValueError parse would raise on the same program.
+    """
+    outline = ProgramOutline()
+    final, needed_until = outline.final, outline.needed_until
+    declared, assignments, shows = set(), {}, []
+    graph, lines = DefinitionGraph(), {}
+    k = -1
+    try:
+        for k, (values, position, line) in enumerate(statement_tokens(file, chunk_size)):
+            _, (kind, names) = parse_statement(values, position, 0, declared, assignments, _nothing, _nothing)
+            if kind == 'var':
+                outline.variables.extend(names)
+            elif kind == '=':
+                # the assignments read by the expression, the assigned name included when it was assigned before
+                for value in values[2:]:
+                    if value in final:
+                        needed_until[value] = k
+                final[names[0]] = k
+                graph.assign(k, names[0], values[2:])
+                lines[k] = line
+            else:
+                shows.append((k, names))
+                graph.show(names)
+        if k < 0:
+            # a program without any statement, the tokenizer rejects it as a whole
+            raise ValueError("Expected ';' at the end of the line")
+    except ValueError as error:
+        _report_error(file, error)
+
+    latest = -1
+    for k, names in shows:
+        latest = max(latest, k, *(final.get(name, -1) for name in names))
+        outline.flush_at[k] = latest
+        for name in names:
+            needed_until[name] = max(needed_until.get(name, -1), latest)
+    if lazy:
+        outline.needed = graph.needed()
+        outline.skipped = [(name, lines[key]) for key, name in graph.names.items() if key not in outline.needed]
+    return outline
+
+
+def _report_error(file, error):
+    # the positions of a statement's tokens are relative to the statement, parsing the
+    # whole program reports the very error parse does, with its line and character
+    with open(file, 'r') as f:
+        text = f.read()
+    try:
+        parse(text)
+    except ValueError as exact:
+        raise exact from None
+    raise error
+
+
+class StreamingInterpreter(CodeInterpreter):
+    """
+    CodeInterpreter that never holds the whole program. The file is read in
+    chunks and handled one ';'-terminated statement at a time: every assignment
+    is compiled into the BDD manager while it is parsed, with no expression tree
+    at all, and every show is written as soon as the assignments it prints are
+    built. A first pass over the file checks the program and finds the declared
+    variables, since the columns of every table are all of them, so an invalid
+    program fails before anything is written, like CodeInterpreter. The roots
+    are dropped after the last statement reading them and the dead nodes are
+    collected as the store grows, so the memory is bounded by the live BDDs.
+
+    The variables keep the declared order, heuristics need the whole program.
+    """
+
+    def __init__(self, file, order = ORDER_BINARY, out = None, reorder_threshold = None, heuristic = HEURISTIC_DECLARED, cubes = False, workers = 1, profiler = None, lazy = True, chunk_size = CHUNK_SIZE) -> None:
+        if heuristic != HEURISTIC_DECLARED:
+            raise ValueError(f"Streaming builds in the declared variable order, the '{heuristic}' heuristic needs the whole program")
+        self.chunk_size = chunk_size
+        super().__init__(file, order, out, reorder_threshold, heuristic, cubes, workers, profiler, lazy)
+
+    def _load(self, file):
+        self.file = file
+        with self.profiler.phase('scan'):
+            self.outline = scan_program(file, self.chunk_size, self.lazy)
+        self.variables = self.outline.variables
+        self.skipped = self.outline.skipped
+        # nothing of the program is kept besides the outline
+        self.assignments = {}
+        self.show_instructions = []
+
+    def interpet(self, reduce = True):
+        """
+        Builds and shows the program statement by statement. The BDDs are built
+        reduced by mk, there is no separate reduce step.
+        """
+        outline, profiler = self.outline, self.profiler
+        manager = self.manager = BDDManager(self.variables, reorder_threshold=self.reorder_threshold)
+
+        def intern(op, operands):
+            # negation flips the complement bit of the reference
+            return operands[0] ^ 1 if op == OP_NOT else manager.combine(op, operands)
+
+        release: Dict[int, List[str]] = {}
+        for name, k in outline.needed_until.items():
+            release.setdefault(k, []).append(name)
+
+        refs = {} # name -> node reference of its current assignment, while a later statement reads it
+        declared = set(self.variables)
+        pending = deque() # shows waiting for the last assignment of one of their names
+        collect_at = COLLECT_THRESHOLD
+        # the program was checked by the first pass, only the assignments to build are parsed again
+        for k, (values, position, _) in enumerate(statement_tokens(self.file, self.chunk_size)):
+            kind = values[0]
+            if is_instruction(values, 0):
+                pending.append((k, kind, values[1:-1]))
+            elif kind != 'var' and (outline.needed is None or k in outline.needed):
+                with profiler.phase('build'):
+                    parse_statement(values, position, 0, declared, refs, manager.build_leaf, intern)
+
+            while pending and outline.flush_at[pending[0][0]] <= k:
+                _, show_type, show_names = pending.popleft()
+                with profiler.phase('emit'):
+                    self._flush(show_type, show_names, refs)
+
+            # an assignment no later statement reads is dropped right away
+            if kind in refs and outline.needed_until.get(kind, -1) <= k:
+                del refs[kind]
+            for name in release.pop(k, ()):
+                refs.pop(name, None)
+            if self.reorder_threshold is not None and manager.node_count > manager.reorder_threshold:
+                with profiler.phase('reorder'):
+                    manager.reorder(keep=refs.values())
+            elif manager.node_count > collect_at:
+                manager.collect(keep=refs.values())
+                collect_at = max(COLLECT_THRESHOLD, 2 * manager.node_count)
+
+    def save(self, path):
+        # the roots are dropped as soon as no statement reads them
+        raise ValueError("Streaming keeps no BDD once it is shown, build the whole program with CodeInterpreter to save it")
+
+    def _flush(self, instruction_type, names, refs):
+        # views on the current roots for the show methods, a name without assignment is a variable
+        self.trees = {}
+        for name in names:
+            robdd = self.trees[name] = ROBDD(self.manager)
+            robdd.root = refs[name] if name in refs else self.manager.build_leaf(name)
+
+        if instruction_type == "show":
+            self._show_lazy(names)
+        elif instruction_type == "show_ones":
+            self._show_ones(names)
+        elif instruction_type == "count":
+            self._count(names)
+        else:
+            raise ValueError("Invalid instruction type")
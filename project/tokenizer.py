@@ -1,5 +1,11 @@
 from pprint import pprint
+from array import array
+import re
+
+
 class Token:
+    __slots__ = ['type', 'value', 'line', 'column']
+
     def __init__(self, type, value, line=None, column=None):
         self.type = type
         self.value = value
@@ -8,56 +14,182 @@ class Token:
 
     def __repr__(self):
         return f'Token({self.type}, {self.value}, {self.line}, {self.column})'
-    
+
+
+KEYWORDS = frozenset({'var', 'show', 'show_ones', 'not', 'and', 'or', 'True', 'False'})
+SPECIAL_CHARS = frozenset({'(', ')', '=', ';'})
+
+# \w matches exactly str.isalnum() or '_', so a lexeme is an identifier or keyword, a special character or a comment
+_COMMENT = re.compile(r"\#[^\n]*")
+_POSITION = re.compile(r"\#[^\n]*|(?P<newline>\n)|(?P<lexeme>[^\W\d]\w*|[()=;])")
+# what may not start a lexeme: a character that is neither whitespace, \w nor special, or a \w character
+# that is not a letter or '_'; \d covers the digits, the other non-ASCII starts are checked with isalpha
+_INVALID = re.compile(r"\#[^\n]*|(?P<invalid>[^\s\w()=;]|(?<!\w)\d)|(?P<unicode>(?<!\w)[^\x00-\x7f\W])")
+_DIGIT_START = re.compile(r"(?<!\w)\d")
+_SPACES = re.compile(r"\s*")
+# code made of these characters only is valid unless a word starts with a digit
+_PLAIN_CHARACTERS = frozenset(c for c in map(chr, range(128)) if c.isalnum() or c.isspace() or c in '_()=;')
+_DIGITS = frozenset('0123456789')
+
+
+class TokenStream:
+    """
+    The tokens of a program as parallel sequences instead of one object per
+    lexeme: the values come from splitting the text, the type of a token
+    follows from its value, and the line and column of the tokens are only
+    computed, in one more pass over the text, once one of them is asked for.
+    Indexing returns a Token, token_list all of them at once.
+    """
+    __slots__ = ['text', 'values', 'keywords', 'special_chars', 'lines', 'columns']
+
+    def __init__(self, text, values, keywords, special_chars):
+        self.text = text
+        self.values = values
+        self.keywords = keywords
+        self.special_chars = special_chars
+        self.lines = None
+        self.columns = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.token_list()[index]
+        value = self.values[index]
+        line, column = self.position(index)
+        return Token(self.type(value), value, line, column)
+
+    def __iter__(self):
+        return iter(self.token_list())
+
+    def __repr__(self):
+        return repr(self.token_list())
+
+    def type(self, value):
+        if value in self.special_chars:
+            return 'SPECIAL'
+        return 'KEYWORD' if value in self.keywords else 'IDENTIFIER'
+
+    def position(self, index):
+        # (line, column) of the index-th token, both numbered from 1
+        if self.lines is None:
+            self._find_positions()
+        if index < 0:
+            index += len(self.values)
+        return self.lines[index], self.columns[index]
+
+    def token_list(self):
+        if self.lines is None:
+            self._find_positions()
+        type = self.type
+        return [Token(type(value), value, line, column) for value, line, column in zip(self.values, self.lines, self.columns)]
+
+    def statement_lines(self):
+        # line of the first token of every ';'-terminated statement; the code holds one ';' per
+        # statement, so this needs no position of the other tokens
+        code = _strip_comments(self.text)
+        lines = array('i')
+        line, counted, start = 1, 0, 0
+        semicolon = code.find(';')
+        while semicolon >= 0:
+            first = _SPACES.match(code, start).end()
+            line += code.count('\n', counted, first)
+            counted = first
+            lines.append(line)
+            start = semicolon + 1
+            semicolon = code.find(';', start)
+        return lines
+
+    def _find_positions(self):
+        lines, columns = array('i'), array('i')
+        line_num, line_start = 1, 0
+        for match in _POSITION.finditer(self.text):
+            if match.lastgroup == 'lexeme':
+                lines.append(line_num)
+                columns.append(match.start() - line_start + 1)
+            elif match.lastgroup == 'newline':
+                line_num += 1
+                line_start = match.end()
+        self.lines, self.columns = lines, columns
+
 
 class Tokenizer:
     def __init__(self):
-        self.keywords = {'var', 'show', 'show_ones', 'not', 'and', 'or', 'True', 'False'}
-        self.special_chars = {'(', ')', '=', ';'}
+        self.keywords = set(KEYWORDS)
+        self.special_chars = set(SPECIAL_CHARS)
 
     def tokenize(self, text):
-        tokens = []
-        lines = text.strip().split('\n')
-        for line_num, line in enumerate(lines, 1):
-            i = 0  # Index of the current character
-            while i < len(line):
-                char = line[i]
-                
-                # Skip whitespace
-                if char.isspace():
-                    i += 1
-                    continue
-                
-                # Handle comments
-                if char == '#':
-                    break  # Skip the rest of the line
-                
-                # Handle special characters
-                if char in self.special_chars:
-                    tokens.append(Token('SPECIAL', char, line_num, i + 1))
-                    i += 1
-                    continue
-                
-                # Handle vars, identifiers and keywords
-                if char.isalpha() or char == '_':
-                    start = i
-                    while i < len(line) and (line[i].isalnum() or line[i] == '_'):
-                        i += 1
-                    word = line[start:i]
-                    if word in self.keywords:
-                        tokens.append(Token('KEYWORD', word, line_num, start + 1))
-                    else:
-                        tokens.append(Token('IDENTIFIER', word, line_num, start + 1))
-                    continue
-                
-                # Handle unexpected characters
-                raise ValueError(f"Unexpected character: {char} at line {line_num}, character {i + 1}")
+        """
+        Splits the text into a TokenStream. Lines are the lines of the stripped
+        text, numbered from 1, and a column is the 1-based position of a
+        character in its line. Nothing loops over the characters in Python: the
+        set of characters of the code tells whether it can hold an unexpected
+        one, only then is it looked for with a regular expression, and once the
+        code is known to hold nothing but words, special characters and
+        whitespace, spacing out the special characters and splitting on
+        whitespace yields the values of the tokens.
+        """
+        text = text.strip()
+        code = _strip_comments(text)
+        characters = set(code)
+        if not characters <= _PLAIN_CHARACTERS or (characters & _DIGITS and _DIGIT_START.search(code)):
+            self._check_characters(text)
+
+        values = code.replace('(', ' ( ').replace(')', ' ) ').replace('=', ' = ').replace(';', ' ; ').split()
 
         # Check for the final semicolon
-        if len(tokens) == 0 or tokens[-1].value != ';':
+        if len(values) == 0 or values[-1] != ';':
             raise ValueError("Expected ';' at the end of the line")
 
-        return tokens
+        return TokenStream(text, values, self.keywords, self.special_chars)
+
+    def _check_characters(self, text):
+        # raises on the first character that can not start a lexeme, non-ASCII letters are fine
+        for match in _INVALID.finditer(text):
+            if match.lastgroup is None or (match.lastgroup == 'unicode' and match.group().isalpha()):
+                continue
+            # Handle unexpected characters
+            line_start = text.rfind('\n', 0, match.start()) + 1
+            line_num = text.count('\n', 0, line_start) + 1
+            raise ValueError(f"Unexpected character: {match.group()} at line {line_num}, character {match.start() - line_start + 1}")
+
+
+def _strip_comments(text):
+    return _COMMENT.sub('', text) if '#' in text else text
+
+
+def split_statements(chunks):
+    """
+    The ';'-terminated statements of a program given as consecutive pieces of
+    its text, comments removed. A comment runs to the end of its line, so only
+    complete lines have their comments removed; the rest of the text waits for
+    the next piece. Text after the last ';' is yielded last when it is not blank,
+    tokenizing it raises like a program without its final ';'.
+    """
+    pending = '' # end of the text whose line is not complete yet
+    code = '' # start of the statement not terminated yet
+    for chunk in chunks:
+        pending += chunk
+        if '#' in pending:
+            end = pending.rfind('\n') + 1
+            if not end:
+                continue
+            lines, pending = pending[:end], pending[end:]
+        else:
+            lines, pending = pending, ''
+        code += _strip_comments(lines)
+        if ';' in code:
+            *statements, code = code.split(';')
+            for statement in statements:
+                yield statement + ';'
+    code += _strip_comments(pending)
+    *statements, code = code.split(';')
+    for statement in statements:
+        yield statement + ';'
+    if code.strip():
+        yield code
+
 
 if __name__=="__main__":
     #text_1 = "var x; var y; var z; show x; show_ones y; x = not y; y = x and z; z = x or y;"
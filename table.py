@@ -1,13 +1,44 @@
+import argparse
 import sys
+from project.bddcache import BDDCache, DEFAULT_MAX_BYTES
+from project.parser import format_skipped
 from project.runner import CodeInterpreter
+from project.streaming import StreamingInterpreter
 
-def main(file_path):
+def main(file_path, workers=1, stream=False, lazy=True, report_skipped=False, cache=None, cache_bytes=DEFAULT_MAX_BYTES, save=None):
 
-    CodeInterpreter(file_path).interpet()
+    if stream:
+        interpreter = StreamingInterpreter(file_path, workers=workers, lazy=lazy)
+    else:
+        interpreter = CodeInterpreter(file_path, workers=workers, lazy=lazy,
+                                      cache=BDDCache(cache, cache_bytes) if cache is not None else None)
+    interpreter.interpet()
+    if save is not None:
+        interpreter.save(save)
+    if report_skipped:
+        sys.stderr.write("\n".join(format_skipped(interpreter.skipped)) + "\n")
     
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python truth_table.py <input_file>")
-    else:
-        main(sys.argv[1])
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Print the truth tables of an input file")
+    parser.add_argument("file_path", help="Path to the input file")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="processes writing the rows of every show, 0 for one per CPU")
+    parser.add_argument("--stream", action="store_true",
+                        help="read, build and show one statement at a time instead of parsing the whole file first")
+    parser.add_argument("--eager", action="store_true", help="build every assignment, also the ones no show needs")
+    parser.add_argument("--report-skipped", action="store_true",
+                        help="list the definitions no show needs, which are not built, on stderr")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="directory of compiled BDDs shared between runs, the outputs found there are not built again")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_MAX_BYTES >> 20,
+                        help="size of the cache in MiB past which the least recently used BDDs are removed")
+    parser.add_argument("--save", metavar="FILE",
+                        help="write the BDDs of the shown outputs to a binary file that can be mapped without loading it")
+    args = parser.parse_args()
+    if args.stream and args.cache is not None:
+        parser.error("--cache needs the expressions of the whole program, it cannot be used with --stream")
+    if args.stream and args.save is not None:
+        parser.error("--save needs the BDDs of every output at the end, it cannot be used with --stream")
+    main(args.file_path, args.workers or None, args.stream, not args.eager, args.report_skipped,
+         args.cache, args.cache_mb << 20, args.save)
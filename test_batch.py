@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from io import StringIO
+from project.batch import (instance_files, output_file, run_batch, run_instance, summary,
+                           STATUS_ERROR, STATUS_OK, STATUS_TIMEOUT)
+from project.runner import CodeInterpreter
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.instances = os.path.join(self.root, 'instances')
+        os.makedirs(self.instances)
+        self.write('random0000.txt', "var a b c;\nx = a and (b or c);\nshow x;\nshow_ones x;\n")
+        self.write('random0001.txt', "var a b;\ny = a or (not b);\nz = not y;\nshow y z;\n")
+        self.write('broken.txt', "var a b;\nx = a and;\nshow x;\n")
+        self.write('notes.md', "not an instance")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.instances, name), 'w') as file:
+            file.write(text)
+
+    def expected(self, path):
+        out = StringIO()
+        CodeInterpreter(path, out=out).interpet()
+        return out.getvalue()
+
+    def test_directory_and_glob(self):
+        self.assertEqual([os.path.basename(path) for path in instance_files(self.instances)],
+                         ['broken.txt', 'random0000.txt', 'random0001.txt'])
+        self.assertEqual(len(instance_files(os.path.join(self.instances, 'random*.txt'))), 2)
+
+    def test_outputs_match_a_single_run(self):
+        paths = instance_files(os.path.join(self.instances, 'random*.txt'))
+        output_dir = os.path.join(self.root, 'out')
+        results = run_batch(paths, output_dir, workers=2)
+        self.assertEqual([result['status'] for result in results], [STATUS_OK, STATUS_OK])
+        for path, result in zip(paths, results):
+            self.assertEqual(result['output'], output_file(path, output_dir))
+            with open(result['output']) as file:
+                self.assertEqual(file.read(), self.expected(path))
+
+    def test_failures_leave_no_output(self):
+        output_dir = os.path.join(self.root, 'out')
+        results = run_batch(instance_files(self.instances), output_dir, workers=2)
+        self.assertEqual([result['status'] for result in results], [STATUS_ERROR, STATUS_OK, STATUS_OK])
+        self.assertFalse(os.path.exists(results[0]['output']))
+        self.assertEqual(sorted(os.listdir(output_dir)), ['random0000.out', 'random0001.out'])
+        stats = summary(results, 1.0)
+        self.assertEqual(stats['statuses'], {STATUS_ERROR: 1, STATUS_OK: 2})
+        self.assertEqual(stats['instances_per_second'], 3.0)
+
+    def test_timeout(self):
+        # 2^18 rows can not be written in a millisecond
+        variables = " ".join(f"v{i}" for i in range(18))
+        self.write('large.txt', f"var {variables};\nx = v0 or v17;\nshow x;\n")
+        path = os.path.join(self.instances, 'large.txt')
+        result = run_instance(path, os.path.join(self.root, 'large.out'), timeout=0.001)
+        self.assertEqual(result['status'], STATUS_TIMEOUT)
+        self.assertFalse(os.path.exists(result['output']))
+
+    def test_at_least_one_worker(self):
+        with self.assertRaises(ValueError):
+            run_batch([], os.path.join(self.root, 'out'), workers=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+from benchmarks.generator import generate
+from project import bddcache
+from project.batch import run_batch
+from project.bddcache import BDDCache, ExpressionDigests
+from project.parser import parse
+from project.ROBDD import BDDManager
+from project.runner import CodeInterpreter
+
+
+def _run_cached(arguments):
+    # one process of the concurrent test, the shared cache is opened in every one
+    path, directory = arguments
+    out = StringIO()
+    CodeInterpreter(path, out=out, cache=BDDCache(directory)).interpet()
+    return out.getvalue()
+
+
+class TestBDDCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.directory.name, 'cache')
+        self.path = os.path.join(self.directory.name, 'program.txt')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, text, path=None):
+        with open(path or self.path, 'w') as file:
+            file.write(text)
+
+    def run_program(self, cache=None, path=None, **options):
+        out = StringIO()
+        interpreter = CodeInterpreter(path or self.path, out=out, cache=cache, **options)
+        interpreter.interpet()
+        return out.getvalue(), interpreter
+
+    def entries(self):
+        return [name for _, _, names in os.walk(self.cache_dir) for name in names if name.endswith(bddcache.SUFFIX)]
+
+    def test_normalised_keys(self):
+        manager = BDDManager(['a', 'b', 'c'])
+        _, assignments, _ = parse("var a b c;\nx = a and (b or c);\ny = (c or b) and a and a;\nz = not not (a and (c or b));\n"
+                                  "w = a or (b and c);\nv = a and b and (b or c);\n")
+        cache = BDDCache(self.cache_dir)
+        keys = {name: cache.key(manager, expression) for name, expression in assignments.items()}
+        self.assertEqual(keys['x'], keys['y'])
+        self.assertEqual(keys['x'], keys['z'])
+        self.assertNotEqual(keys['x'], keys['w'])
+        # only the syntax is normalised, the same function written otherwise is another entry
+        self.assertNotEqual(keys['x'], keys['v'])
+        # the key holds the order of the variables the expression reads, not of the others
+        self.assertNotEqual(keys['x'], cache.key(BDDManager(['a', 'b', 'c'], order=['c', 'b', 'a']), assignments['x']))
+        self.assertEqual(keys['x'], cache.key(BDDManager(['q', 'a', 'b', 'c']), assignments['x']))
+
+    def test_miss_then_hit(self):
+        self.write(generate(3, variables=8, blocks=3, assignments=4, depth=5))
+        expected, _ = self.run_program()
+        output, interpreter = self.run_program(BDDCache(self.cache_dir))
+        self.assertEqual(output, expected)
+        written = interpreter.cache.writes
+        self.assertEqual(interpreter.cache.hits, 0)
+        self.assertEqual(len(self.entries()), written)
+
+        output, interpreter = self.run_program(BDDCache(self.cache_dir))
+        self.assertEqual(output, expected)
+        self.assertEqual(interpreter.stats()['disk_cache'], {'hits': written, 'misses': 0, 'writes': 0,
+                                                             'evictions': 0, 'errors': 0})
+
+    def test_hit_in_another_program(self):
+        text = generate(5, variables=7, blocks=2, assignments=4, depth=4)
+        self.write(text)
+        _, interpreter = self.run_program(BDDCache(self.cache_dir))
+        written = interpreter.cache.writes
+        # one more variable no expression reads, the entries hold only the variables they test
+        self.write("var extra;\n" + text)
+        expected, _ = self.run_program()
+        output, interpreter = self.run_program(BDDCache(self.cache_dir))
+        self.assertEqual(output, expected)
+        self.assertEqual((interpreter.cache.hits, interpreter.cache.misses), (written, 0))
+
+    def test_corrupt_entry_is_rebuilt(self):
+        self.write("var a b c;\nx = a and (b or c);\nshow x;\n")
+        expected, _ = self.run_program(BDDCache(self.cache_dir))
+        entry, = self.entries()
+        path = next(os.path.join(root, entry) for root, _, names in os.walk(self.cache_dir) if entry in names)
+        with open(path, 'r+b') as file:
+            file.truncate(20)
+        output, interpreter = self.run_program(BDDCache(self.cache_dir))
+        self.assertEqual(output, expected)
+        self.assertEqual((interpreter.cache.errors, interpreter.cache.writes), (1, 1))
+        output, interpreter = self.run_program(BDDCache(self.cache_dir))
+        self.assertEqual((interpreter.cache.hits, interpreter.cache.errors), (1, 0))
+
+    def test_least_recently_used_are_evicted(self):
+        manager = BDDManager(['a', 'b', 'c', 'd'])
+        cache = BDDCache(self.cache_dir)
+        expressions = [('and', 'a', 'b'), ('or', 'a', 'c'), ('and', 'b', 'd'), ('or', 'c', 'd')]
+        keys = [cache.key(manager, expression) for expression in expressions]
+        for i, expression in enumerate(expressions[:3]):
+            cache.build(manager, str(i), expression)
+            # the modification times of the entries set their age
+            os.utime(cache.path(keys[i]), (i, i))
+        size = sum(os.path.getsize(cache.path(key)) for key in keys[:3])
+        # reading the oldest entry makes it the most recently used
+        self.assertIsNotNone(cache.load(BDDManager(['a', 'b', 'c', 'd']), keys[0]))
+
+        cache = BDDCache(self.cache_dir, max_bytes=size)
+        cache.build(manager, '3', expressions[3])
+        self.assertEqual(cache.evictions, 2)
+        self.assertEqual([os.path.exists(cache.path(key)) for key in keys], [True, False, False, True])
+
+    def test_concurrent_processes(self):
+        paths = []
+        for seed in range(4):
+            paths.append(os.path.join(self.directory.name, f'program{seed}.txt'))
+            # the same program twice over, so the processes write the same entries at once
+            self.write(generate(seed % 2, variables=7, blocks=3, assignments=4, depth=4), paths[-1])
+        with ProcessPoolExecutor(4) as executor:
+            outputs = list(executor.map(_run_cached, [(path, self.cache_dir) for path in paths]))
+        for path, output in zip(paths, outputs):
+            self.assertEqual(output, self.run_program(path=path)[0])
+        self.assertFalse([name for _, _, names in os.walk(self.cache_dir) for name in names if name.endswith('.tmp')])
+
+    def test_batch(self):
+        self.write("var a b;\nx = a or (not b);\nshow x;\n")
+        output_dir = os.path.join(self.directory.name, 'out')
+        for _ in range(2):
+            result, = run_batch([self.path], output_dir, workers=1, cache_dir=self.cache_dir)
+            with open(result['output']) as file:
+                self.assertEqual(file.read(), self.run_program()[0])
+        self.assertEqual(len(self.entries()), 1)
+
+    def test_digests_are_shared(self):
+        _, assignments, _ = parse("var a b;\nx = a and b;\ny = x or a;\n")
+        digests = ExpressionDigests()
+        digests.digest(assignments['y'])
+        entries = len(digests.entries)
+        digests.digest(assignments['x'])
+        self.assertEqual(len(digests.entries), entries)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import os
+import random
+import tempfile
+import unittest
+from io import StringIO
+from benchmarks.generator import generate
+from project import bddfile
+from project.bddfile import MappedBDD, dump, dumps, loads, read
+from project.parser import parse
+from project.ROBDD import BDDManager
+from project.runner import CodeInterpreter
+from project.streaming import StreamingInterpreter
+
+
+class TestBDDFile(unittest.TestCase):
+
+    def setUp(self):
+        self.variables, self.assignments, _ = parse("var a b c d;\nx = (a and (not b)) or (c and d);\ny = not (x or b);\n")
+
+    def build(self, manager):
+        return {name: manager.build(name, self.assignments[name], reduce=False).root for name in ('x', 'y')}
+
+    def test_round_trip(self):
+        manager = BDDManager(self.variables)
+        roots = self.build(manager)
+        for order in (None, ['d', 'c', 'b', 'a']):
+            other = BDDManager(self.variables, order=order)
+            loaded = loads(dumps(manager, roots), other)
+            self.assertEqual(loaded, self.build(other), msg=order)
+
+    def test_support_only(self):
+        manager = BDDManager(self.variables)
+        root = manager.build('f', ('and', 'c', 'd')).root
+        data = dumps(manager, {'f': root}, support_only=True)
+        self.assertEqual(read(data)[0], ['c', 'd'])
+        other = BDDManager(['z', 'c', 'q', 'd'])
+        self.assertEqual(loads(data, other)['f'], other.build('f', ('and', 'c', 'd'), reduce=False).root)
+
+    def test_layout(self):
+        manager = BDDManager(self.variables)
+        data = dumps(manager, self.build(manager))
+        variables, names, roots, (node_var, node_low, node_high) = read(data)
+        self.assertEqual((variables, names), (['a', 'b', 'c', 'd'], ['x', 'y']))
+        self.assertEqual(bddfile.HEADER.unpack_from(data)[1:], (bddfile.VERSION, 0, 4, 2, len(node_var)))
+        self.assertEqual(node_var[0], bddfile.TERMINAL_VAR)
+        # children before parents
+        for node in range(1, len(node_var)):
+            self.assertLess(node_low[node] >> 1, node)
+            self.assertLess(node_high[node] >> 1, node)
+        self.assertEqual(len(data) % 4, 0)
+
+    def test_corrupt(self):
+        manager = BDDManager(self.variables)
+        data = dumps(manager, self.build(manager))
+        for broken in (data[:10], b'XXXX' + data[4:], data[:4] + b'\x09' + data[5:], data[:-4],
+                       data[:-12] + b'\xff' * 12):
+            with self.assertRaises(ValueError):
+                loads(broken, BDDManager(self.variables))
+        with self.assertRaises(ValueError):
+            loads(data, BDDManager(['a', 'b', 'c']))
+
+
+class TestMappedBDD(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'program.txt')
+        self.bdd = os.path.join(self.directory.name, 'outputs.bdd')
+        with open(self.path, 'w') as file:
+            file.write(generate(2, variables=8, blocks=3, assignments=4, depth=5))
+        self.interpreter = CodeInterpreter(self.path, out=StringIO())
+        self.interpreter.interpet()
+        self.interpreter.save(self.bdd)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_evaluate(self):
+        manager = self.interpreter.manager
+        rng = random.Random(0)
+        with MappedBDD(self.bdd) as bdd:
+            self.assertEqual(bdd.variables, manager.order)
+            self.assertEqual(sorted(bdd.names), sorted(self.interpreter.trees))
+            for name, robdd in self.interpreter.trees.items():
+                for _ in range(20):
+                    values = {variable: rng.randint(0, 1) for variable in manager.variables}
+                    self.assertEqual(bdd.evaluate(name, values), robdd.evaluate(values))
+                    self.assertEqual(bdd.evaluate(name, [values[variable] for variable in bdd.variables]),
+                                     robdd.evaluate(values))
+            with self.assertRaises(ValueError):
+                bdd.evaluate(bdd.names[0], [0])
+
+    def test_enumerate(self):
+        with MappedBDD(self.bdd) as bdd:
+            for name, robdd in self.interpreter.trees.items():
+                self.assertEqual(bdd.sat_count(name), robdd.sat_count())
+                cubes = list(bdd.cubes(name))
+                self.assertEqual(sum(1 << cube.count('-') for cube in cubes), robdd.sat_count())
+                for cube in cubes:
+                    values = dict(zip(bdd.variables, (int(value == '1') for value in cube)))
+                    self.assertEqual(robdd.evaluate(values), 1)
+
+    def test_views_into_the_mapping(self):
+        bdd = MappedBDD(self.bdd)
+        self.assertIsInstance(bdd.node_var, memoryview)
+        manager = self.interpreter.manager
+        roots = [robdd.root for robdd in self.interpreter.trees.values()]
+        self.assertEqual(len(bdd), len(manager.reachable_nodes(roots)) + 1)
+        bdd.close()
+        with self.assertRaises(ValueError):
+            bdd.node_var[0]
+
+    def test_invalid_files(self):
+        for data in (b'', b'RBDD'):
+            with open(self.bdd, 'wb') as file:
+                file.write(data)
+            with self.assertRaises(ValueError):
+                MappedBDD(self.bdd)
+
+    def test_dump_replaces_atomically(self):
+        manager = BDDManager(['a'])
+        dump(manager, {'t': 1}, self.bdd)
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ['outputs.bdd', 'program.txt'])
+        with MappedBDD(self.bdd) as bdd:
+            self.assertEqual(list(bdd.cubes('t')), ['-'])
+            self.assertEqual(bdd.sat_count('t'), 2)
+
+    def test_streaming_can_not_save(self):
+        with self.assertRaises(ValueError):
+            StreamingInterpreter(self.path, out=StringIO()).save(self.bdd)
+
+
+if __name__ == '__main__':
+    unittest.main()
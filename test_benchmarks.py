@@ -0,0 +1,66 @@
+import unittest
+from benchmarks import parallel
+from benchmarks.generator import LINE_WIDTH, generate
+from benchmarks.suite import PHASES, compare, run_program, run_suite
+from project.parser import parse
+
+
+class TestGenerator(unittest.TestCase):
+
+    def test_programs_parse(self):
+        for seed in range(10):
+            variables, assignments, show_instructions = parse(generate(seed, variables=7, blocks=2, show_ones=0.5))
+            self.assertEqual(len(variables), 7)
+            self.assertEqual(len(assignments), 8)
+            self.assertEqual(len(show_instructions), 4)
+
+    def test_seeded(self):
+        self.assertEqual(generate(5, depth=6), generate(5, depth=6))
+        self.assertNotEqual(generate(5), generate(6))
+
+    def test_lines_are_wrapped(self):
+        self.assertTrue(all(len(line) <= LINE_WIDTH for line in generate(1, depth=7).splitlines()))
+
+    def test_show_mix(self):
+        _, _, show_instructions = parse(generate(2, show_ones=1.0))
+        self.assertEqual({instruction_type for instruction_type, _ in show_instructions}, {'show_ones'})
+        _, _, show_instructions = parse(generate(2, show_ones=0.0))
+        self.assertEqual({instruction_type for instruction_type, _ in show_instructions}, {'show'})
+
+
+class TestSuite(unittest.TestCase):
+
+    def test_every_phase_is_timed(self):
+        result = run_program("var a b;\nx = a and b;\nshow x;\nshow_ones x;\ncount x;\n")
+        self.assertEqual(set(result['seconds']), set(PHASES))
+        self.assertEqual(result['rows'], 4 + 1 + 1)
+        self.assertEqual(result['nodes'], 2)
+
+    def test_compare_with_baseline(self):
+        results = run_suite(['small'], repeat=1, memory=False)
+        lines = compare(results, results)
+        self.assertEqual(len(lines), 2)
+        self.assertIn("1.00x", lines[1])
+        with self.assertRaises(ValueError):
+            run_suite(['huge'])
+
+
+class TestParallelBenchmark(unittest.TestCase):
+
+    def test_outputs(self):
+        robdds = parallel.table_outputs(6)
+        self.assertEqual(robdds[0].manager.variables, ['x0', 'x1', 'x2', 'y0', 'y1', 'y2'])
+        values = dict.fromkeys(robdds[0].manager.variables, 1)
+        self.assertEqual([robdd.evaluate(values) for robdd in robdds], [1, 0, 0])
+
+    def test_forced_split_is_timed(self):
+        results = parallel.run([8], [2], repeat=1, force=True)
+        case, = results['cases']
+        self.assertEqual((case['variables'], case['rows'], list(case['parallel'])), (8, 256, [2]))
+        lines = parallel.format_results(results)
+        self.assertIn("split path forced", lines[0])
+        self.assertEqual(len(lines), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
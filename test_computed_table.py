@@ -0,0 +1,75 @@
+import unittest
+from project.computed_table import ComputedTable, POLICY_FIFO, POLICY_LRU
+from project.ROBDD import BDDManager
+
+
+class TestComputedTable(unittest.TestCase):
+
+    def test_fifo_evicts_oldest_entries(self):
+        table = ComputedTable(capacity=4, policy=POLICY_FIFO)
+        for key in range(5):
+            table[key] = key
+        self.assertLessEqual(len(table), 4)
+        self.assertNotIn(0, table)
+        self.assertIn(4, table)
+        self.assertEqual(table.evictions, 1)
+
+    def test_lru_keeps_recently_used_entries(self):
+        table = ComputedTable(capacity=4, policy=POLICY_LRU)
+        for key in range(4):
+            table[key] = key
+        table.get(0)
+        table[4] = 4
+        self.assertIn(0, table)
+        self.assertNotIn(1, table)
+
+    def test_hit_and_miss_statistics(self):
+        table = ComputedTable(capacity=8)
+        table['a'] = 1
+        table.get('a')
+        table.get('b')
+        stats = table.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            ComputedTable(capacity=0)
+        with self.assertRaises(ValueError):
+            ComputedTable(policy='random')
+
+
+class TestManagerCaches(unittest.TestCase):
+
+    def test_operation_cache_is_bounded(self):
+        variables = [f'x{i}' for i in range(8)]
+        manager = BDDManager(variables, cache_capacity=16)
+        robdd = manager.build('f', ('or',) + tuple(('and', v, ('not', w)) for v, w in zip(variables, variables[1:])))
+        self.assertLessEqual(len(manager.operation_cache), 16)
+        self.assertGreater(manager.operation_cache.evictions, 0)
+        self.assertEqual(robdd.evaluate({'x0': 1, 'x1': 0}), 1)
+        self.assertEqual(robdd.evaluate({}), 0)
+
+    def test_caches_belong_to_their_manager(self):
+        expr = ('and', 'x', 'y')
+        first, second = BDDManager(['x', 'y']), BDDManager(['x', 'y'])
+        first.build('f', expr)
+        self.assertEqual(len(second.expression_cache), 0)
+        second.build('f', expr)
+        self.assertEqual(second['f'].evaluate({'x': 1, 'y': 1}), 1)
+
+    def test_clear_invalidates_cached_results(self):
+        manager = BDDManager(['x', 'y'])
+        expr = ('or', 'x', 'y')
+        manager.build('f', expr)
+        manager.clear()
+        self.assertEqual(len(manager.expression_cache), 0)
+        self.assertEqual(len(manager.operation_cache), 0)
+        self.assertEqual(manager.node_count, 0)
+        robdd = manager.build('f', expr, reduce=True)
+        self.assertEqual(robdd.evaluate({'x': 0, 'y': 1}), 1)
+        self.assertEqual(manager.node_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
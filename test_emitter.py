@@ -0,0 +1,197 @@
+import unittest
+from io import StringIO
+from itertools import islice
+from unittest.mock import patch
+from project import emitter
+from project.emitter import assignments, binary_assignments, count_rows, gray_assignments, ones_cubes, ones_rows, table_rows, write_rows, write_table, ORDER_GRAY
+from project.ROBDD import BDDManager
+from compare_results import expand_cube
+
+
+class TestAssignments(unittest.TestCase):
+
+    def test_binary_order_matches_table_order(self):
+        self.assertEqual(list(binary_assignments(2)), [(0, 0), (0, 1), (1, 0), (1, 1)])
+
+    def test_gray_order_flips_one_variable_per_row(self):
+        rows = list(gray_assignments(4))
+        self.assertEqual(len(set(rows)), 16)
+        for previous, current in zip(rows, rows[1:]):
+            self.assertEqual(sum(a != b for a, b in zip(previous, current)), 1)
+
+    def test_unknown_order(self):
+        with self.assertRaises(ValueError):
+            assignments(2, 'random')
+
+    def test_assignments_are_lazy(self):
+        # 2^64 rows can not be materialised, the first ones are still available at once
+        self.assertEqual(next(binary_assignments(64)), (0,) * 64)
+        self.assertEqual(len(list(islice(gray_assignments(64), 3))), 3)
+
+
+class TestTableRows(unittest.TestCase):
+
+    def test_rows_of_two_outputs(self):
+        manager = BDDManager(['x', 'y'])
+        trees = [manager.build('f', ('and', 'x', 'y')), manager.build('g', ('or', 'x', 'y'))]
+        self.assertEqual(list(table_rows(trees, 2)), [
+            "  0 0   0 0",
+            "  0 1   0 1",
+            "  1 0   0 1",
+            "  1 1   1 1",
+        ])
+
+    def test_gray_rows_hold_the_same_lines(self):
+        manager = BDDManager(['x', 'y', 'z'])
+        trees = [manager.build('f', ('or', ('and', 'x', 'y'), ('not', 'z')))]
+        self.assertEqual(sorted(table_rows(trees, 3, ORDER_GRAY)), sorted(table_rows(trees, 3)))
+
+    def test_write_rows_in_chunks(self):
+        out = StringIO()
+        written = write_rows((str(i) for i in range(10000)), out, max_chunk=64)
+        self.assertEqual(written, 10000)
+        self.assertEqual(out.getvalue().split(), [str(i) for i in range(10000)])
+
+
+class TestOnesRows(unittest.TestCase):
+
+    def setUp(self):
+        self.variables = ['a', 'b', 'c', 'd']
+        self.manager = BDDManager(self.variables)
+
+    def filtered_table(self, trees):
+        return [line for line in table_rows(trees, len(self.variables)) if '1' in line.split('   ')[1]]
+
+    def test_union_of_on_sets_in_order(self):
+        trees = [
+            self.manager.build('f', ('and', 'a', ('not', 'c'))),
+            self.manager.build('g', ('and', 'b', 'd')),
+            self.manager.build('h', ('and', 'a', 'b', 'c', 'd')),
+        ]
+        self.assertEqual(list(ones_rows(trees, 4)), self.filtered_table(trees))
+
+    def test_overlapping_outputs_are_emitted_once(self):
+        trees = [self.manager.build('f', ('or', 'a', 'b')), self.manager.build('g', 'a')]
+        rows = list(ones_rows(trees, 4))
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows, self.filtered_table(trees))
+
+    def test_rows_follow_declared_order_after_reorder(self):
+        trees = [self.manager.build('f', ('or', ('and', 'a', 'd'), ('and', 'b', 'c'))), self.manager.build('g', ('and', 'c', 'd'))]
+        expected = self.filtered_table(trees)
+        self.manager.reorder()
+        self.assertNotEqual(self.manager.order, self.variables)
+        self.assertEqual(list(ones_rows(trees, 4)), expected)
+
+    def expanded(self, cubes):
+        rows = []
+        for cube in cubes:
+            inputs, outputs = cube.split('   ')
+            rows.extend("  " + " ".join(map(str, row)) + "   " + outputs for row in expand_cube(inputs.split()))
+        return sorted(rows)
+
+    def test_cubes_expand_to_the_rows(self):
+        trees = [self.manager.build('f', ('or', ('and', 'a', ('not', 'c')), 'd')), self.manager.build('g', ('and', 'b', 'c'))]
+        cubes = list(ones_cubes(trees, 4))
+        self.assertIn("  1 0 0 -   1 0", cubes)
+        self.assertLess(len(cubes), len(list(ones_rows(trees, 4))))
+        self.assertEqual(self.expanded(cubes), sorted(ones_rows(trees, 4)))
+
+    def test_cubes_follow_declared_order_after_reorder(self):
+        trees = [self.manager.build('f', ('or', ('and', 'a', 'd'), ('and', 'b', 'c'))), self.manager.build('g', ('and', 'c', 'd'))]
+        expected = sorted(ones_rows(trees, 4))
+        self.manager.reorder()
+        self.assertEqual(self.expanded(ones_cubes(trees, 4)), expected)
+
+    def test_constant_cubes(self):
+        self.assertEqual(list(ones_cubes([self.manager.build('f', 'False')], 4)), [])
+        self.assertEqual(list(ones_cubes([self.manager.build('t', 'True')], 4)), ["  - - - -   1"])
+
+    def test_count_rows_size_the_table(self):
+        trees = [self.manager.build('f', ('or', 'a', 'b')), self.manager.build('g', 'a')]
+        self.assertEqual(list(count_rows(['f', 'g'], trees)), ["  f 12 0.75", "  g 8 0.5", "  show_ones 12 0.75"])
+        self.assertEqual(list(count_rows(['g'], trees[1:])), ["  g 8 0.5"])
+
+    def test_constant_outputs(self):
+        self.assertEqual(list(ones_rows([self.manager.build('f', 'False')], 4)), [])
+        self.assertEqual(len(list(ones_rows([self.manager.build('t', 'True')], 4))), 16)
+
+
+class TestWriteTable(unittest.TestCase):
+
+    def setUp(self):
+        self.variables = ['a', 'b', 'c', 'd', 'e']
+        self.manager = BDDManager(self.variables)
+        self.trees = [
+            self.manager.build('f', ('or', ('and', 'a', ('not', 'c')), ('and', 'b', 'e'))),
+            self.manager.build('g', ('not', ('or', 'd', 'a'))),
+            self.manager.build('t', 'True'),
+        ]
+
+    def expected(self, trees):
+        return "".join(line + "\n" for line in table_rows(trees, len(self.variables)))
+
+    def test_single_block_matches_row_by_row_output(self):
+        out = StringIO()
+        self.assertEqual(write_table(self.trees, len(self.variables), out), 32)
+        self.assertEqual(out.getvalue(), self.expected(self.trees))
+
+    def test_several_blocks_match_row_by_row_output(self):
+        for block_bits in (0, 1, 2, 4):
+            out = StringIO()
+            write_table(self.trees, len(self.variables), out, block_bits=block_bits)
+            self.assertEqual(out.getvalue(), self.expected(self.trees), msg=f"block_bits={block_bits}")
+
+    def test_columns_keep_declared_order_after_reorder(self):
+        expected = self.expected(self.trees)
+        self.manager.reorder()
+        out = StringIO()
+        write_table(self.trees, len(self.variables), out, block_bits=2)
+        self.assertEqual(out.getvalue(), expected)
+
+    def test_first_row_before_second_block(self):
+        events = []
+
+        class Out:
+            def write(self, text):
+                events.append(text)
+
+            def flush(self):
+                pass
+
+        def evaluate_rows(*args):
+            events.append('block')
+            return evaluate(*args)
+
+        def evaluate_block(manager, *args):
+            events.append('block')
+            return block(manager, *args)
+
+        variables = [f"x{i}" for i in range(14)]
+        manager = BDDManager(variables)
+        trees = [manager.build('f', ('or', ('and', 'x0', 'x13'), ('not', 'x7')))]
+        evaluate, block = emitter._evaluate_rows, BDDManager.evaluate_block
+        with patch.object(emitter, '_evaluate_rows', evaluate_rows), patch.object(BDDManager, 'evaluate_block', evaluate_block):
+            # the header is written by the caller, the first block is a single row
+            Out().write("# header\n")
+            write_table(trees, len(variables), Out())
+        self.assertEqual(events[:4], ["# header\n", 'block', "  " + "0 " * 14 + "  1\n", 'block'])
+        self.assertEqual("".join(event for event in events if event != 'block'),
+                         "# header\n" + "".join(line + "\n" for line in table_rows(trees, len(variables))))
+
+    def test_growing_blocks_match_row_by_row_output(self):
+        for first_bits in (0, 1, 3):
+            for block_bits in (0, 2, 4):
+                out = StringIO()
+                write_table(self.trees, len(self.variables), out, block_bits=block_bits, first_bits=first_bits)
+                self.assertEqual(out.getvalue(), self.expected(self.trees), msg=f"{first_bits} {block_bits}")
+
+    def test_no_variables(self):
+        manager = BDDManager([])
+        out = StringIO()
+        write_table([manager.build('t', 'True')], 0, out)
+        self.assertEqual(out.getvalue(), "     1\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
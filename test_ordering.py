@@ -0,0 +1,57 @@
+import unittest
+from project.ordering import HEURISTICS, dfs_order, force_order, order_report, output_expressions, variable_order, weight_order
+from project.parser import parse
+
+
+def pairs_program(count):
+    # x0..xn are declared before y0..yn, the worst order for the pairs
+    variables = [f"x{i}" for i in range(count)] + [f"y{i}" for i in range(count)]
+    pairs = " or ".join(f"(x{i} and y{i})" for i in range(count))
+    return f"var {' '.join(variables)} unused; f = {pairs}; show f;"
+
+
+def adjacent_pairs(order, count):
+    return all(abs(order.index(f"x{i}") - order.index(f"y{i}")) == 1 for i in range(count))
+
+
+class TestOrderingHeuristics(unittest.TestCase):
+
+    def setUp(self):
+        self.variables, self.assignments, self.show_instructions = parse(pairs_program(4))
+        self.expressions = output_expressions(self.assignments, self.show_instructions)
+
+    def test_every_heuristic_returns_a_permutation(self):
+        for heuristic in HEURISTICS:
+            order = variable_order(heuristic, self.variables, self.assignments, self.show_instructions)
+            self.assertEqual(sorted(order), sorted(self.variables), msg=heuristic)
+
+    def test_unused_variables_go_last(self):
+        for heuristic in HEURISTICS:
+            order = variable_order(heuristic, self.variables, self.assignments, self.show_instructions)
+            self.assertEqual(order[-1], "unused", msg=heuristic)
+
+    def test_heuristics_interleave_the_pairs(self):
+        for order_of in (dfs_order, force_order, weight_order):
+            self.assertTrue(adjacent_pairs(order_of(self.variables, self.expressions), 4), msg=order_of.__name__)
+
+    def test_unknown_heuristic(self):
+        with self.assertRaises(ValueError):
+            variable_order("random", self.variables, self.assignments, self.show_instructions)
+
+    def test_report_compares_with_declared_order(self):
+        rows = order_report(self.variables, self.assignments, self.show_instructions)
+        nodes = {row['heuristic']: row['nodes'] for row in rows}
+        self.assertEqual(nodes['declared'], 30)
+        for heuristic in ('dfs', 'force', 'weight'):
+            self.assertEqual(nodes[heuristic], 8, msg=heuristic)
+
+    def test_shared_subexpressions_are_visited_once(self):
+        content = "var a b c; g = a and b; f = g or (g and c); h = not g; show f h;"
+        variables, assignments, show_instructions = parse(content)
+        for heuristic in HEURISTICS:
+            order = variable_order(heuristic, variables, assignments, show_instructions)
+            self.assertEqual(sorted(order), ['a', 'b', 'c'], msg=heuristic)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest import mock
+from project import parallel
+from project.emitter import write_table
+from project.parallel import MAX_SLICE_BITS, cofactor_slices, split_bits, write_table_parallel
+from project.ROBDD import BDDManager
+
+
+class _Writes(StringIO):
+    # keeps every write apart
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def write(self, text):
+        self.writes.append(text)
+        return super().write(text)
+
+
+class TestParallelTable(unittest.TestCase):
+
+    def setUp(self):
+        self.variables = [f"v{i}" for i in range(15)]
+        self.manager = BDDManager(self.variables)
+        v = self.variables
+        self.trees = [
+            self.manager.build('f', ('or',) + tuple(('and', v[i], v[14 - i]) for i in range(7))),
+            self.manager.build('g', ('not', ('and', v[0], v[3], v[14]))),
+            self.manager.build('t', 'True'),
+        ]
+        # the tables of the tests are small and the machine may have a single CPU, split them anyway
+        for patch in (mock.patch.object(parallel, 'available_cpus', return_value=4),
+                      mock.patch.object(parallel, 'MIN_PARALLEL_VARIABLES', 0)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def serial(self, trees):
+        out = StringIO()
+        write_table(trees, len(self.variables), out)
+        return out.getvalue()
+
+    def test_byte_identical_to_serial(self):
+        expected = self.serial(self.trees)
+        for workers in (2, 3):
+            out = StringIO()
+            self.assertEqual(write_table_parallel(self.trees, len(self.variables), out, workers, block_bits=6), 1 << 15)
+            self.assertEqual(out.getvalue(), expected, msg=f"workers={workers}")
+
+    def test_byte_identical_after_reorder(self):
+        expected = self.serial(self.trees)
+        self.manager.reorder()
+        self.assertNotEqual(self.manager.order, self.variables)
+        out = StringIO()
+        write_table_parallel(self.trees, len(self.variables), out, 2)
+        self.assertEqual(out.getvalue(), expected)
+
+    def test_first_rows_written_before_the_slices_of_the_workers(self):
+        expected = self.serial(self.trees)
+        out = _Writes()
+        with mock.patch.object(parallel, '_copy_file', wraps=parallel._copy_file) as copy:
+            write_table_parallel(self.trees, len(self.variables), out, 2)
+        self.assertEqual(out.getvalue(), expected)
+        # the first block is one row, written by this process before it copies any file of a worker
+        self.assertEqual(out.writes[0], expected[:expected.index("\n") + 1])
+        self.assertEqual(copy.call_count, (1 << split_bits(len(self.variables), 2)) - 1)
+
+    def test_copy_to_a_file_descriptor(self):
+        expected = self.serial(self.trees)
+        mkdtemp, slices = tempfile.mkdtemp, []
+
+        def record(**options):
+            slices.append(mkdtemp(**options))
+            return slices[-1]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'table.txt')
+            with open(path, 'w') as out, mock.patch.object(parallel.tempfile, 'mkdtemp', record):
+                out.write("# header\n")
+                write_table_parallel(self.trees, len(self.variables), out, 3)
+                out.write("# after\n")
+            with open(path) as file:
+                self.assertEqual(file.read(), "# header\n" + expected + "# after\n")
+        # the files of the slices are removed with their directory
+        self.assertEqual(len(slices), 1)
+        self.assertFalse(os.path.exists(slices[0]))
+
+    def test_serial_on_a_single_cpu(self):
+        expected = self.serial(self.trees)
+        out = StringIO()
+        with mock.patch.object(parallel, 'available_cpus', return_value=1), \
+                mock.patch.object(parallel, 'ProcessPoolExecutor') as executor:
+            write_table_parallel(self.trees, len(self.variables), out, 4)
+        executor.assert_not_called()
+        self.assertEqual(out.getvalue(), expected)
+
+    def test_slices_are_cofactors(self):
+        roots = [tree.root for tree in self.trees]
+        slices = cofactor_slices(self.manager, roots, 2)
+        self.assertEqual([fixed for fixed, _ in slices], [(0, 0), (0, 1), (1, 0), (1, 1)])
+        for fixed, cofactors in slices:
+            # a cofactor agrees with its output wherever the fixed variables hold
+            values = list(fixed) + [1, 0] * 6 + [1]
+            self.assertEqual(self.manager.evaluate_block(cofactors, values, 1),
+                             [tree.evaluate_values(values) for tree in self.trees])
+
+    def test_split_bits(self):
+        self.assertEqual(split_bits(15, 2), 3)
+        self.assertEqual(split_bits(40, 2), 40 - MAX_SLICE_BITS)
+        self.assertEqual(split_bits(2, 64), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
-from project.parser import parse
+from project.parser import format_skipped, needed_assignments, parse, parse_tokens
+from project.tokenizer import Tokenizer
 
 class TestParser(unittest.TestCase):
     def setUp(self):
@@ -209,6 +210,19 @@ class TestParser(unittest.TestCase):
         _, _, show_instructions = self.parse(content)
         self.assertEqual(show_instructions, [('show_ones', ['f'])])
 
+    def test_count_instruction(self):
+        content = "var x y; f = x and y; count f x; show_ones f;"
+        _, _, show_instructions = self.parse(content)
+        self.assertEqual(show_instructions, [('count', ['f', 'x']), ('show_ones', ['f'])])
+
+    def test_count_is_not_reserved(self):
+        content = "var x count; f = count and x; count = f or x; count count f; show count;"
+        variables, assignments, show_instructions = self.parse(content)
+        self.assertEqual(variables, ['x', 'count'])
+        self.assertEqual(assignments['f'], ('and', 'count', 'x'))
+        self.assertEqual(assignments['count'], ('or', ('and', 'count', 'x'), 'x'))
+        self.assertEqual(show_instructions, [('count', ['count', 'f']), ('show', ['count'])])
+
     def test_multiple_show_instructions(self):
         content = "var x y; f = x and y; g = x or y; show f; show_ones g;"
         _, _, show_instructions = self.parse(content)
@@ -423,6 +437,15 @@ class TestParser(unittest.TestCase):
         self.assertEqual(assignments, {'f1': ('and', 'x1', 'x2'), 'f2': ('or', ('and', 'x1', 'x2'), 'x2')})
         self.assertEqual(show_instructions, [])
 
+    def test_referenced_assignment_is_shared_not_copied(self):
+        content = "var x y; f = x and y; g = f or (x and y); h = g and g;"
+        _, assignments, _ = parse(content)
+        self.assertEqual(assignments['g'], ('or', ('and', 'x', 'y'), ('and', 'x', 'y')))
+        self.assertIs(assignments['g'][1], assignments['f'])
+        # structurally identical subexpressions are hash-consed into one object
+        self.assertIs(assignments['g'][2], assignments['f'])
+        self.assertIs(assignments['h'][1], assignments['h'][2])
+
     def test_missing_equal_sign(self):
         test_content = """
         var x1 x2 x3;
@@ -537,5 +560,99 @@ class TestParser(unittest.TestCase):
         _, _, show_instructions = parse(content)
         self.assertEqual(show_instructions, [('show', ['x'])])
 
+    def test_deeply_nested_expression(self):
+        depth = 5000
+        content = "var x y; z = " + "(" * depth + "x and y" + ")" * depth + "; show z;"
+        _, assignments, _ = parse(content)
+        self.assertEqual(assignments['z'], ('and', 'x', 'y'))
+
+    def test_deeply_nested_not(self):
+        depth = 5001
+        content = "var x; z = " + "(not " * depth + "x" + ")" * depth + ";"
+        _, assignments, _ = parse(content)
+        expression = assignments['z']
+        for _ in range(depth):
+            self.assertEqual(expression[0], 'not')
+            expression = expression[1]
+        self.assertEqual(expression, 'x')
+
+    def test_deeply_nested_missing_parenthesis(self):
+        content = "var x; z = " + "(" * 3000 + "x" + ")" * 2999 + ";"
+        with self.assertRaisesRegex(ValueError, "Missing 1 closing parenthesis"):
+            parse(content)
+
+    def test_parse_deep_nesting_shape(self):
+        # 40000 levels of parentheses, far past the recursion limit; the time it takes is measured in benchmarks/
+        depth = 20000
+        content = "var x y; z = " + "(x and (y or " * depth + "x" + "))" * depth + ";"
+        _, assignments, _ = parse(content)
+        expression = assignments['z']
+        for _ in range(depth):
+            self.assertEqual((expression[0], expression[1], len(expression)), ('and', 'x', 3))
+            expression = expression[2]
+            self.assertEqual((expression[0], expression[1], len(expression)), ('or', 'y', 3))
+            expression = expression[2]
+        self.assertEqual(expression, 'x')
+
+    def test_syntax_error_before_undeclared_identifier(self):
+        with self.assertRaisesRegex(ValueError, "Unexpected operator 'and'"):
+            parse("var x; z = y and and x;")
+        with self.assertRaisesRegex(ValueError, "Variable or identifier y in expression for z is not declared"):
+            parse("var x; z = x and (y or w);")
+
+    def test_not_without_operand(self):
+        with self.assertRaises(ValueError):
+            parse("var x; z = not;")
+        with self.assertRaises(ValueError):
+            parse("var x; z = x and (not);")
+
+    def test_empty_expression(self):
+        # parsed to the empty expression () before the parser was made iterative
+        with self.assertRaises(ValueError) as context:
+            parse("var x; z = ;")
+        self.assertEqual(str(context.exception), "Incomplete expression: missing operand at the end")
+
+
+class TestLazyBuild(unittest.TestCase):
+
+    def lazy(self, text):
+        tokens = Tokenizer().tokenize(text)
+        needed, skipped = needed_assignments(tokens)
+        return parse_tokens(tokens, needed), skipped
+
+    def test_only_needed_assignments(self):
+        text = "var a b;\nx = a;\ny = x and b;\nz = not x;\nshow z;\nw = y;\n"
+        (variables, assignments, shows), skipped = self.lazy(text)
+        self.assertEqual(sorted(assignments), ['x', 'z'])
+        self.assertEqual(assignments['z'], parse(text)[1]['z'])
+        self.assertEqual(skipped, [('y', 3), ('w', 6)])
+        self.assertEqual(format_skipped(skipped), ["# skipped 2 definitions no show needs", "#   y (line 3)", "#   w (line 6)"])
+
+    def test_show_needs_last_definition(self):
+        # the first x is only read by y, which nothing shows; the second one is shown
+        text = "var a b;\nx = a;\ny = x;\nx = b or a;\nshow x;\n"
+        (_, assignments, _), skipped = self.lazy(text)
+        self.assertEqual(assignments['x'], ('or', 'b', 'a'))
+        self.assertEqual(skipped, [('x', 2), ('y', 3)])
+
+    def test_definition_read_before_reassignment(self):
+        text = "var a b;\nx = a;\ny = x or b;\nx = b;\nshow_ones y;\n"
+        (_, assignments, _), skipped = self.lazy(text)
+        self.assertEqual(assignments['y'], ('or', 'a', 'b'))
+        self.assertEqual(skipped, [('x', 4)])
+
+    def test_skipped_definitions_are_checked(self):
+        for text in ("var a;\nx = a and;\nshow a;", "var a;\nx = b;\nshow a;", "var a;\nx = (a;\nshow a;"):
+            with self.assertRaises(ValueError) as expected:
+                parse(text)
+            with self.assertRaises(ValueError) as context:
+                self.lazy(text)
+            self.assertEqual(str(context.exception), str(expected.exception))
+
+    def test_lines_with_comments(self):
+        text = "\n\nvar a; # x = a;\n\n x = a; y = a;\n# ;\n  z\n = a;\nshow x;"
+        _, skipped = self.lazy(text)
+        self.assertEqual(skipped, [('y', 3), ('z', 5)])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
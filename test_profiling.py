@@ -0,0 +1,57 @@
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+from project.profiling import NULL_PROFILER, Profiler
+from project.ROBDD import BDDManager
+from project.runner import CodeInterpreter
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_phases_add_up(self):
+        profiler = Profiler()
+        for _ in range(3):
+            with profiler.phase('parse'):
+                pass
+        self.assertEqual(profiler.phases['parse']['count'], 3)
+        self.assertGreaterEqual(profiler.phases['parse']['wall_seconds'], 0.0)
+
+    def test_output_statistics(self):
+        profiler = Profiler()
+        manager = BDDManager(['x', 'y', 'z'])
+        with profiler.output('f', manager):
+            manager.build('f', ('or', ('and', 'x', 'y'), 'z'), reduce=False)
+        with profiler.output('g', manager):
+            manager.build('g', ('or', ('and', 'x', 'y'), 'z'), reduce=False)
+        stats = profiler.stats()
+        self.assertGreater(stats['outputs']['f']['ite_calls'], 0)
+        # the second output is compiled from the expression cache, no ite step is taken
+        self.assertEqual(stats['outputs']['g']['ite_calls'], 0)
+        self.assertEqual(stats['outputs']['f']['nodes'], 3)
+        self.assertEqual(stats['nodes']['live'], manager.node_count)
+        self.assertGreaterEqual(stats['nodes']['peak'], stats['nodes']['live'])
+
+    def test_disabled_profiler_records_nothing(self):
+        self.assertIs(NULL_PROFILER.phase('parse'), NULL_PROFILER.output('f', None))
+        with NULL_PROFILER.phase('parse'):
+            pass
+        self.assertEqual(NULL_PROFILER.stats(), {})
+
+    def test_interpreter_phases(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as file:
+            file.write("var a b c;\nx = a and (b or c);\ny = not x;\nshow x y;\nshow_ones y;\n")
+        try:
+            interpreter = CodeInterpreter(file.name, out=StringIO(), profiler=Profiler())
+            interpreter.interpet()
+        finally:
+            os.remove(file.name)
+        stats = json.loads(json.dumps(interpreter.stats()))
+        self.assertEqual(set(stats['phases']), {'read', 'tokenize', 'parse', 'order', 'build', 'reduce', 'emit'})
+        self.assertEqual(stats['phases']['emit']['count'], 2)
+        self.assertEqual(set(stats['outputs']), {'x', 'y'})
+
+
+if __name__ == '__main__':
+    unittest.main()
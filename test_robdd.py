@@ -1,7 +1,9 @@
 import unittest
 from io import StringIO
 import sys
-from project.ROBDD import ROBDD
+from itertools import product
+from project.ROBDD import ROBDD, BDDManager, FALSE, TRUE
+from project.parser import parse
 
 class TestROBDD(unittest.TestCase):
 
@@ -157,5 +159,285 @@ class TestROBDD(unittest.TestCase):
         """
         self.assert_output(expected_output)
 
+
+class TestBDDManager(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = BDDManager(['x', 'y', 'z'])
+
+    def test_roots_are_registered_by_name(self):
+        f = self.manager.build('f', ('and', 'x', 'y'))
+        g = self.manager.build('g', ('or', 'x', 'z'))
+        self.assertIs(self.manager['f'], f)
+        self.assertIs(self.manager['g'], g)
+        self.assertEqual(len(self.manager), 2)
+
+    def test_roots_evaluate_independently(self):
+        f = self.manager.build('f', ('and', 'x', 'y'))
+        g = self.manager.build('g', ('or', 'x', 'z'))
+        assignment = {'x': 1, 'y': 0, 'z': 0}
+        self.assertEqual(f.evaluate(assignment), 0)
+        self.assertEqual(g.evaluate(assignment), 1)
+
+    def test_shared_subexpression_reuses_nodes(self):
+        shared = ('and', 'x', 'y')
+        f = self.manager.build('f', shared)
+        self.manager.build('g', ('or', shared, 'z'))
+        # building the first root again adds no node and lands on the same root
+        size = self.manager.node_count
+        f2 = self.manager.build('f2', shared)
+        self.assertEqual(self.manager.node_count, size)
+        self.assertIs(f2.root, f.root)
+
+    def test_reduce_keeps_nodes_of_other_roots(self):
+        f = self.manager.build('f', ('and', 'x', 'y'), reduce=True)
+        self.manager.build('g', ('or', 'y', 'z'), reduce=True)
+        for assignment in ({'x': 1, 'y': 1, 'z': 0}, {'x': 0, 'y': 1, 'z': 0}):
+            self.assertEqual(f.evaluate(assignment), int(assignment['x'] and assignment['y']))
+
+    def test_nodes_are_integer_references(self):
+        self.assertEqual(self.manager.build('t', 'True').root, TRUE)
+        self.assertEqual(self.manager.build('f', 'False').root, FALSE)
+        x = self.manager.build('x', 'x').root
+        self.assertIsInstance(x, int)
+        self.assertEqual(self.manager.var_name(x), 'x')
+        self.assertEqual((self.manager.low(x), self.manager.high(x)), (FALSE, TRUE))
+
+    def test_negation_flips_the_complement_bit(self):
+        f = self.manager.build('f', ('or', ('and', 'x', 'y'), 'z'))
+        count = self.manager.node_count
+        g = self.manager.build('g', ('not', ('or', ('and', 'x', 'y'), 'z')))
+        self.assertEqual(g.root, f.root ^ 1)
+        self.assertEqual(self.manager.node_count, count)
+        self.assertEqual(self.manager.build('h', ('not', ('not', 'x'))).root, self.manager.build('x', 'x').root)
+        for x, y, z in product((0, 1), repeat=3):
+            self.assertEqual(g.evaluate({'x': x, 'y': y, 'z': z}), int(not ((x and y) or z)))
+
+    def test_complement_edges_share_mixed_polarity_nodes(self):
+        # the parity of n variables takes one node per variable, its two polarities share them
+        variables = [f'x{i}' for i in range(6)]
+        expr = 'x0'
+        for name in variables[1:]:
+            expr = ('or', ('and', expr, ('not', name)), ('and', ('not', expr), name))
+        manager = BDDManager(variables)
+        f = manager.build('f', expr, reduce=True)
+        self.assertEqual(manager.node_count, 6)
+        for node in manager._live_nodes():
+            self.assertEqual(manager.node_low[node] & 1, 0)
+        for values in product((0, 1), repeat=6):
+            self.assertEqual(f.evaluate_values(values), sum(values) % 2)
+
+    def test_freed_nodes_are_reused(self):
+        self.manager.build('f', ('and', 'x', 'y', 'z'))
+        size = len(self.manager.node_var)
+        del self.manager.roots['f']
+        self.manager.collect()
+        self.assertEqual(self.manager.node_count, 0)
+        self.manager.build('g', ('or', 'x', 'y'))
+        self.assertEqual(len(self.manager.node_var), size)
+
+    def test_collect_reports_freed_nodes(self):
+        self.manager.build('f', ('and', 'x', 'y', 'z'))
+        g = self.manager.build('g', ('or', 'x', 'z'))
+        live = self.manager.node_count
+        freed_before = self.manager.gc_stats()['freed']
+        del self.manager.roots['f']
+        stats = self.manager.collect()
+        self.assertEqual(stats['live'], self.manager.node_count)
+        self.assertEqual(stats['freed'], live - stats['live'])
+        self.assertGreater(stats['freed'], 0)
+        self.assertGreaterEqual(stats['seconds'], 0)
+        # nothing left to free, and the surviving root is untouched
+        self.assertEqual(self.manager.collect()['freed'], 0)
+        self.assertEqual(self.manager.gc_stats()['freed'] - freed_before, stats['freed'])
+        self.assertEqual(g.evaluate({'x': 0, 'y': 0, 'z': 1}), 1)
+
+    def test_collect_between_builds(self):
+        self.manager.build('f', ('and', 'x', ('not', 'y')), reduce=False)
+        self.manager.collect()
+        g = self.manager.build('g', ('or', ('and', 'x', ('not', 'y')), 'z'), reduce=False)
+        self.manager.collect()
+        for x, y, z in product((0, 1), repeat=3):
+            self.assertEqual(g.evaluate({'x': x, 'y': y, 'z': z}), int((x and not y) or z))
+
+    def test_collect_keeps_results_of_live_nodes(self):
+        x, y, z = (self.manager.build(name, name, reduce=False).root for name in ('x', 'y', 'z'))
+        kept = self.manager.ite(x, y, z)
+        self.manager.add_root('kept', kept)
+        dropped = self.manager.ite(y, x ^ 1, z)
+        self.manager.collect()
+        cache = self.manager.operation_cache
+        self.assertTrue(cache.entries)
+        for (f, g, h), result in cache.entries.items():
+            self.assertNotIn(dropped >> 1, (f >> 1, g >> 1, h >> 1, result >> 1))
+        misses = cache.misses
+        self.assertEqual(self.manager.ite(x, y, z), kept)
+        self.assertEqual(cache.misses, misses)
+
+    def test_evaluate_block_matches_evaluate(self):
+        f = self.manager.build('f', ('or', ('and', 'x', ('not', 'y')), 'z'))
+        # bit r of a column is the value of the variable in the r-th of 8 assignments
+        columns = [0b11110000, 0b11001100, 0b10101010]
+        expected = sum(f.evaluate({'x': (r >> 2) & 1, 'y': (r >> 1) & 1, 'z': r & 1}) << r for r in range(8))
+        self.assertEqual(f.evaluate_block(columns, 8), expected)
+
+    def test_deep_expression_does_not_recurse(self):
+        depth = 3 * sys.getrecursionlimit()
+        variables = [f'x{i}' for i in range(depth)]
+        expr = variables[-1]
+        for i in range(depth - 2, -1, -1):
+            expr = ('and' if i % 2 else 'or', variables[i], expr)
+        manager = BDDManager(variables)
+        robdd = manager.build('deep', expr, reduce=True)
+        self.assertEqual(manager.node_count, depth)
+        self.assertEqual(robdd.evaluate(dict.fromkeys(variables, 1)), 1)
+        self.assertEqual(robdd.evaluate(dict.fromkeys(variables, 0)), 0)
+
+    def test_shared_assignments_compile_once(self):
+        # every f_i doubles the size of the expression tree, but not of the DAG
+        content = "var x y; f0 = x and y;" + "".join(f" f{i} = f{i-1} or (not f{i-1});" for i in range(1, 60))
+        variables, assignments, _ = parse(content)
+        manager = BDDManager(variables)
+        robdd = manager.build('f59', assignments['f59'], reduce=False)
+        self.assertEqual(robdd.root, TRUE)
+        # one entry per distinct subexpression: x, y, f0 and two per later assignment
+        self.assertEqual(len(manager.expression_cache), 3 + 2 * 59)
+
+
+    def pairs(self, count):
+        variables = [f'x{i}' for i in range(count)] + [f'y{i}' for i in range(count)]
+        expr = ('or',) + tuple(('and', f'x{i}', f'y{i}') for i in range(count))
+        return variables, expr
+
+    def test_reorder_shrinks_and_keeps_functions(self):
+        # x0..x3 before y0..y3 is the worst order for the pairs, interleaving them is linear
+        variables, expr = self.pairs(4)
+        manager = BDDManager(variables)
+        f = manager.build('f', expr)
+        table = [f.evaluate_values(values) for values in product((0, 1), repeat=8)]
+        stats = manager.reorder()
+        self.assertEqual((stats['before'], stats['after']), (30, 8))
+        self.assertEqual(manager.node_count, 8)
+        self.assertEqual([f.evaluate_values(values) for values in product((0, 1), repeat=8)], table)
+        # the declared order is unchanged, every pair is now on adjacent levels
+        self.assertEqual(manager.variables, variables)
+        order = manager.order
+        self.assertTrue(all(abs(order.index(f'x{i}') - order.index(f'y{i}')) == 1 for i in range(4)))
+
+    def test_automatic_reorder_while_building(self):
+        variables, expr = self.pairs(5)
+        manager = BDDManager(variables, reorder_threshold=16)
+        f = manager.build('f', expr, reduce=True)
+        self.assertGreater(manager.reorders, 0)
+        self.assertEqual(manager.node_count, 10)
+        for values in product((0, 1), repeat=10):
+            self.assertEqual(f.evaluate_values(values), int(any(values[i] and values[5 + i] for i in range(5))))
+
+
+    def test_initial_order_keeps_declared_inputs(self):
+        manager = BDDManager(['x', 'y', 'z'], order=['z', 'x', 'y'])
+        f = manager.build('f', ('or', ('and', 'x', ('not', 'y')), 'z'))
+        self.assertEqual(manager.order, ['z', 'x', 'y'])
+        self.assertEqual(manager.var_name(f.root), 'z')
+        for x, y, z in product((0, 1), repeat=3):
+            self.assertEqual(f.evaluate_values((x, y, z)), int((x and not y) or z))
+
+    def test_set_order_on_built_roots(self):
+        variables, expr = self.pairs(3)
+        manager = BDDManager(variables)
+        f = manager.build('f', expr)
+        table = [f.evaluate_values(values) for values in product((0, 1), repeat=6)]
+        manager.set_order(['x0', 'y0', 'x1', 'y1', 'x2', 'y2'])
+        self.assertEqual(manager.node_count, 6)
+        self.assertEqual([f.evaluate_values(values) for values in product((0, 1), repeat=6)], table)
+        with self.assertRaises(ValueError):
+            manager.set_order(['x0', 'y0'])
+
+
+    def test_ite_matches_its_definition(self):
+        x, y, z = (self.manager.build(name, name).root for name in ('x', 'y', 'z'))
+        nodes = [FALSE, TRUE, x, y ^ 1, self.manager.combine('or', [y, z]), self.manager.combine('and', [x, z ^ 1])]
+
+        def table(node):
+            view = ROBDD(self.manager)
+            view.root = node
+            return [view.evaluate_values(values) for values in product((0, 1), repeat=3)]
+
+        for f, g, h in product(nodes, repeat=3):
+            expected = [g_value if f_value else h_value for f_value, g_value, h_value in zip(table(f), table(g), table(h))]
+            self.assertEqual(table(self.manager.ite(f, g, h)), expected)
+
+    def test_equivalent_triples_share_a_cache_entry(self):
+        x, y, z = (self.manager.build(name, name).root for name in ('x', 'y', 'z'))
+        result = self.manager.ite(x, y, z)
+        entries = len(self.manager.operation_cache)
+        # not x ? z : y and not (x ? not y : not z) are the same triple
+        self.assertEqual(self.manager.ite(x ^ 1, z, y), result)
+        self.assertEqual(self.manager.ite(x, y ^ 1, z ^ 1), result ^ 1)
+        self.assertEqual(len(self.manager.operation_cache), entries)
+        self.assertTrue(all(len(key) == 3 and all(isinstance(node, int) for node in key)
+                            for key in self.manager.operation_cache.entries))
+
+    def test_nary_operators_stop_at_the_absorbing_constant(self):
+        operand = ('or', 'x', ('not', 'y'), 'z')
+        self.manager.build('o', operand)
+        misses = self.manager.operation_cache.misses
+        self.assertEqual(self.manager.build('f', ('and', operand, ('not', operand), operand, 'False')).root, FALSE)
+        self.assertEqual(self.manager.operation_cache.misses, misses)
+        self.assertEqual(self.manager.build('g', ('or', 'x', 'y', ('not', 'x'))).root, TRUE)
+        with self.assertRaises(ValueError):
+            self.manager.combine('xor', [TRUE, FALSE])
+
+    def test_long_conjunction(self):
+        variables = [f'x{i}' for i in range(12)]
+        manager = BDDManager(variables)
+        expr = ('and',) + tuple(('or', a, ('not', b)) for a, b in zip(variables, variables[1:]))
+        f = manager.build('f', expr)
+        for values in product((0, 1), repeat=12):
+            expected = int(all(values[i] or not values[i + 1] for i in range(11)))
+            self.assertEqual(f.evaluate_values(values), expected)
+
+
+    def test_sat_count_matches_enumeration(self):
+        exprs = [('or', ('and', 'x', ('not', 'y')), 'z'), ('not', ('and', 'x', 'z')), 'y', 'True', 'False']
+        for i, expr in enumerate(exprs):
+            f = self.manager.build(i, expr)
+            ones = sum(f.evaluate_values(values) for values in product((0, 1), repeat=3))
+            self.assertEqual(f.sat_count(), ones)
+            self.assertEqual(f.sat_fraction(), ones / 8)
+
+    def test_sat_count_is_exact_beyond_floats(self):
+        variables = [f'x{i}' for i in range(200)]
+        manager = BDDManager(variables)
+        f = manager.build('f', ('or', 'x0', ('not', 'x199')))
+        self.assertEqual(f.sat_count(), 3 * 2 ** 198)
+        self.assertEqual(f.sat_fraction(), 0.75)
+
+    def test_sat_count_after_reorder(self):
+        variables, expr = self.pairs(3)
+        manager = BDDManager(variables)
+        f = manager.build('f', expr)
+        ones = f.sat_count()
+        manager.reorder()
+        self.assertEqual(f.sat_count(), ones)
+        self.assertEqual(ones, sum(f.evaluate_values(values) for values in product((0, 1), repeat=6)))
+
+    def test_exported_nodes_load_in_another_manager(self):
+        variables, expr = self.pairs(3)
+        manager = BDDManager(variables)
+        f = manager.build('f', expr)
+        g = manager.build('g', ('not', ('and', 'x0', 'y2')))
+        manager.reorder()
+        node_var, node_low, node_high, roots = manager.export_nodes([f.root, g.root])
+        self.assertEqual(len(node_var) - 1, len(manager.reachable_nodes([f.root, g.root])))
+
+        other = BDDManager(variables, order=manager.order)
+        other.load_nodes(node_var, node_low, node_high)
+        for values in product((0, 1), repeat=6):
+            self.assertEqual(other.evaluate_block(roots, values, 1), [f.evaluate_values(values), g.evaluate_values(values)])
+        # the loaded nodes are canonical, building f again finds them
+        self.assertEqual(other.build('f', expr).root, roots[0])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+from io import StringIO
+from benchmarks.generator import generate
+from project import streaming
+from project.parser import parse
+from project.runner import CodeInterpreter
+from project.streaming import StreamingInterpreter, scan_program
+from project.tokenizer import split_statements
+
+
+class TestSplitStatements(unittest.TestCase):
+
+    def test_any_chunking(self):
+        text = "var a b; # a; comment; \nx = a\n and b;# ;\nshow x;\n  "
+        for size in (1, 2, 5, len(text)):
+            chunks = [text[i:i + size] for i in range(0, len(text), size)]
+            self.assertEqual(list(split_statements(chunks)), ["var a b;", " \nx = a\n and b;", "\nshow x;"], msg=size)
+
+    def test_text_after_last_semicolon(self):
+        self.assertEqual(list(split_statements(["var a; show", " a"])), ["var a;", " show a"])
+
+
+class TestStreamingInterpreter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'program.txt')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, text):
+        with open(self.path, 'w') as file:
+            file.write(text)
+
+    def run_both(self, **options):
+        expected, out = StringIO(), StringIO()
+        CodeInterpreter(self.path, out=expected, cubes=options.get('cubes', False)).interpet()
+        StreamingInterpreter(self.path, out=out, **options).interpet()
+        return expected.getvalue(), out.getvalue()
+
+    def test_same_output_as_whole_program(self):
+        for seed in range(3):
+            self.write(generate(seed, variables=7, blocks=3, assignments=4, depth=4))
+            for chunk_size in (1, 7, 1 << 16):
+                expected, output = self.run_both(chunk_size=chunk_size)
+                self.assertEqual(output, expected, msg=f"seed={seed} chunk_size={chunk_size}")
+
+    def test_show_waits_for_last_assignment(self):
+        # parsing the whole program first, a show prints the last assignment of its names
+        self.write("var a b;\nx = a;\nshow x;\ny = b;\nshow y;\nshow_ones a;\nx = a and b;\ncount x y;\n")
+        expected, output = self.run_both(chunk_size=3)
+        self.assertEqual(output, expected)
+        self.assertTrue(output.startswith("# a b | x\n  0 0   0\n  0 1   0\n  1 0   0\n  1 1   1\n"))
+
+    def test_variables_declared_after_show(self):
+        self.write("var a;\nx = not a;\nshow x;\nvar b;\ny = x or b;\nshow_ones y;\n")
+        expected, output = self.run_both(cubes=True)
+        self.assertEqual(output, expected)
+        self.assertTrue(output.startswith("# a b | x\n"))
+
+    def test_collects_and_reorders(self):
+        self.write(generate(1, variables=8, blocks=2, assignments=6, depth=5))
+        threshold = streaming.COLLECT_THRESHOLD
+        streaming.COLLECT_THRESHOLD = 4
+        try:
+            expected, output = self.run_both(reorder_threshold=8)
+        finally:
+            streaming.COLLECT_THRESHOLD = threshold
+        self.assertEqual(output, expected)
+
+    def test_errors_of_parse(self):
+        for text in ("var a;\nx = a;\n\nshow y;\n", "var a;\nx = (a and\n a;\nshow x;", "var a;\nx = a; $\n",
+                     "var a;\nshow a", "# nothing\n", "var a; var a;"):
+            self.write(text)
+            with self.assertRaises(ValueError) as expected:
+                parse(text)
+            out = StringIO()
+            with self.assertRaises(ValueError) as context:
+                StreamingInterpreter(self.path, out=out, chunk_size=4).interpet()
+            self.assertEqual(str(context.exception), str(expected.exception))
+            self.assertEqual(out.getvalue(), "")
+
+    def test_outline(self):
+        self.write("var a b;\nx = a;\nshow x;\ny = x or b;\nx = b;\nshow y;\n")
+        outline = scan_program(self.path)
+        self.assertEqual(outline.variables, ['a', 'b'])
+        self.assertEqual(outline.final, {'x': 4, 'y': 3})
+        self.assertEqual(outline.flush_at, {2: 4, 5: 5})
+        self.assertEqual(outline.needed_until['x'], 4)
+        self.assertEqual(outline.needed_until['y'], 5)
+
+    def test_lazy_skips_unneeded_assignments(self):
+        self.write("var a b;\nx = a;\ny = x and b;\nz = not x;\nshow z;\nw = y;\n")
+        expected, output = self.run_both(chunk_size=5)
+        self.assertEqual(output, expected)
+        interpreter = StreamingInterpreter(self.path, out=StringIO())
+        self.assertEqual(interpreter.skipped, [('y', 3), ('w', 6)])
+        self.assertEqual(interpreter.outline.needed, {1, 3})
+        interpreter = StreamingInterpreter(self.path, out=StringIO(), lazy=False)
+        self.assertIsNone(interpreter.outline.needed)
+        self.assertEqual(interpreter.skipped, [])
+
+    def test_heuristics_need_whole_program(self):
+        self.write("var a;\nshow a;\n")
+        with self.assertRaises(ValueError):
+            StreamingInterpreter(self.path, heuristic='dfs')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from project.tokenizer import Tokenizer
+
+
+class TestTokenizer(unittest.TestCase):
+
+    def tokenize(self, text):
+        return [(token.type, token.value, token.line, token.column) for token in Tokenizer().tokenize(text)]
+
+    def test_types_and_positions(self):
+        self.assertEqual(self.tokenize("var x y;\n  z = (not x) or y; # comment\nshow z;"), [
+            ('KEYWORD', 'var', 1, 1), ('IDENTIFIER', 'x', 1, 5), ('IDENTIFIER', 'y', 1, 7), ('SPECIAL', ';', 1, 8),
+            ('IDENTIFIER', 'z', 2, 3), ('SPECIAL', '=', 2, 5), ('SPECIAL', '(', 2, 7), ('KEYWORD', 'not', 2, 8),
+            ('IDENTIFIER', 'x', 2, 12), ('SPECIAL', ')', 2, 13), ('KEYWORD', 'or', 2, 15), ('IDENTIFIER', 'y', 2, 18),
+            ('SPECIAL', ';', 2, 19), ('KEYWORD', 'show', 3, 1), ('IDENTIFIER', 'z', 3, 6), ('SPECIAL', ';', 3, 7),
+        ])
+
+    def test_values_without_positions(self):
+        tokens = Tokenizer().tokenize("var x_1 y;#x = y;\nshow_ones x_1;")
+        self.assertEqual(tokens.values, ['var', 'x_1', 'y', ';', 'show_ones', 'x_1', ';'])
+        self.assertIsNone(tokens.lines)
+        self.assertEqual(tokens[-1].line, 2)
+
+    def test_unexpected_character(self):
+        for text, message in [
+            ("var x;\nshow x$;", "Unexpected character: $ at line 2, character 7"),
+            ("var x;\n  y = 1x;", "Unexpected character: 1 at line 2, character 7"),
+            ("var x² ²x;", "Unexpected character: ² at line 1, character 8"),
+            ("\n\nvar x; # $ is fine here\nx = !x;", "Unexpected character: ! at line 2, character 5"),
+        ]:
+            with self.assertRaises(ValueError) as context:
+                Tokenizer().tokenize(text)
+            self.assertEqual(str(context.exception), message)
+
+    def test_unicode_identifiers(self):
+        self.assertEqual(self.tokenize("var é x2;"),
+                         [('KEYWORD', 'var', 1, 1), ('IDENTIFIER', 'é', 1, 5), ('IDENTIFIER', 'x2', 1, 7), ('SPECIAL', ';', 1, 9)])
+
+    def test_final_semicolon(self):
+        for text in ("", "var x", "var x; show x # ;"):
+            with self.assertRaises(ValueError):
+                Tokenizer().tokenize(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
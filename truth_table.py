@@ -1,54 +1,126 @@
 import sys
 import argparse
-from project.ROBDD import ROBDD
-from project.parser import parse
+import json
+from project.ROBDD import BDDManager
+from project.emitter import binary_assignments, count_rows, ones_cubes, write_rows
+from project.ordering import HEURISTIC_DECLARED, HEURISTICS, format_report, order_report, variable_order
+from project.parser import format_skipped, needed_assignments, parse_tokens
+from project.profiling import NULL_PROFILER, Profiler
+from project.tokenizer import Tokenizer
 import traceback
 from time import time
-from itertools import product
 
-def print_truth_table(declared_vars, assignments, show_instructions):
-    robdd = ROBDD()
+def print_truth_table(declared_vars, assignments, show_instructions, reorder_threshold=None, sift=False,
+                      heuristic=HEURISTIC_DECLARED, cubes=False, profiler=NULL_PROFILER):
+    # the variables may be reordered inside the manager, the columns keep the declared order
+    with profiler.phase('order'):
+        order = variable_order(heuristic, declared_vars, assignments, show_instructions)
+    manager = BDDManager(declared_vars, reorder_threshold=reorder_threshold, order=order)
 
-    # Build ROBDDs for all required variables at once
-    results = {var: robdd.build(expr, declared_vars) for var, expr in assignments.items() 
-               if var in show_instructions["show"] or var in show_instructions["show_ones"]}
+    # Build ROBDDs for all required variables at once, sharing nodes between them
+    results = {}
+    for _, output_vars in show_instructions:
+        for var in output_vars:
+            if var not in results:
+                with profiler.phase('build'), profiler.output(var, manager):
+                    results[var] = manager.build(var, assignments.get(var, var))
+    # reducing collects the whole store and clears the computed table, so it is done once after
+    # every output is built and the outputs reuse the results they share while building
+    with profiler.phase('reduce'):
+        manager.reduce()
+    if sift:
+        with profiler.phase('reorder'):
+            manager.reorder()
+
+    for instruction_type, output_vars in show_instructions:
+        with profiler.phase('emit'):
+            if instruction_type == "count":
+                # the sizes of the show_ones tables, nothing is enumerated
+                print("# count " + " ".join(output_vars))
+                write_rows((line.lstrip() for line in count_rows(output_vars, [results[var] for var in output_vars])), sys.stdout)
+                print()
+                continue
 
-    for instruction_type, output_vars_list in show_instructions.items():
-        for output_vars in output_vars_list:
             # Print table header
             header = " ".join(declared_vars) + " | " + " ".join(output_vars)
             print("# " + header)
             print("# " + "-" * len(header))
 
-            # Generate all possible combinations of truth values
-            truth_value_combinations = list(product([False, True], repeat=len(declared_vars)))
-
-            for truth_values in truth_value_combinations:
-                truth_dict = dict(zip(declared_vars, truth_values))
+            if cubes and instruction_type == "show_ones":
+                # disjoint cubes straight from the BDD paths, '-' for the variables they do not fix
+                write_rows((line.lstrip() for line in ones_cubes([results[var] for var in output_vars], len(declared_vars))),
+                           sys.stdout)
+                print()
+                continue
 
-                # Evaluate ROBDD for each output variable
-                output_results = [str(int(results[var](truth_dict))) for var in output_vars]
-
-                if instruction_type == "show" or (instruction_type == "show_ones" and any(int(x) for x in output_results)):
-                    input_vals = " ".join(str(int(tv)) for tv in truth_values)
-                    output_vals = " ".join(output_results)
-                    print(f"{input_vals}   {output_vals}")
+            # Walk all possible combinations of truth values lazily, rows are written in chunks
+            evaluators = [results[var].evaluate_values for var in output_vars]
+            rows = ((truth_values, [evaluate(truth_values) for evaluate in evaluators])
+                    for truth_values in binary_assignments(len(declared_vars)))
+            write_rows((" ".join(map(str, truth_values)) + "   " + " ".join(map(str, output_results))
+                        for truth_values, output_results in rows
+                        if instruction_type == "show" or (instruction_type == "show_ones" and any(output_results))),
+                       sys.stdout)
 
             print()  # Add a blank line between different show instructions
 
+def write_stats(stats, destination):
+    # '-' is stderr, so the statistics do not mix with the tables on stdout
+    if destination == "-":
+        json.dump(stats, sys.stderr, indent=2)
+        sys.stderr.write("\n")
+    else:
+        with open(destination, 'w') as file:
+            json.dump(stats, file, indent=2)
+
 def main(file_path=None):
+    reorder_threshold, sift, heuristic, report, cubes, stats = None, False, HEURISTIC_DECLARED, False, False, None
+    eager, report_skipped = False, False
     if file_path is None:
         parser = argparse.ArgumentParser(description="Generate truth table from ROBDD input file")
         parser.add_argument("file_path", help="Path to the input file")
+        parser.add_argument("--reorder-threshold", type=int, default=None,
+                            help="sift the variable order while building whenever the BDDs grow past this many nodes")
+        parser.add_argument("--sift", action="store_true", help="sift the variable order once every output is built")
+        parser.add_argument("--var-order", choices=HEURISTICS, default=HEURISTIC_DECLARED,
+                            help="heuristic picking the initial variable order, the columns keep the declared order")
+        parser.add_argument("--order-report", action="store_true",
+                            help="print the node count under every variable-order heuristic instead of the tables")
+        parser.add_argument("--cubes", action="store_true",
+                            help="print show_ones tables as disjoint cubes, '-' marking a don't-care input")
+        parser.add_argument("--stats", nargs="?", const="-", default=None, metavar="FILE",
+                            help="write per-phase timers and node/cache statistics as JSON to FILE, or to stderr")
+        parser.add_argument("--eager", action="store_true",
+                            help="build every assignment, also the ones no show needs")
+        parser.add_argument("--report-skipped", action="store_true",
+                            help="list the definitions no show needs, which are not built, on stderr")
         args = parser.parse_args()
         file_path = args.file_path
+        reorder_threshold, sift, heuristic, report = args.reorder_threshold, args.sift, args.var_order, args.order_report
+        cubes, stats = args.cubes, args.stats
+        eager, report_skipped = args.eager, args.report_skipped
 
+    profiler = Profiler() if stats else NULL_PROFILER
     try:
-        with open(file_path, 'r') as file:
+        with profiler.phase('read'), open(file_path, 'r') as file:
             content = file.read()
 
-        variables, assignments, show_instructions = parse(content)
-        print_truth_table(variables, assignments, show_instructions)
+        with profiler.phase('tokenize'):
+            tokens = Tokenizer().tokenize(content)
+        with profiler.phase('parse'):
+            needed, skipped = None, []
+            if not eager:
+                # only the assignments the shows need, directly or through others, are built
+                needed, skipped = needed_assignments(tokens)
+            variables, assignments, show_instructions = parse_tokens(tokens, needed)
+        if report_skipped:
+            sys.stderr.write("\n".join(format_skipped(skipped)) + "\n")
+        if report:
+            print(format_report(order_report(variables, assignments, show_instructions)))
+        else:
+            print_truth_table(variables, assignments, show_instructions, reorder_threshold, sift, heuristic, cubes, profiler)
+        if stats:
+            write_stats(dict(profiler.stats(), skipped=[{'name': name, 'line': line} for name, line in skipped]), stats)
     except FileNotFoundError:
         print(f"Error: File '{file_path}' not found.")
         sys.exit(1)